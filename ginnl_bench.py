@@ -0,0 +1,577 @@
+import sys
+import os
+import io
+import re
+import time
+import random
+import struct
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+
+import ginnl_reader as gr
+import ginnl_writer as gw
+from ginnl_cache import ParseCache
+
+# (burns, small-forces table length, times the body is repeated) for each named size
+sizes = {'small':  (3,   10,   1),
+         'medium': (20,  100,  1),
+         'large':  (99,  1000, 1),
+         'huge':   (99,  1000, 20)}
+
+def _float_str(rng, scale=1.0):
+  # mix of plain, E and Fortran D exponent forms
+  val  = rng.uniform(-scale, scale)
+  form = rng.random()
+  if form < 0.5:
+    return '%.6f'%(val)
+  elif form < 0.8:
+    return '%.9E'%(val)
+  return ('%.9E'%(val)).replace('E','D')
+
+def _values_lines(rng, vals, per_line=3):
+  # spread a list of value strings over several lines, keeping within 80 columns
+  lines = []
+  for i in range(0, len(vals), per_line):
+    lines.append(', '.join(vals[i:i+per_line]))
+  return (',\n   ').join(lines)
+
+def generate_namelist(burns=10, table=100, repeat=1, seed=0, terminate=True, invalid=False):
+  '''
+  generate_namelist(burns=10, table=100, repeat=1, seed=0, terminate=True, invalid=False)
+
+  Description:
+    Generate synthetic gin namelist text covering the syntax the reader has to
+  handle: multi-line assignments, n*value repeats, null values (,, and a bare
+  n*, also split over lines) over values assigned earlier, quoted strings
+  containing commas, ! # $ comments, several assignments on one line, D
+  exponents and a ; terminator followed by text that must be ignored. The
+  same seed always gives the same text.
+
+  Optional Args (type):
+    burns:      (int) number of finite burns, at most 99
+    table:      (int) length of the small-forces tables, at most 1000
+    repeat:     (int) times the whole body is written (later copies override
+                      earlier ones), to make very large files
+    seed:       (int) random seed
+    terminate:  (bool) end the namelist with ;
+    invalid:    (bool) also write statements with unquoted words or nothing
+                       on the rhs, each on a line of its own ending in
+                       ! invalid
+
+  Output:
+    text:       (str) namelist text
+  '''
+  rng   = random.Random(seed)
+  lines = []
+  for copy in range(repeat):
+    lines.append('! synthetic fragment %i, copy %i'%(seed,copy))
+    for i in range(1, burns+1):
+      lines.append('# burn %i'%(i))
+      lines.append(' DMA1(%i) = %s   ! start epoch'%(i, _float_str(rng, 1e8)))
+      lines.append(' MA1K(%i) = 1.0D-3, MA1D(%i) = %s'%(i, i, _float_str(rng, 1e3)))
+      lines.append(' MA1A(1,%i) = %s'%(i, _values_lines(rng, [_float_str(rng) for _ in range(10)])))
+      if rng.random() < 0.5:
+        lines.append(' MA1F(1,%i) = %s, 4*0.0'%(i, _float_str(rng, 500.0)))
+      else:
+        lines.append(' MA1F(1,%i) = 5*%s'%(i, _float_str(rng, 500.0)))
+      lines.append(' MA1M(1,%i) = %s'%(i, _values_lines(rng, [_float_str(rng) for _ in range(4)])))
+      # null values leave the values assigned above in place
+      if rng.random() < 0.5:
+        lines.append(' MA1A(1,%i) = %s,, %s, 2*, %s'%(i, _float_str(rng), _float_str(rng), _float_str(rng)))
+      else:
+        lines.append(' MA1M(1,%i) = ,%s,\n   , %s'%(i, _float_str(rng), _float_str(rng)))
+      if invalid and rng.random() < 0.3:
+        lines.append(rng.choice([' CMPTF(%i) = T ! invalid', ' LPLANE(%i) = VELOC ! invalid',
+                                 ' DMA1(%i) = ABC ! invalid', ' DMA1TP(%i) = ! invalid'])%(i))
+      lines.append(" COORS(1,%i) = 'EARTH,MOON', 'SPACE', 'EARTH', 'MEAN', 'EQUATO'"%(i))
+      lines.append(" ITPEQ(%i) = '01-JAN-2000 00:00:00.0000 ET' $ epoch, with a comma"%(i))
+      lines.append(' BURN(%i)=%i, BRD(%i)=3, CMPTF(%i)=%s, ROLLAX(%i)=1'%(
+                   i, rng.randint(1,3), i, i, rng.choice(['.TRUE.','.FALSE.']), i))
+      lines.append(' TVDORA(1,1,%i) = 6*%s'%(i, _float_str(rng)))
+    if table:
+      lines.append(' SMFTIM(1) = %s'%(_values_lines(rng, [_float_str(rng, 1e6) for _ in range(table)])))
+      lines.append(' SMFDR(1,1) = %s'%(_values_lines(rng, [_float_str(rng) for _ in range(3*table)])))
+      lines.append(' SMFTYP(1) = %i*1'%(table))
+    lines.append(" SCID = 42, SCNAME = 'PROBE', MASS = %s"%(_float_str(rng, 1e3)))
+  if terminate:
+    lines.append(' GM(1) = 1.32712440018D11;')
+    lines.append(' DMA1(1) = 99.0 ! after the terminator, never read')
+  return '\n'.join(lines)+'\n'
+
+def generate_tables(repeat=1, seed=0):
+  '''
+  generate_tables(repeat=1, seed=0)
+
+  Description:
+    Generate namelist text of nothing but the largest tables at their full
+  MIRAGE dimensions: SMFTIM (1000), SMFDR and SMFDV (3x1000) and UPRC (24000
+  one-character strings), the kind of file the memory-mapped bytes path of
+  read_finiteburn_file(use_mmap=True) is for. Each copy is about 230 kB.
+
+  Optional Args (type):
+    repeat:     (int) times the tables are written (later copies override
+                      earlier ones)
+    seed:       (int) random seed
+
+  Output:
+    text:       (str) namelist text
+  '''
+  rng   = random.Random(seed)
+  lines = []
+  for copy in range(repeat):
+    lines.append('! synthetic tables %i, copy %i'%(seed,copy))
+    lines.append(' SMFTIM(1) = %s'%(_values_lines(rng, [_float_str(rng, 1e6) for _ in range(1000)])))
+    lines.append(' SMFDR(1,1) = %s'%(_values_lines(rng, [_float_str(rng) for _ in range(3000)])))
+    lines.append(' SMFDV(1,1) = %s'%(_values_lines(rng, [_float_str(rng) for _ in range(3000)])))
+    lines.append(' UPRC(1) = %s'%(_values_lines(rng, ["'%s'"%(rng.choice('ABCXYZ')) for _ in range(24000)],
+                                                per_line=12)))
+  return '\n'.join(lines)+'\n'
+
+def write_tables(path, repeat=1, seed=0):
+  '''
+  write_tables(path, repeat=1, seed=0)
+
+  Description:
+    Write generate_tables() text to path.
+  '''
+  with open(path,'w') as ofid:
+    ofid.write(generate_tables(repeat, seed))
+  return path
+
+def write_namelist(path, size='medium', seed=0, invalid=False):
+  '''
+  write_namelist(path, size='medium', seed=0, invalid=False)
+
+  Description:
+    Write generate_namelist() text of one of the named sizes to path.
+  '''
+  burns, table, repeat = sizes[size]
+  with open(path,'w') as ofid:
+    ofid.write(generate_namelist(burns, table, repeat, seed, invalid=invalid))
+  return path
+
+class Rejected(Exception):
+  '''
+  Input that reference_read() does not accept, where the original reader
+  would have stopped.
+  '''
+
+def _reference_value(val_str, pdef):
+  # handle_data_type() of the original reader, with D exponents rewritten to E
+  dtype = pdef.dtype
+  if dtype.startswith('C'):
+    if len(val_str) < 2 or val_str[0] != "'" or val_str[-1] != "'":
+      raise Rejected('string value not fully contained in quotes: %s'%(val_str))
+    val = val_str[1:-1].replace('c',',')
+    if len(val) > int(dtype[1:]):
+      raise Rejected('string length exceeds max length: %s'%(val_str))
+    return val
+  try:
+    if dtype == 'DP':
+      return float(val_str.replace('D','E'))
+    elif dtype == 'SP':
+      return struct.unpack('f', struct.pack('f', float(val_str.replace('D','E'))))[0]
+    elif dtype == 'I':
+      return int(val_str)
+    return {'.TRUE.': True, '.FALSE.': False}[val_str]
+  except (ValueError, KeyError, OverflowError):
+    raise Rejected('invalid %s value: %s'%(dtype, val_str))
+
+def _reference_assignment(out, assignment):
+  # handle_assignment() of the original reader, storing into normalize() form.
+  # An empty value from the comma split is a null value, as is the n* of n*
+  # with no value after it.
+  if assignment == '':
+    return
+  lhs, rhs = assignment.split('=',1)
+  param = lhs.split('(')[0]
+  pdef  = gr.get_schema().get(param)
+  if pdef is None:
+    raise Rejected('invalid parameter %s'%(param))
+  if '(' in lhs:
+    if ')' not in lhs:
+      raise Rejected('no closing parenthesis: %s'%(lhs))
+    try:
+      indices = list(map(int, lhs.split('(')[1].split(')')[0].split(',')))
+    except ValueError:
+      raise Rejected('invalid indices: %s'%(lhs))
+    if len(indices) != len(pdef.dim):
+      raise Rejected('invalid dimensions for %s'%(param))
+  else:
+    indices = list(pdef.lower)
+  pos    = sum((idx-low)*stride for idx, low, stride in zip(indices, pdef.lower, pdef.strides))
+  values = out.setdefault((pdef.group, param), [None]*pdef.size)
+  # every rhs ends in an extra comma, so the last split is ignored
+  for val_str in rhs.split(',')[:-1]:
+    count = 1
+    if 'x' in val_str:
+      multiplier, val_str = val_str.split('x',1)
+      count = int(multiplier)
+    if val_str == '':
+      pos += count
+      continue
+    val = _reference_value(val_str, pdef)
+    for _ in range(count):
+      # values past the parameter's dimensions are trimmed off
+      if pos < pdef.size:
+        values[pos] = val
+      pos += 1
+
+def reference_read(lines):
+  '''
+  reference_read(lines)
+
+  Description:
+    Independent reference parser for the differential check: the line-based
+  reader this package started from, which strips every line of whitespace
+  and comments, joins and splits the statements with regular expressions and
+  splits each rhs on commas. D exponents are rewritten to E and empty values
+  are read as null values; anything else it did not handle raises Rejected.
+  Like the original reader, it uppercases whole lines, quoted strings
+  included.
+
+  Inputs:
+    lines:      (iterable) lines of namelist text
+
+  Output:
+    values:     (dict) parsed values in normalize() form
+  '''
+  out        = {}
+  assignment = ''
+  for line in lines:
+    line = line[:80].strip().upper()
+    if line == '':
+      continue
+    if line[0] == ';':
+      break
+    string_matches      = re.findall("'.*?'", line)
+    anti_string_matches = re.split("'.*?'", line)
+    # commas in strings become c and asterisks outside of them x, since the
+    # line is uppercase
+    line_clean = ''
+    for i, anti_string in enumerate(anti_string_matches):
+      anti_string = anti_string.replace(' ','').replace('\t','').replace('*','x')
+      if any(com in anti_string for com in ('!','#','$')):
+        line_clean += re.sub('[!#$].*', '', anti_string)
+        break
+      elif i == len(anti_string_matches)-1:
+        line_clean += anti_string
+      else:
+        if '=' not in anti_string and ',' not in anti_string and len(anti_string) > 0:
+          anti_string = ','+anti_string[1:]
+        line_clean += anti_string+string_matches[i].replace(',','c')
+    if line_clean == '':
+      continue
+    semicolon_exit = line_clean.endswith(';')
+    if semicolon_exit:
+      line_clean = line_clean[:-1]
+    if not line_clean.endswith(','):
+      line_clean += ','
+    if '=' in line_clean:
+      assignment_matches      = re.findall(',[A-Z].*?=', line_clean)
+      anti_assignment_matches = re.split(',[A-Z].*?=', line_clean)
+      for i, anti_assignment in enumerate(anti_assignment_matches):
+        if i == 0:
+          if '=' not in anti_assignment:
+            assignment += anti_assignment
+          else:
+            _reference_assignment(out, assignment)
+            assignment = anti_assignment
+        else:
+          _reference_assignment(out, assignment+',')
+          assignment = assignment_matches[i-1][1:]+anti_assignment
+    else:
+      assignment += line_clean
+    if semicolon_exit:
+      break
+  _reference_assignment(out, assignment)
+  # a parameter only given null values is never created
+  return {key: values for key, values in out.items() if any(val is not None for val in values)}
+
+def normalize(gin_dict):
+  '''
+  normalize(gin_dict)
+
+  Description:
+    Reduce a parsed gin_dict in any storage mode to {(group, param): values},
+  values being the flat list of the parameter's values with None where unset,
+  so results of different parsers can be compared directly.
+  '''
+  out = {}
+  for pdef, values, isset in gw.iter_param_values(gin_dict):
+    out[(pdef.group,pdef.name)] = [val if flag else None for val, flag in zip(values, isset.tolist())]
+  return out
+
+def first_difference(ref, res):
+  '''
+  first_difference(ref, res)
+
+  Description:
+    Describe the first difference between two normalize() results, or return
+  None if they are identical.
+  '''
+  for key in sorted(set(ref) | set(res)):
+    if key not in res:
+      return '%s %s missing'%(key)
+    if key not in ref:
+      return '%s %s not expected'%(key)
+    if ref[key] != res[key]:
+      for i, (a, b) in enumerate(zip(ref[key], res[key])):
+        if a != b:
+          return '%s %s flat index %i: expected %r, got %r'%(key+(i,a,b))
+      return '%s %s lengths differ'%(key)
+  return None
+
+def _cached_read(ginnl):
+  # cold then warm read through a throwaway cache directory, returning the warm result
+  cache_dir = tempfile.mkdtemp(prefix='ginnl_bench_')
+  try:
+    cache = ParseCache(cache_dir)
+    cache.read(ginnl)
+    return cache.read(ginnl)
+  finally:
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+def _written_read(ginnl):
+  # write the parsed result back out and read that instead
+  out = io.StringIO()
+  gw.write_finiteburn_file(gr.read_finiteburn_file(ginnl), out)
+  out.seek(0)
+  return gr.read_finiteburn_file(out)
+
+# Parsers checked against read_finiteburn_file() by the differential mode
+parsers = {'mmap':      lambda ginnl: gr.read_finiteburn_file(ginnl, use_mmap=True),
+           'arrays':    lambda ginnl: gr.read_finiteburn_file(ginnl, as_arrays=True),
+           'sparse':    lambda ginnl: gr.read_finiteburn_file(ginnl, as_arrays='sparse'),
+           'read_many': lambda ginnl: gr.read_many([ginnl], workers=1)[0].gin_dict,
+           'session':   lambda ginnl: gr.NamelistSession(ginnl).read(),
+           'cache':     _cached_read,
+           'writer':    _written_read}
+
+def differential_check(paths, candidates=None):
+  '''
+  differential_check(paths, candidates=None)
+
+  Description:
+    Parse every file with read_finiteburn_file(), collecting errors, and check
+  that:
+    - it matches reference_read() wherever the reference accepts the file,
+    - the statements on lines ending in ! invalid are exactly the ones
+      reported, the rest of the file still being read (these lines are left
+      out of the reference's input),
+    - each candidate parser gives the same result, on files without invalid
+      statements.
+
+  Inputs:
+    paths:      (list) namelist files to check
+
+  Optional Args (type):
+    candidates: (dict) {name: function(path) -> gin_dict}, defaults to parsers
+
+  Output:
+    failures:   (list) (name, path, description) for each mismatch, name being
+                       'baseline', 'errors' or the candidate's name
+  '''
+  if candidates is None:
+    candidates = parsers
+  failures = []
+  for path in paths:
+    with open(path,'r') as ifid:
+      lines = ifid.readlines()
+    invalid = [lnum for lnum, line in enumerate(lines, 1) if line.rstrip().endswith('! invalid')]
+    # trimming warnings are expected from some of the generated files
+    with contextlib.redirect_stdout(io.StringIO()):
+      errors = []
+      ref    = normalize(gr.read_finiteburn_file(path, errors=errors))
+      reported = sorted(set(err.line for err in errors))
+      if reported != invalid:
+        failures.append(('errors', path, 'invalid statements on lines %s, reported %s: %s'%(
+                         invalid, reported, '; '.join(map(str, errors)))))
+      try:
+        expected = reference_read(line for lnum, line in enumerate(lines, 1) if lnum not in invalid)
+      except Rejected:
+        expected = None
+      if expected is not None:
+        diff = first_difference(expected, ref)
+        if diff is not None:
+          failures.append(('baseline', path, diff))
+      if invalid:
+        continue
+      for name, parser in candidates.items():
+        try:
+          diff = first_difference(ref, normalize(parser(path)))
+        except gr.NamelistError as err:
+          diff = str(err)
+        if diff is not None:
+          failures.append((name, path, diff))
+  return failures
+
+def time_phases(path, repeat=5):
+  '''
+  time_phases(path, repeat=5)
+
+  Description:
+    Best wall time in seconds of each phase of reading path: reading the
+  lines, lexing, assembling and converting assignments, storing, and writing
+  the result back out.
+  '''
+  def phases():
+    start = time.perf_counter()
+    with open(path,'r') as ifid:
+      lines = ifid.readlines()
+    t_read = time.perf_counter()
+    tokens = list(gr.tokenize_namelist(lines))
+    t_lex = time.perf_counter()
+    assignments = [gr.parse_assignment(param, indices, rhs, lnum)
+                   for param, indices, rhs, lnum in gr.iter_statements(tokens)]
+    t_convert = time.perf_counter()
+    gin_dict = {}
+    for assignment in assignments:
+      gr.store_assignment(gin_dict, assignment)
+    t_store = time.perf_counter()
+    gw.write_finiteburn_file(gin_dict, io.StringIO())
+    t_write = time.perf_counter()
+    return {'read':    t_read-start,
+            'lex':     t_lex-t_read,
+            'convert': t_convert-t_lex,
+            'store':   t_store-t_convert,
+            'write':   t_write-t_store}
+  best = {}
+  with contextlib.redirect_stdout(io.StringIO()):
+    for _ in range(repeat):
+      for phase, secs in phases().items():
+        best[phase] = min(best.get(phase, secs), secs)
+  return best
+
+def peak_memory(path):
+  '''
+  peak_memory(path)
+
+  Description:
+    Peak traced Python memory in bytes while reading path in each storage mode.
+  '''
+  peaks = {}
+  modes = {'read':        lambda: gr.read_finiteburn_file(path),
+           'read arrays': lambda: gr.read_finiteburn_file(path, as_arrays=True),
+           'read sparse': lambda: gr.read_finiteburn_file(path, as_arrays='sparse'),
+           'read mmap':   lambda: gr.read_finiteburn_file(path, use_mmap=True, as_arrays=True)}
+  with contextlib.redirect_stdout(io.StringIO()):
+    for name, run in modes.items():
+      tracemalloc.start()
+      run()
+      peaks[name] = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+  return peaks
+
+def compare_mmap(path, repeat=5, as_arrays=True):
+  '''
+  compare_mmap(path, repeat=5, as_arrays=True)
+
+  Description:
+    Read path with the text and the memory-mapped bytes path of
+  read_finiteburn_file() in turn, returning {path name: (best wall time in
+  seconds, peak traced Python memory in bytes)} for 'text' and 'mmap'. The two
+  are timed alternately so drift on a busy machine affects both alike.
+  '''
+  modes = {'text': lambda: gr.read_finiteburn_file(path, as_arrays=as_arrays),
+           'mmap': lambda: gr.read_finiteburn_file(path, as_arrays=as_arrays, use_mmap=True)}
+  best  = {}
+  peaks = {}
+  with contextlib.redirect_stdout(io.StringIO()):
+    for _ in range(repeat):
+      for name, run in modes.items():
+        start = time.perf_counter()
+        run()
+        secs  = time.perf_counter()-start
+        best[name] = min(best.get(name, secs), secs)
+    for name, run in modes.items():
+      tracemalloc.start()
+      run()
+      peaks[name] = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+  return {name: (best[name], peaks[name]) for name in modes}
+
+# seconds importing ginnl_reader may take on its own, i.e. not counting numpy and
+# the standard library, which any use of it needs anyway
+import_budget = 0.020
+
+def import_time(module='ginnl_reader'):
+  '''
+  import_time(module='ginnl_reader')
+
+  Description:
+    Seconds taken to import module in a fresh interpreter, as
+  (own, total): own is the time spent in the module itself and total includes
+  everything it imports, as reported by python -X importtime.
+  '''
+  env  = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+  proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s'%(module)],
+                        env=env, capture_output=True, text=True, check=True)
+  for line in proc.stderr.splitlines():
+    fields = line.split('|')
+    if len(fields) == 3 and fields[2].strip() == module:
+      own   = int(fields[0].split(':')[1])
+      total = int(fields[1])
+  return own*1e-6, total*1e-6
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark and differential check of the gin namelist reader')
+  parser.add_argument('--sizes', nargs='+', default=['small','medium','large'], choices=sorted(sizes))
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--repeat', type=int, default=5, help='timing repeats, best is reported')
+  parser.add_argument('--diff', type=int, default=0, metavar='N',
+                      help='differential check N seeds of every size instead of timing')
+  parser.add_argument('--files', nargs='*', default=[], help='existing namelist files to include')
+  parser.add_argument('--tables', type=int, nargs='*', default=[1, 10], metavar='COPIES',
+                      help='also compare the text and mmap paths on generate_tables() files of '\
+                           'these many copies')
+  args = parser.parse_args(argv)
+
+  workdir = tempfile.mkdtemp(prefix='ginnl_bench_')
+  try:
+    if args.diff:
+      paths = list(args.files)
+      for size in args.sizes:
+        for seed in range(args.seed, args.seed+args.diff):
+          paths.append(write_namelist(os.path.join(workdir,'%s_%i.nl'%(size,seed)), size, seed))
+          paths.append(write_namelist(os.path.join(workdir,'%s_%i_invalid.nl'%(size,seed)),
+                                      size, seed, invalid=True))
+      for seed in range(args.seed, args.seed+args.diff):
+        paths.append(write_tables(os.path.join(workdir,'tables_%i.nl'%(seed)), 1, seed))
+      failures = differential_check(paths)
+      for name, path, diff in failures:
+        print('MISMATCH %-10s %s: %s'%(name, os.path.basename(path), diff))
+      print('%i files, %i parsers, %i mismatches'%(len(paths), len(parsers), len(failures)))
+      return 1 if failures else 0
+
+    own, total = import_time()
+    print('import ginnl_reader %.2f ms (budget %.0f ms), %.2f ms with its imports'%(
+          own*1e3, import_budget*1e3, total*1e3))
+    paths = [(os.path.basename(path), path) for path in args.files]
+    for size in args.sizes:
+      paths.append((size, write_namelist(os.path.join(workdir,'%s.nl'%(size)), size, args.seed)))
+    for name, path in paths:
+      kbytes = os.path.getsize(path)/1024.
+      times  = time_phases(path, args.repeat)
+      peaks  = peak_memory(path)
+      print('%s (%.0f KiB)'%(name, kbytes))
+      for phase, secs in times.items():
+        print('  %-12s %9.2f ms'%(phase, secs*1e3))
+      for mode, peak in peaks.items():
+        print('  peak %-12s %7.0f KiB'%(mode, peak/1024.))
+    for copies in args.tables:
+      path   = write_tables(os.path.join(workdir,'tables_%i.nl'%(copies)), copies, args.seed)
+      kbytes = os.path.getsize(path)/1024.
+      print('tables x%i (%.0f KiB)'%(copies, kbytes))
+      for mode, (secs, peak) in compare_mmap(path, args.repeat).items():
+        print('  read %-7s %9.2f ms  peak %7.0f KiB'%(mode, secs*1e3, peak/1024.))
+    return 0
+  finally:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+  sys.exit(main())
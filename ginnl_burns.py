@@ -0,0 +1,504 @@
+import numpy as np
+
+from bisect import bisect_left, bisect_right
+
+from ginnl_reader import get_schema, iter_param_values, numpy_dtype, ParamArray
+
+def burn_params(group='FINITE-BURNS'):
+  '''
+  burn_params(group='FINITE-BURNS')
+
+  Description:
+    Definitions of the parameters of an indexed group that are indexed by burn,
+  i.e. whose last dimension matches that of BURN, in schema order. Parameters
+  of the group with a different last dimension (e.g. SEVENT) are not per-burn
+  values.
+
+  Optional Args (type):
+    group:    (str) MIRAGE group name
+
+  Output:
+    pdefs:    (list) ParamDef of each per-burn parameter
+  '''
+  pdefs = [pdef for pdef in get_schema().values() if pdef.group == group]
+  burn  = get_schema().get('BURN')
+  if burn is not None and burn.group == group:
+    last = (burn.dim[-1], burn.lower[-1])
+  else:
+    last = (pdefs[0].dim[-1], pdefs[0].lower[-1])
+  return [pdef for pdef in pdefs if (pdef.dim[-1], pdef.lower[-1]) == last]
+
+class BurnTable(object):
+  '''
+  BurnTable(index, columns, isset)
+
+  Description:
+    Columnar view of the FINITE-BURNS group, as made by burn_table(). Row i of
+  every column is burn index[i], so bulk filters and aggregations across burns
+  are plain numpy operations:
+    table.index[table.isset['DELV'] & (table.DELV > 1.0)]
+    table.C3[table.isset['C3']].sum()
+  Columns are also available as attributes.
+
+  Inputs:
+    index:    (ndarray) burn number of each row
+    columns:  (dict) {param: ndarray}, shape (burns,) for scalar parameters and
+                     (burns, n, ...) for the rest, e.g. MA1A is (99, 10). The
+                     other indices keep their namelist order, so
+                     TVDORA[b,i-1,j-1] is TVDORA(i,j,index[b]).
+    isset:    (dict) {param: bool ndarray} of the same shapes, marking the
+                     values that were assigned
+  '''
+  def __init__(self, index, columns, isset):
+    self.index   = index
+    self.columns = columns
+    self.isset   = isset
+    # a burn is present when any of its values was assigned
+    present = np.zeros(len(index), dtype=np.bool_)
+    for mask in isset.values():
+      present |= mask.reshape(len(index), -1).any(axis=1)
+    self.present = present
+
+  def __getattr__(self, name):
+    # only called for names that are not regular attributes
+    columns = self.__dict__.get('columns', {})
+    if name in columns:
+      return columns[name]
+    raise AttributeError('%s has no column %s'%(type(self).__name__, name))
+
+  def __len__(self):
+    return len(self.index)
+
+  def __repr__(self):
+    return 'BurnTable(%i rows, %i present, columns=%s)'%(len(self.index), np.count_nonzero(self.present),
+                                                       ','.join(self.columns))
+
+  def select(self, rows):
+    '''
+    select(self, rows)
+
+    Description:
+      Table of only the given rows, e.g. table.select(table.present).
+
+    Inputs:
+      rows:   (ndarray) boolean mask or integer positions of the rows to keep
+    '''
+    return BurnTable(self.index[rows],
+                     {param: col[rows] for param, col in self.columns.items()},
+                     {param: mask[rows] for param, mask in self.isset.items()})
+
+def burn_table(gin_dict, fill=None, group='FINITE-BURNS'):
+  '''
+  burn_table(gin_dict, fill=None, group='FINITE-BURNS')
+
+  Description:
+    Export the FINITE-BURNS group of a parsed gin_dict, in either storage
+  mode, as a BurnTable with one row per possible burn and one column per
+  per-burn parameter (see burn_params()). Every per-burn parameter gets a
+  column whether or not it was assigned, so queries do not depend on what a
+  particular file contains. The arrays are copies and are not affected by
+  later changes to gin_dict.
+
+  Inputs:
+    gin_dict: (dict) parsed namelist data
+
+  Optional Args (type):
+    fill:     (float) value for unassigned entries of floating point columns,
+                      e.g. np.nan so they drop out of nan-aware aggregations.
+                      Unassigned entries are otherwise zero (blank for strings).
+    group:    (str) indexed group to export
+
+  Output:
+    table:    (BurnTable) columnar burn data
+  '''
+  pdefs    = burn_params(group)
+  data     = gin_dict.get(group)
+  assigned = {}
+  if data is not None and not isinstance(data, dict):
+    # array-backed storage already holds the flat values and their mask
+    for name, arr in data.__dict__.items():
+      if isinstance(arr, ParamArray):
+        assigned[name] = (arr._flat, arr._mask)
+  elif data is not None:
+    for pdef, values, isset in iter_param_values({group: data}):
+      assigned[pdef.name] = (values, isset)
+
+  columns = {}
+  masks   = {}
+  for pdef in pdefs:
+    col   = np.zeros(pdef.size, dtype=numpy_dtype(pdef.dtype))
+    mask  = np.zeros(pdef.size, dtype=np.bool_)
+    if pdef.name in assigned:
+      values, isset = assigned[pdef.name]
+      mask[:] = isset
+      if isinstance(values, np.ndarray):
+        col[mask] = values[mask]
+      else:
+        col[mask] = [val for val, flag in zip(values, isset.tolist()) if flag]
+    if fill is not None and col.dtype.kind == 'f':
+      col[~mask] = fill
+    # rows are the last dimension, moved to the front, e.g. MA1A (10,99) becomes (99,10)
+    columns[pdef.name] = np.ascontiguousarray(np.moveaxis(col.reshape(pdef.dim, order='F'), -1, 0))
+    masks[pdef.name]   = np.ascontiguousarray(np.moveaxis(mask.reshape(pdef.dim, order='F'), -1, 0))
+
+  low   = pdefs[0].lower[-1]
+  index = np.arange(low, low+pdefs[0].dim[-1])
+  return BurnTable(index, columns, masks)
+
+def _is_scalar(times):
+  # plain floats are checked first, np.ndim() costs more than the lookup itself
+  return isinstance(times, (float, int)) or np.ndim(times) == 0
+
+class BurnIndex(object):
+  '''
+  BurnIndex(burns, starts, ends, unresolved=None)
+
+  Description:
+    Burns sorted by start epoch for fast time lookups, as made by
+  burn_index(). A burn is active from its start to its end inclusive. The
+  queries taking times accept a single time or an array of times; arrays are
+  answered with one searchsorted call and single times with bisect, which is
+  faster for a scalar. Queries giving one burn per time use 0 for no burn.
+
+  Inputs:
+    burns:      (ndarray) burn numbers
+    starts:     (ndarray) start epoch of each burn, seconds past the reference epoch
+    ends:       (ndarray) end epoch of each burn
+
+  Optional Args (type):
+    unresolved: (ndarray) burns that were assigned but have no known start
+  '''
+  def __init__(self, burns, starts, ends, unresolved=None):
+    order       = np.lexsort((burns, starts))
+    self.burns  = np.asarray(burns, dtype=np.int64)[order]
+    self.starts = np.asarray(starts, dtype=np.float64)[order]
+    self.ends   = np.asarray(ends, dtype=np.float64)[order]
+    self.unresolved = np.asarray([] if unresolved is None else unresolved, dtype=np.int64)
+    # latest end of any burn up to each position; once it is before t no
+    # earlier burn can be active at t
+    self._reach    = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+    # no burn starts before the previous one has ended, so at most one is active
+    self._disjoint = bool(np.all(self.ends[:-1] < self.starts[1:]))
+    # plain lists for bisect on single times
+    self._start_list = self.starts.tolist()
+    self._end_list   = self.ends.tolist()
+    self._burn_list  = self.burns.tolist()
+    self._reach_list = self._reach.tolist()
+
+  def __len__(self):
+    return len(self.burns)
+
+  def __repr__(self):
+    return 'BurnIndex(%i burns, %i unresolved)'%(len(self.burns), len(self.unresolved))
+
+  def starting_between(self, t0, t1):
+    '''
+    starting_between(self, t0, t1)
+
+    Description:
+      Burns starting in the window t0 <= start < t1, in order of start.
+    '''
+    lo = bisect_left(self._start_list, t0)
+    hi = bisect_left(self._start_list, t1, lo)
+    return self.burns[lo:hi]
+
+  def count_starting_between(self, t0, t1):
+    '''
+    count_starting_between(self, t0, t1)
+
+    Description:
+      Number of burns starting in each window t0 <= start < t1, for single
+    times or arrays of window bounds.
+    '''
+    return np.searchsorted(self.starts, t1, 'left')-np.searchsorted(self.starts, t0, 'left')
+
+  def active(self, t):
+    '''
+    active(self, t)
+
+    Description:
+      Every burn active at the single time t, in order of start.
+    '''
+    found = []
+    j     = bisect_right(self._start_list, t)-1
+    while j >= 0 and self._reach_list[j] >= t:
+      if self._end_list[j] >= t:
+        found.append(self._burn_list[j])
+      j -= 1
+    return np.array(found[::-1], dtype=np.int64)
+
+  def active_at(self, times):
+    '''
+    active_at(self, times)
+
+    Description:
+      Burn active at each time, 0 where none is. Where burns overlap, the one
+    that started last.
+
+    Inputs:
+      times:    (float or ndarray) epochs, seconds past the reference epoch
+
+    Output:
+      burns:    (int or ndarray) burn number for each time
+    '''
+    if _is_scalar(times):
+      j = bisect_right(self._start_list, times)-1
+      while j >= 0 and self._reach_list[j] >= times:
+        if self._end_list[j] >= times:
+          return self._burn_list[j]
+        j -= 1
+      return 0
+    times = np.asarray(times, dtype=np.float64)
+    if not len(self.burns):
+      return np.zeros(times.shape, dtype=np.int64)
+    last  = np.searchsorted(self.starts, times, 'right')-1
+    valid = last >= 0
+    pos   = np.where(valid, last, 0)
+    hit   = valid & (self.ends[pos] >= times)
+    found = np.where(hit, self.burns[pos], 0)
+    if not self._disjoint:
+      # an earlier, longer burn can still be active after a later one ended
+      for k in np.flatnonzero(valid & ~hit & (self._reach[pos] >= times)).tolist():
+        found[k] = self.active_at(times[k].item())
+    return found
+
+  def next_burn(self, times):
+    '''
+    next_burn(self, times)
+
+    Description:
+      First burn starting after each time, 0 where there is none.
+    '''
+    if _is_scalar(times):
+      k = bisect_right(self._start_list, times)
+      return self._burn_list[k] if k < len(self._burn_list) else 0
+    k = np.searchsorted(self.starts, times, 'right')
+    return np.append(self.burns, 0)[k]
+
+  def previous_burn(self, times):
+    '''
+    previous_burn(self, times)
+
+    Description:
+      Last burn starting at or before each time, including a burn starting
+    exactly at the time or still active at it; 0 where there is none.
+    '''
+    if _is_scalar(times):
+      k = bisect_right(self._start_list, times)
+      return self._burn_list[k-1] if k > 0 else 0
+    k = np.searchsorted(self.starts, times, 'right')
+    return np.append(0, self.burns)[k]
+
+def burn_index(gin_dict, ma1t_seconds=None):
+  '''
+  burn_index(gin_dict, ma1t_seconds=None)
+
+  Description:
+    Build a BurnIndex of the burns of a parsed gin_dict (or of a BurnTable
+  from burn_table()). A burn starts at DMA1, or at MA1T where DMA1 was not
+  assigned and ma1t_seconds is given. It ends MA1D seconds later when MA1D is
+  assigned and BURN is 1 (or not assigned), since MA1D is only the duration
+  of duration-type burns; otherwise its end is its start. Burns with no known
+  start are listed in the index's unresolved.
+
+  Inputs:
+    gin_dict:     (dict or BurnTable) parsed namelist data
+
+  Optional Args (type):
+    ma1t_seconds: (function) converts an MA1T calendar string
+                             ('DD-MMM-YYYY hh:mm:ss.ffffffff TYP') to seconds
+                             past the reference epoch. Needed for MA1T since
+                             the reference epoch and time systems are not part
+                             of the namelist.
+
+  Output:
+    index:        (BurnIndex) burns sorted by start
+  '''
+  table = gin_dict if isinstance(gin_dict, BurnTable) else burn_table(gin_dict)
+  start = table.DMA1.astype(np.float64)
+  known = table.isset['DMA1'].copy()
+  if ma1t_seconds is not None:
+    for row in np.flatnonzero(table.isset['MA1T'] & ~known).tolist():
+      start[row] = ma1t_seconds(str(table.MA1T[row]))
+      known[row] = True
+  timed    = table.isset['MA1D'] & (~table.isset['BURN'] | (table.BURN == 1))
+  duration = np.where(timed, table.MA1D, 0.0)
+  return BurnIndex(table.index[known], start[known], start[known]+duration[known],
+                   unresolved=table.index[table.present & ~known])
+
+def _polyval(coef, tau):
+  # Horner evaluation of one polynomial per row of coef (lowest degree first)
+  # at tau, which is (T,) for the same times for every row or (B,T)
+  tau = np.asarray(tau, dtype=np.float64)
+  if tau.ndim < 2:
+    tau = tau[np.newaxis]
+  out = np.broadcast_to(coef[:, -1, np.newaxis], np.broadcast(coef[:, :1], tau).shape).copy()
+  for j in range(coef.shape[1]-2, -1, -1):
+    out *= tau
+    out += coef[:, j, np.newaxis]
+  return out
+
+def _polyint(coef):
+  # coefficients of the integral from 0 of each row's polynomial
+  powers = np.arange(1, coef.shape[1]+1, dtype=np.float64)
+  return np.concatenate((np.zeros((coef.shape[0],1)), coef/powers), axis=1)
+
+def _spacecraft_mass(gin_dict):
+  # SPACECRAFT MASS from either storage mode, None if it was not assigned
+  data = gin_dict.get('SPACECRAFT')
+  if data is None:
+    return None
+  for pdef, values, isset in iter_param_values({'SPACECRAFT': data}):
+    if pdef.name == 'MASS' and isset[0]:
+      return float(values[0])
+  return None
+
+class BurnModel(object):
+  '''
+  BurnModel(gin_dict, mass=None, durations=None, k=None)
+
+  Description:
+    Evaluator of the finite burn polynomial models for every burn at once. Times
+  are seconds past the start of each burn (tau). Every method takes tau as a
+  (T,) array shared by all burns, or as a (B,T) array with a row per burn, and
+  returns one row per burn in the order of burns:
+    thrust         F(tau)    = sum MA1F(j) tau^(j-1), j=1-5, in force units
+    mass_flow      mdot(tau) = sum MA1M(j) tau^(j-1), j=1-4, in kg/sec
+    mass           M(tau)    = M0 - integral of mdot from 0 to tau
+    acceleration   a(tau)    = MA1K F(tau)/M(tau), in km/sec^2
+    direction      unit thrust vector from the right ascension (MA1A(1-5)) and
+                   declination (MA1A(6-10)) polynomials in degrees, in the
+                   COORS system. Burns under gyro control, whose MA1A hold
+                   spacecraft coordinates instead, are not interpreted.
+  delta_v() and mass_used() integrate over each burn's duration. Polynomials
+  are evaluated with Horner's rule over the coefficient index, so the work
+  for all burns is a handful of numpy operations.
+
+  Inputs:
+    gin_dict:   (dict or BurnTable) parsed namelist data
+
+  Optional Args (type):
+    mass:       (float or ndarray) mass in kg at the start of each burn. A
+                single value is the mass at the start of the first burn, and
+                later burns start with what the earlier ones left. Defaults to
+                SPACECRAFT MASS; NaN if that was not assigned either.
+    durations:  (ndarray) duration of each burn in seconds. Defaults to MA1D
+                for burns cut off by duration (BURN 1, or not assigned), and
+                NaN for burns cut off by delta-V or C3, whose duration is not
+                known until they are propagated.
+    k:          (float or ndarray) MA1K of the burns that do not assign it.
+                There is no default scaling: acceleration() and delta_v()
+                raise ValueError if a burn has neither.
+  '''
+  def __init__(self, gin_dict, mass=None, durations=None, k=None):
+    table = gin_dict if isinstance(gin_dict, BurnTable) else burn_table(gin_dict)
+    rows  = table.present
+    # burns without any assigned coefficients evaluate to zero
+    self.burns  = table.index[rows]
+    self.thrust_coef = table.MA1F[rows].astype(np.float64)
+    self.flow_coef   = table.MA1M[rows].astype(np.float64)
+    self.angle_coef  = table.MA1A[rows].astype(np.float64)
+    if k is None:
+      k = np.nan
+    self.k      = np.where(table.isset['MA1K'][rows], table.MA1K[rows], k).astype(np.float64)
+    self.starts = np.where(table.isset['DMA1'][rows], table.DMA1[rows], np.nan)
+    if durations is None:
+      timed     = table.isset['MA1D'] & (~table.isset['BURN'] | (table.BURN == 1))
+      durations = np.where(timed, table.MA1D, np.nan)[rows]
+    self.durations = np.broadcast_to(np.asarray(durations, dtype=np.float64), self.burns.shape).copy()
+
+    if mass is None and not isinstance(gin_dict, BurnTable):
+      mass = _spacecraft_mass(gin_dict)
+    if mass is None:
+      mass = np.nan
+    if np.ndim(mass) == 0:
+      # burns take their mass in order of start, those without DMA1 last, by number
+      order = np.lexsort((self.burns, np.where(np.isnan(self.starts), np.inf, self.starts)))
+      used  = np.nan_to_num(self.mass_used())[order]
+      start_mass = np.empty(len(self.burns))
+      start_mass[order] = mass-np.concatenate(([0.0], np.cumsum(used)[:-1]))
+      mass = start_mass
+    self.start_mass = np.broadcast_to(np.asarray(mass, dtype=np.float64), self.burns.shape).copy()
+
+  def __len__(self):
+    return len(self.burns)
+
+  def __repr__(self):
+    return 'BurnModel(%i burns)'%(len(self.burns))
+
+  def tau(self, epochs):
+    '''
+    tau(self, epochs)
+
+    Description:
+      Convert epochs (seconds past the reference epoch) to seconds past the
+    start of each burn.
+
+    Inputs:
+      epochs:   (ndarray) (T,) epochs
+
+    Output:
+      tau:      (ndarray) (B,T) seconds past each burn's start
+      active:   (ndarray) (B,T) True where the burn is running at that epoch
+    '''
+    tau    = np.asarray(epochs, dtype=np.float64)[np.newaxis]-self.starts[:, np.newaxis]
+    with np.errstate(invalid='ignore'):
+      active = (tau >= 0) & (tau <= self.durations[:, np.newaxis])
+    return tau, active
+
+  def thrust(self, tau):
+    return _polyval(self.thrust_coef, tau)
+
+  def mass_flow(self, tau):
+    return _polyval(self.flow_coef, tau)
+
+  def mass(self, tau):
+    return self.start_mass[:, np.newaxis]-_polyval(_polyint(self.flow_coef), tau)
+
+  def acceleration(self, tau):
+    missing = np.isnan(self.k)
+    if missing.any():
+      raise ValueError('MA1K is not assigned for burn(s) %s; pass k to BurnModel'
+                       %(', '.join(str(burn) for burn in self.burns[missing].tolist())))
+    return self.k[:, np.newaxis]*self.thrust(tau)/self.mass(tau)
+
+  def direction(self, tau):
+    '''
+    direction(self, tau)
+
+    Description:
+      Unit thrust vectors, (B,T,3), from the right ascension and declination
+    polynomials.
+    '''
+    alpha = np.radians(_polyval(self.angle_coef[:, :5], tau))
+    delta = np.radians(_polyval(self.angle_coef[:, 5:], tau))
+    cos_delta = np.cos(delta)
+    return np.stack((cos_delta*np.cos(alpha), cos_delta*np.sin(alpha), np.sin(delta)), axis=-1)
+
+  def mass_used(self):
+    '''
+    mass_used(self)
+
+    Description:
+      Mass in kg used by each burn over its duration, NaN where the duration
+    is not known.
+    '''
+    return _polyval(_polyint(self.flow_coef), self.durations[:, np.newaxis])[:, 0]
+
+  def delta_v(self, nodes=16):
+    '''
+    delta_v(self, nodes=16)
+
+    Description:
+      Velocity change in km/sec from each burn over its duration, the
+    integral of acceleration() by Gauss-Legendre quadrature. NaN where the
+    duration or mass is not known.
+
+    Optional Args (type):
+      nodes:    (int) quadrature nodes per burn; the thrust and mass are
+                      polynomials, so a few are already accurate
+    '''
+    x, w = np.polynomial.legendre.leggauss(nodes)
+    half = self.durations[:, np.newaxis]/2
+    tau  = half*(x[np.newaxis]+1)
+    return (half*w[np.newaxis]*self.acceleration(tau)).sum(axis=1)
@@ -0,0 +1,177 @@
+import os
+import io
+import pickle
+import hashlib
+import tempfile
+
+from ginnl_reader import read_finiteburn_file, schema_version, NamelistError
+
+class ParseCache(object):
+  '''
+  ParseCache(cache_dir=None, max_bytes=256*1024**2)
+
+  Description:
+    Opt-in on-disk cache of read_finiteburn_file() results. Entries are keyed
+  by a hash of the file contents together with the reader's schema_version()
+  and the storage mode, so an edited file or a change to the MIRAGE
+  definitions is simply a miss. Each entry is the pickled gin_dict in its own
+  file under cache_dir. Once the
+  directory grows past max_bytes the least recently used entries are removed.
+
+    Several processes can share one cache_dir: entries are written to a
+  temporary file and renamed into place, and an entry that disappears while
+  being read or evicted is treated as a miss.
+
+  Optional Args (type):
+    cache_dir:  (str) directory holding the cache entries, defaults to
+                      ~/.cache/ginnl
+    max_bytes:  (int) size the cache directory is trimmed back to after a write
+  '''
+  suffix = '.pkl'
+
+  def __init__(self, cache_dir=None, max_bytes=256*1024**2):
+    if cache_dir is None:
+      cache_dir = os.path.join(os.path.expanduser('~'),'.cache','ginnl')
+    self.cache_dir = cache_dir
+    self.max_bytes = max_bytes
+    self.hits      = 0
+    self.misses    = 0
+    os.makedirs(cache_dir, exist_ok=True)
+    # computed once, the schema cannot change within a process
+    self._version  = schema_version()
+
+  def key(self, data, as_arrays=False):
+    '''
+    key(self, data, as_arrays=False)
+
+    Description:
+      Cache key for the raw bytes of a namelist file read in the given storage
+    mode.
+    '''
+    digest = hashlib.blake2b(data, digest_size=20)
+    digest.update(self._version.encode())
+    digest.update(repr(as_arrays).encode())
+    return digest.hexdigest()
+
+  def _entry(self, key):
+    return os.path.join(self.cache_dir, key+self.suffix)
+
+  def read(self, ginnl, as_arrays=False):
+    '''
+    read(self, ginnl, as_arrays=False)
+
+    Description:
+      Cached equivalent of read_finiteburn_file(ginnl, as_arrays). The file is
+    read once; on a miss its contents are parsed and the result is added to the
+    cache. Each storage mode is cached as an entry of its own.
+
+    Inputs:
+      ginnl:    (str) path to the namelist file
+
+    Optional Args (type):
+      as_arrays:  (bool or str) storage mode, as in read_finiteburn_file()
+
+    Output:
+      gin_dict: (dict) parsed namelist data
+    '''
+    if not os.path.exists(ginnl):
+      raise NamelistError('gin namelist file provided does not exist', file=ginnl)
+    with open(ginnl,'rb') as ifid:
+      data = ifid.read()
+    key   = self.key(data, as_arrays)
+    entry = self._entry(key)
+    
+    try:
+      with open(entry,'rb') as cfid:
+        gin_dict = pickle.load(cfid)
+      if not isinstance(gin_dict, dict):
+        raise TypeError('cache entry is not a gin_dict')
+    except OSError:
+      pass
+    except Exception:
+      # a truncated entry, or one pickled by an incompatible version of the
+      # reader, can fail in any number of ways; drop it and parse again
+      self._remove(entry)
+    else:
+      self.hits += 1
+      # mark as recently used for LRU eviction
+      try:
+        os.utime(entry)
+      except OSError:
+        pass
+      return gin_dict
+    
+    self.misses += 1
+    try:
+      # decoded as open(ginnl,'r') would, so a miss parses the same text as an
+      # uncached read
+      gin_dict = read_finiteburn_file(io.TextIOWrapper(io.BytesIO(data)), as_arrays=as_arrays)
+    except NamelistError as err:
+      # the contents were parsed from memory, so the error has no file yet
+      raise err.locate(file=ginnl)
+    self._write(entry, gin_dict)
+    self.evict()
+    return gin_dict
+
+  def _remove(self, entry):
+    try:
+      os.remove(entry)
+    except FileNotFoundError:
+      pass
+
+  def _write(self, entry, gin_dict):
+    # write to a temporary file in the same directory and rename it into place so
+    # other processes never see a partially written entry
+    fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+    try:
+      with os.fdopen(fd,'wb') as cfid:
+        pickle.dump(gin_dict, cfid, protocol=pickle.HIGHEST_PROTOCOL)
+      os.replace(tmp, entry)
+    except BaseException:
+      try:
+        os.remove(tmp)
+      except OSError:
+        pass
+      raise
+
+  def evict(self):
+    '''
+    evict(self)
+
+    Description:
+      Remove the least recently used entries until the cache directory is
+    within max_bytes.
+    '''
+    entries = []
+    total   = 0
+    with os.scandir(self.cache_dir) as it:
+      for dirent in it:
+        if not dirent.name.endswith(self.suffix):
+          continue
+        try:
+          st = dirent.stat()
+        except OSError:
+          continue
+        entries.append((st.st_mtime_ns, st.st_size, dirent.path))
+        total += st.st_size
+    if total <= self.max_bytes:
+      return
+    entries.sort()
+    for mtime, size, path in entries:
+      # an entry already evicted by another process is simply skipped
+      self._remove(path)
+      total -= size
+      if total <= self.max_bytes:
+        break
+
+  def clear(self):
+    '''
+    clear(self)
+
+    Description:
+      Remove every entry from the cache directory.
+    '''
+    with os.scandir(self.cache_dir) as it:
+      for dirent in it:
+        if dirent.name.endswith(self.suffix):
+          self._remove(dirent.path)
@@ -0,0 +1,188 @@
+import numpy as np
+import sys
+import argparse
+
+from collections import namedtuple
+
+from ginnl_reader import get_schema, indexed_groups, numpy_dtype, param_arrays, \
+                         read_finiteburn_file, NamelistError
+from ginnl_writer import format_value
+
+# kind of each difference in a ParamDiff
+CHANGED = 0
+ADDED   = 1
+REMOVED = 2
+change_kinds = ('changed', 'added', 'removed')
+
+class ParamDiff(namedtuple('ParamDiff', ['pdef','flat','kind','old','new'])):
+  '''
+  ParamDiff(pdef, flat, kind, old, new)
+
+  Description:
+    Every difference in one parameter between two parsed namelists, as
+  parallel arrays with one entry per differing value:
+    flat:   0-based flat (Fortran order) positions
+    kind:   CHANGED (assigned in both, different), ADDED (only assigned in
+            new) or REMOVED (only assigned in old)
+    old:    values in the old namelist, zero/blank where not assigned
+    new:    values in the new namelist, zero/blank where not assigned
+  '''
+  __slots__ = ()
+
+  @property
+  def indices(self):
+    '''
+    (n, ndim) array of the namelist indices of each difference.
+    '''
+    unraveled = np.unravel_index(self.flat, self.pdef.dim, order='F')
+    return np.column_stack(unraveled)+np.array(self.pdef.lower)
+
+  @property
+  def burns(self):
+    '''
+    Index of the last dimension (e.g. burn number) of each difference for
+    parameters of indexed groups such as FINITE-BURNS, None otherwise.
+    '''
+    if self.pdef.group not in indexed_groups:
+      return None
+    return self.flat//self.pdef.strides[-1]+self.pdef.lower[-1]
+
+  @property
+  def delta(self):
+    '''
+    new-old of each numeric difference, NaN unless it is CHANGED. None for
+    logical and character parameters.
+    '''
+    if self.pdef.dtype not in ('DP','SP','I'):
+      return None
+    delta = self.new.astype(np.float64)-self.old.astype(np.float64)
+    delta[self.kind != CHANGED] = np.nan
+    return delta
+
+  def rows(self):
+    '''
+    rows(self)
+
+    Description:
+      Generate (lhs, kind, old, new) for each difference, lhs being e.g.
+    MA1A(3,2) and old/new the values as namelist text (None where not
+    assigned), in flat order.
+    '''
+    dtype = self.pdef.dtype
+    for idx, kind, old, new in zip(self.indices.tolist(), self.kind.tolist(),
+                                   self.old.tolist(), self.new.tolist()):
+      lhs = '%s(%s)'%(self.pdef.name, ','.join(map(str, idx)))
+      yield (lhs, change_kinds[kind],
+             None if kind == ADDED else format_value(old, dtype),
+             None if kind == REMOVED else format_value(new, dtype))
+
+def diff_namelists(old, new, rtol=0.0, atol=0.0, tolerances=None, groups=None):
+  '''
+  diff_namelists(old, new, rtol=0.0, atol=0.0, tolerances=None, groups=None)
+
+  Description:
+    Semantic difference between two parsed namelists. Values are compared as
+  stored, so formatting, comments, statement order, n*value repeats and
+  assignments that are later overridden make no difference. Each parameter is
+  compared as whole arrays at once. Floats are equal when
+  |new-old| <= atol + rtol*|old|, as numpy.isclose() (NaNs equal); every
+  other type must match exactly.
+
+  Inputs:
+    old:        (dict) parsed namelist data, either storage mode
+    new:        (dict) parsed namelist data, either storage mode
+
+  Optional Args (type):
+    rtol:       (float) relative tolerance for DP and SP values
+    atol:       (float) absolute tolerance for DP and SP values
+    tolerances: (dict) {param: (rtol, atol)} overriding the tolerances for
+                       single parameters
+    groups:     (list) only compare these groups
+
+  Output:
+    diffs:      (list) ParamDiff of every parameter with differences, in
+                       MIRAGE definition order
+  '''
+  old_arrays = param_arrays(old)
+  new_arrays = param_arrays(new)
+  tolerances = tolerances or {}
+  diffs      = []
+  for name, pdef in get_schema().items():
+    if groups is not None and pdef.group not in groups:
+      continue
+    old_side = old_arrays.get(name)
+    new_side = new_arrays.get(name)
+    if old_side is None and new_side is None:
+      continue
+    dtype = numpy_dtype(pdef.dtype)
+    if old_side is None:
+      old_side = (np.zeros(pdef.size, dtype=dtype), np.zeros(pdef.size, dtype=np.bool_))
+    if new_side is None:
+      new_side = (np.zeros(pdef.size, dtype=dtype), np.zeros(pdef.size, dtype=np.bool_))
+    old_vals, old_set = old_side
+    new_vals, new_set = new_side
+    both = old_set & new_set
+    if pdef.dtype in ('DP','SP'):
+      param_rtol, param_atol = tolerances.get(name, (rtol, atol))
+      differ = ~np.isclose(new_vals, old_vals, rtol=param_rtol, atol=param_atol, equal_nan=True)
+    else:
+      differ = new_vals != old_vals
+    changed = both & differ
+    flat    = np.flatnonzero(changed | (old_set != new_set))
+    if not len(flat):
+      continue
+    kind = np.where(changed[flat], CHANGED, np.where(new_set[flat], ADDED, REMOVED)).astype(np.int8)
+    diffs.append(ParamDiff(pdef, flat, kind, old_vals[flat], new_vals[flat]))
+  return diffs
+
+def diff_files(old_path, new_path, **kwargs):
+  '''
+  diff_files(old_path, new_path, **kwargs)
+
+  Description:
+    diff_namelists() of two namelist files, read in array-backed mode. Keyword
+  arguments are passed on to diff_namelists().
+  '''
+  return diff_namelists(read_finiteburn_file(old_path, as_arrays=True),
+                        read_finiteburn_file(new_path, as_arrays=True), **kwargs)
+
+def format_diff(diffs):
+  '''
+  format_diff(diffs)
+
+  Description:
+    Generate a line of text for each difference, e.g.
+      FINITE-BURNS  MA1D(2)  burn 2  changed  120.0 -> 125.5  (+5.5)
+  '''
+  for diff in diffs:
+    burns  = diff.burns
+    delta  = diff.delta
+    for i, (lhs, kind, old, new) in enumerate(diff.rows()):
+      where = '' if burns is None else '  burn %i'%(burns[i])
+      if kind == 'changed':
+        change = '%s -> %s'%(old, new)
+        if delta is not None:
+          change += '  (%+g)'%(delta[i])
+      else:
+        change = new if kind == 'added' else old
+      yield '%s  %s%s  %s  %s\n'%(diff.pdef.group, lhs, where, kind, change)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Semantic difference between two gin namelist files')
+  parser.add_argument('old')
+  parser.add_argument('new')
+  parser.add_argument('--rtol', type=float, default=0.0, help='relative tolerance for floats')
+  parser.add_argument('--atol', type=float, default=0.0, help='absolute tolerance for floats')
+  parser.add_argument('--groups', nargs='+', default=None, help='only compare these groups')
+  args = parser.parse_args(argv)
+  try:
+    diffs = diff_files(args.old, args.new, rtol=args.rtol, atol=args.atol, groups=args.groups)
+  except NamelistError as err:
+    print('ERROR: %s'%(err), file=sys.stderr)
+    return 2
+  sys.stdout.writelines(format_diff(diffs))
+  # exit status as diff(1): 1 when there are differences
+  return 1 if diffs else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,268 @@
+import numpy as np
+
+from collections.abc import Mapping
+
+from ginnl_reader import get_schema, flatten_index, indexed_groups, param_array, \
+                         read_finiteburn_file, store_assignment, store_assignment_arrays, \
+                         store_assignment_sparse, ArrayGroup, Assignment, IndexedArrayGroup, \
+                         InvalidParameterError, NamelistError, ParamArray, ValueRuns
+
+def _read_only(pdef, flat, mask):
+  # ParamArray over read-only views of flat and mask, sharing their memory
+  flat = flat.view()
+  mask = mask.view()
+  flat.flags.writeable = False
+  mask.flags.writeable = False
+  arr = ParamArray.__new__(ParamArray)
+  arr._flat  = flat
+  arr._mask  = mask
+  arr.values = flat.reshape(pdef.dim, order='F')
+  arr.isset  = mask.reshape(pdef.dim, order='F')
+  return arr
+
+def _mask_runs(mask):
+  # (start, stop) of every contiguous run of True in a flat mask
+  edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+  return zip(edges[::2].tolist(), edges[1::2].tolist())
+
+class NamelistOverlay(Mapping):
+  '''
+  NamelistOverlay(layers=())
+
+  Description:
+    Read-only view of several parsed namelist fragments stacked in precedence
+  order, each later layer overriding the values it assigns in the earlier
+  ones, as if the fragments had been read one after the other. Nothing is
+  merged up front: a parameter is resolved the first time it is looked up and
+  kept until a layer is added or it is assigned again. A parameter set in only
+  one layer, or in a top layer that covers everything the lower ones set,
+  resolves to read-only views of that layer's arrays; only a parameter
+  assigned piecewise across layers is combined into new arrays.
+
+    The layers are never modified, so one large base fragment can be shared by
+  any number of overlays. assign() writes to the overlay's own layer instead,
+  created on the first write and always on top (copy-on-write). Only the
+  parameter being resolved is looked at in each layer: in array-backed storage
+  (as_arrays=True or 'sparse') it is used without copying, so a sparse layer
+  only materializes the parameters actually looked up, and in the default
+  storage it is converted to arrays once per overlay.
+
+    The overlay is a mapping of group name to an ArrayGroup (an
+  IndexedArrayGroup for groups such as FINITE-BURNS) of the resolved values,
+  so it can be passed to anything that takes an array-backed gin_dict, e.g.
+  overlay['FINITE-BURNS'][2].DMA1, burn_table(overlay) or
+  write_finiteburn_file(overlay, path).
+
+  Optional Args (type):
+    layers:   (list) parsed gin_dicts, lowest precedence first
+  '''
+  def __init__(self, layers=()):
+    self._layers   = []
+    # {param: param_array()} of each layer in the default storage, filled in
+    # as parameters are looked up
+    self._arrays   = []
+    # the overlay's own layer, written to by assign()
+    self._own      = None
+    self._resolved = {}
+    self._groups   = {}
+    for layer in layers:
+      self.push(layer)
+
+  def __repr__(self):
+    return 'NamelistOverlay(%i layers%s)'%(len(self._layers), ', edited' if self._own else '')
+
+  @property
+  def layers(self):
+    return tuple(self._layers)
+
+  def push(self, gin_dict):
+    '''
+    push(self, gin_dict)
+
+    Description:
+      Add a layer on top of the others (below the overlay's own assignments).
+    '''
+    self._layers.append(gin_dict)
+    self._arrays.append({})
+    self._resolved.clear()
+    self._groups.clear()
+
+  def _sides(self, param):
+    # (values, isset) of param in every layer assigning it, lowest first
+    sides = []
+    group = get_schema()[param].group
+    for layer, converted in zip(self._layers, self._arrays):
+      if isinstance(layer.get(group), ArrayGroup):
+        side = param_array(layer, param)
+      else:
+        if param not in converted:
+          converted[param] = param_array(layer, param)
+        side = converted[param]
+      if side is not None:
+        sides.append(side)
+    if self._own is not None:
+      arr = getattr(self._own.get(group), param, None)
+      if arr is not None:
+        sides.append((arr._flat, arr._mask))
+    return sides
+
+  def param(self, param):
+    '''
+    param(self, param)
+
+    Description:
+      Resolved values of one parameter as a read-only ParamArray, or None if
+    no layer assigns it.
+    '''
+    if param in self._resolved:
+      return self._resolved[param]
+    pdef  = get_schema()[param]
+    sides = self._sides(param)
+    if not sides:
+      arr = None
+    else:
+      flat, mask = sides[-1]
+      if any((lower & ~mask).any() for _, lower in sides[:-1]):
+        # set piecewise across layers, the only case that needs new arrays
+        flat = sides[0][0].copy()
+        mask = sides[0][1].copy()
+        for values, isset in sides[1:]:
+          np.copyto(flat, values, where=isset)
+          mask |= isset
+      arr = _read_only(pdef, flat, mask)
+    self._resolved[param] = arr
+    return arr
+
+  def value(self, param, indices=None):
+    '''
+    value(self, param, indices=None)
+
+    Description:
+      Resolved value of one parameter at the given namelist indices (the first
+    index of every dimension by default), or None if it is not assigned.
+    '''
+    pdef = get_schema()[param]
+    arr  = self.param(param)
+    if indices is None:
+      indices = pdef.lower
+    flat = flatten_index(list(indices), pdef.dim, pdef.lower)
+    if arr is None or not arr._mask.item(flat):
+      return None
+    return arr._flat.item(flat)
+
+  def assign(self, param, values, indices=None):
+    '''
+    assign(self, param, values, indices=None)
+
+    Description:
+      Assign values to a parameter in the overlay's own layer, as the
+    statement param(indices) = values would, leaving every other layer as it
+    is. Returns the number of values trimmed off past the parameter's
+    dimensions.
+
+    Inputs:
+      param:    (str) parameter name
+      values:   (list) values, already of the parameter's type
+
+    Optional Args (type):
+      indices:  (list) namelist indices of the first value, defaults to the
+                       first index of every dimension
+    '''
+    pdef = get_schema().get(param)
+    if pdef is None:
+      raise InvalidParameterError('Invalid parameter provided', param=param)
+    if indices is None:
+      indices = list(pdef.lower)
+    if self._own is None:
+      self._own = {}
+    trimmed = store_assignment_arrays(self._own, Assignment(param, pdef.group, list(indices),
+                                                            list(values), None))
+    self._resolved.pop(param, None)
+    self._groups.pop(pdef.group, None)
+    return trimmed
+
+  def _group_names(self):
+    names = {}
+    for layer in self._layers+([self._own] if self._own else []):
+      names.update(dict.fromkeys(layer))
+    return list(names)
+
+  def __getitem__(self, group):
+    data = self._groups.get(group)
+    if data is not None:
+      return data
+    if group not in self._group_names():
+      raise KeyError(group)
+    data = IndexedArrayGroup(group) if group in indexed_groups else ArrayGroup(group)
+    for pdef in get_schema().values():
+      if pdef.group == group:
+        arr = self.param(pdef.name)
+        if arr is not None:
+          setattr(data, pdef.name, arr)
+    self._groups[group] = data
+    return data
+
+  def __iter__(self):
+    return iter(self._group_names())
+
+  def __len__(self):
+    return len(self._group_names())
+
+  def flatten(self, as_arrays=True):
+    '''
+    flatten(self, as_arrays=True)
+
+    Description:
+      Merge the stack into a single gin_dict that owns its values, in one pass
+    over the parameters.
+
+    Optional Args (type):
+      as_arrays:  (bool or str) storage mode of the result, as in
+                                read_finiteburn_file()
+
+    Output:
+      gin_dict:   (dict) parsed namelist data
+    '''
+    gin_dict = {}
+    store    = store_assignment_sparse if as_arrays == 'sparse' else store_assignment
+    for group in self._group_names():
+      for name, arr in self[group].__dict__.items():
+        if not isinstance(arr, ParamArray):
+          continue
+        pdef = get_schema()[name]
+        if as_arrays is True:
+          # a writable copy is all array-backed storage needs
+          if group not in gin_dict:
+            gin_dict[group] = IndexedArrayGroup(group) if group in indexed_groups else ArrayGroup(group)
+          copy = ParamArray(pdef.dtype, pdef.dim)
+          copy._flat[:] = arr._flat
+          copy._mask[:] = arr._mask
+          setattr(gin_dict[group], name, copy)
+          continue
+        for start, stop in _mask_runs(arr._mask):
+          indices = (np.array(np.unravel_index(start, pdef.dim, order='F'))+pdef.lower).tolist()
+          store(gin_dict, Assignment(name, group, indices,
+                                     ValueRuns([1]*(stop-start), arr._flat[start:stop].tolist()), None))
+    return gin_dict
+
+def read_overlay(paths, as_arrays=True):
+  '''
+  read_overlay(paths, as_arrays=True)
+
+  Description:
+    Read namelist files and stack them in a NamelistOverlay, each file
+  overriding the ones before it.
+
+  Inputs:
+    paths:      (list) namelist files, lowest precedence first
+
+  Optional Args (type):
+    as_arrays:  (bool or str) storage mode the files are read in
+  '''
+  overlay = NamelistOverlay()
+  for path in paths:
+    try:
+      overlay.push(read_finiteburn_file(path, as_arrays=as_arrays))
+    except NamelistError as err:
+      raise err.locate(file=path)
+  return overlay
@@ -2,11 +2,17 @@ import numpy as np
 import sys
 import os
 import re
+import time
+import copy
+import mmap
 
-from mint.IO.burnio import BURN
-from mint.objects.BURN import FINITE_BURN
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from types import MappingProxyType
 
-from IPython import embed
+# mint and IPython are slow to import and only needed on some code paths, so they
+# are imported where they are used rather than here. Importing this module should
+# not do any work beyond defining things.
 
 def max_attlen(attrlist):
   '''
@@ -86,6 +92,8 @@ class Obj(object):
                 outstr+='\t\t%s *not displaying this data type\n'%(etype)
           else:
             outstr+='\t\t%s too many elements (%s) to display here\n'%(type(rhs),len(rhs))
+        elif issubclass(vtype, ParamArray):
+          outstr+='\t%s %s\n'%(lhs,rhs)
         else:
           outstr+='\t%s %s *not displaying this data type\n'%(lhs,vtype)
     return outstr
@@ -133,7 +141,7 @@ class BaseMirageParam(object):
     return rstr
 
   def init_param(self, pname, dim, group='General', dtype=None, units=None,
-                 default=None, desc=None, reference=None, revdate=None):
+                 default=None, desc=None, reference=None, revdate=None, lbound=None):
     '''
     init_param(self,pname,dim,*args)
     
@@ -148,8 +156,10 @@ class BaseMirageParam(object):
                         individual value of this parameter is a list of
                         10 values, and 99 indicates allowed to have 99 
                         of these lists.
-                        ****JRR: Not yet handling/implementing dimension 
-                        length greater than 2****
+                        Any number of dimensions is handled, e.g.
+                        dim = [4,100,10] for a 3D parameter; values are
+                        laid out in Fortran order, the first index varying
+                        fastest.
 
     
     Optional Args (type):
@@ -160,6 +170,9 @@ class BaseMirageParam(object):
       desc:       (str)
       reference:  (str)
       revdate:    (str)
+      lbound:     (list) lower bound of each dimension, for parameters that are
+                        not indexed from 1 (e.g. 0:10 in the MIRAGE docs).
+                        dim always holds the number of values in each dimension.
     '''
     ####################################
     # General parameter definition
@@ -173,11 +186,51 @@ class BaseMirageParam(object):
     if desc != None: self.__dict__[pname]['desc'] = desc
     if reference != None: self.__dict__[pname]['reference'] = reference
     if revdate != None: self.__dict__[pname]['revdate'] = revdate
+    if lbound != None: self.__dict__[pname]['lbound'] = lbound
     # Update GROUPS
     if group in self.GROUPS.keys(): self.GROUPS[group].append(pname)
     else: self.GROUPS[group] = [pname]
     return
 
+  def init_niodump(self, group):
+    '''
+    init_niodump(self, group)
+
+    Description:
+      Define every parameter listed in the class's niodump docstring, one
+    "NAME DTYPE DIMS" line per parameter, for groups that do not yet have
+    full init_param definitions. A dimension written as lo:hi has hi-lo+1
+    values starting at index lo. Anything after DIMS on a line is an
+    unconfirmed alternative from the dump (e.g. "2?") and is ignored.
+
+    Inputs:
+      group:      (str) MIRAGE group name the parameters belong to
+    '''
+    lines = type(self).__doc__.split('\n')
+    start = [i for i,line in enumerate(lines) if 'niodump' in line][0]
+    for line in lines[start+1:]:
+      fields = line.split()
+      if len(fields) < 3:
+        continue
+      pname, typ, dims = fields[:3]
+      # a bare C is a single-character string
+      if typ == 'C':
+        typ = 'C1'
+      dim = []
+      lbd = []
+      for dstr in dims.split(','):
+        if ':' in dstr:
+          low, high = map(int, dstr.split(':'))
+        else:
+          low, high = 1, int(dstr)
+        dim.append(high-low+1)
+        lbd.append(low)
+      if any(low != 1 for low in lbd):
+        self.init_param(pname,dim,group=group,dtype=typ,lbound=lbd)
+      else:
+        self.init_param(pname,dim,group=group,dtype=typ)
+    return
+
 class FiniteBurn(BaseMirageParam):
   '''
   FiniteBurn(BaseMirageParam)
@@ -572,7 +625,7 @@ class IntegrationControl(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('INTEG-CONTRL')
     return
 
 class ImpulsiveBurn(BaseMirageParam):
@@ -595,7 +648,7 @@ class ImpulsiveBurn(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('INST-BURNS')
     return
 
 class SmallForces(BaseMirageParam):
@@ -611,7 +664,7 @@ class SmallForces(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('SMALL-FORCES')
     return
 
 class Spacecraft(BaseMirageParam):
@@ -649,7 +702,7 @@ class Spacecraft(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('SPACECRAFT')
     return
 
 class AttitudeControl(BaseMirageParam):
@@ -672,7 +725,7 @@ class AttitudeControl(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('ATT-CONTROL')
     return
 
 class AstrodynamicConstants(BaseMirageParam):
@@ -701,7 +754,7 @@ class AstrodynamicConstants(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('ASTRO-CONS')
     return
 
 class SolarPressure(BaseMirageParam):
@@ -738,7 +791,7 @@ class SolarPressure(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('SOL-PRESSURE')
     return
 
 class AtmosphericDrag(BaseMirageParam):
@@ -765,426 +818,2397 @@ class AtmosphericDrag(BaseMirageParam):
   def __init__(self):
     # initialize parameter structure
     BaseMirageParam.__init__(self)
-    
+    self.init_niodump('ATMOSPHERE')
     return
 
 
-mirage_keys_read = {}
+# MIRAGE definition classes and the group each one defines, in lookup order
+mirage_param_classes = [
+  # Source: MANEUVERS-FINITE.pydat
+  (FiniteBurn,            'FINITE-BURNS'),
+  # Source: INITIAL-CONDITIONS.pydat & INITIAL-CONDITIONS-ICG.pydat & INTEGRATION-CONTROL.pydat
+  (IntegrationControl,    'INTEG-CONTRL'),
+  # Source: MANEUVERS-IMPULSIVE.pydat
+  (ImpulsiveBurn,         'INST-BURNS'),
+  # Source: SMALL-FORCES.pydat
+  (SmallForces,           'SMALL-FORCES'),
+  # Source: SPACECRAFT.pydat
+  (Spacecraft,            'SPACECRAFT'),
+  # Source: ATTITUDE-CONTROL.pydat
+  (AttitudeControl,       'ATT-CONTROL'),
+  # Source: ASTRODYNAMIC-CONSTANTS.pydat
+  (AstrodynamicConstants, 'ASTRO-CONS'),
+  # Source: SOLAR-PRESSURE-GENERAL.pydat
+  (SolarPressure,         'SOL-PRESSURE'),
+  # Source: ATMOSPHERIC-DRAG.pydat
+  (AtmosphericDrag,       'ATMOSPHERE'),
+]
 
-# Source: MANEUVERS-FINITE.pydat
-fb = FiniteBurn()
-fb_keys = fb.GROUPS['FINITE-BURNS']
-for param in fb_keys:
-  mirage_keys_read[param] = 'FINITE-BURNS'
+# Compiled definition of a single readable parameter:
+#   dim     number of values in each dimension
+#   lower   index of the first value in each dimension (1 unless lo:hi in the docs)
+#   strides flat (Fortran order) distance between consecutive indices of each dimension
+#   size    total number of values the parameter can hold, i.e. the product of dim
+ParamDef = namedtuple('ParamDef', ['name','group','dtype','dim','lower','strides','size'])
 
-if False:
-  pass
-  # Source: INITIAL-CONDITIONS.pydat & INITIAL-CONDITIONS-ICG.pydat & INTEGRATION-CONTROL.pydat
-  # ic = IntegrationControl()
-  # ic_keys = ic.GROUPS['INTEG-CONTRL']
-  # for param in ic_keys:
-  #   mirage_keys_read[param] = 'INTEG-CONTRL'
+# read-only {param: ParamDef} table, built by get_schema() on first use
+_schema = None
 
-  # Source: MANEUVERS-IMPULSIVE.pydat
-  # ib = ImpulsiveBurn()
-  # ib_keys = ib.GROUPS['INST-BURNS']
-  # for param in ib_keys:
-  #   mirage_keys_read[param] = 'INST-BURNS'
+def compile_param(pname, group, pdef):
+  '''
+  compile_param(pname, group, pdef)
 
-  # Source: SMALL-FORCES.pydat
-  # sf = SmallForces()
-  # sf_keys = sf.GROUPS['SMALL-FORCES']
-  # for param in sf_keys:
-  #   mirage_keys_read[param] = 'SMALL-FORCES'
+  Description:
+    Build the ParamDef for one parameter from its init_param() definition.
+  '''
+  dim     = tuple(pdef['dim'])
+  lower   = tuple(pdef.get('lbound', [1]*len(dim)))
+  strides = []
+  size    = 1
+  for extent in dim:
+    strides.append(size)
+    size *= extent
+  return ParamDef(pname, group, pdef['dtype'], dim, lower, tuple(strides), size)
 
-  # Source: SPACECRAFT.pydat
-  # sc = Spacecraft()
-  # sc_keys = sc.GROUPS['SPACECRAFT']
-  # for param in sc_keys:
-  #   mirage_keys_read[param] = 'SPACECRAFT'
+def get_schema():
+  '''
+  get_schema()
 
-  # Source: ATTITUDE-CONTROL.pydat
-  # at = AttitudeControl()
-  # at_keys = at.GROUPS['ATT-CONTROL']
-  # for param in at_keys:
-  #   mirage_keys_read[param] = 'ATT-CONTROL'
+  Description:
+    Return the table of every parameter that can be read, in every group in
+  mirage_param_classes, built from the MIRAGE definition classes the first
+  time it is needed. The table is read-only and shared, so lookups are a
+  single dict access.
 
-  # Source: ASTRODYNAMIC-CONSTANTS.pydat
-  # ac = AstrodynamicConstants()
-  # ac_keys = ac.GROUPS['ASTRO-CONS']
-  # for param in ac_keys:
-  #   mirage_keys_read[param] = 'ASTRO-CONS'
+  Output:
+    schema:   (mapping) {param: ParamDef}
+  '''
+  global _schema
+  if _schema is None:
+    table = {}
+    for param_class, group in mirage_param_classes:
+      definitions = param_class()
+      for param in definitions.GROUPS[group]:
+        table[param] = compile_param(param, group, getattr(definitions,param))
+    _schema = MappingProxyType(table)
+  return _schema
 
-  # Source: SOLAR-PRESSURE-GENERAL.pydat
-  # sp = SolarPressure()
-  # sp_keys = sp.GROUPS['SOL-PRESSURE']
-  # for param in sp_keys:
-  #   mirage_keys_read[param] = 'SOL-PRESSURE'
+def __getattr__(name):
+  # The definition instance (fb) and the {param: group} map (mirage_keys_read)
+  # used to be built at import time. They are still available as module
+  # attributes, but are now only built when first accessed.
+  if name == 'fb':
+    globals()['fb'] = FiniteBurn()
+    return globals()['fb']
+  elif name == 'mirage_keys_read':
+    mirage_keys_read = {param: pdef.group for param, pdef in get_schema().items()}
+    globals()['mirage_keys_read'] = mirage_keys_read
+    return mirage_keys_read
+  raise AttributeError('module %r has no attribute %r'%(__name__,name))
 
-  # Source: ATMOSPHERIC-DRAG.pydat
-  # ad = AtmosphericDrag()
-  # ad_keys = ad.GROUPS['ATMOSPHERE']
-  # for param in ad_keys:
-  #   mirage_keys_read[param] = 'ATMOSPHERE'
 
+# Bump whenever a change to the reader changes what gets stored for the same
+# input text, so that previously cached parse results are no longer used.
+PARSER_VERSION = 1
 
-notable_groups = {'FINITE-BURNS': FINITE_BURN}
-indexed_groups = {'FINITE-BURNS': FINITE_BURN}
+def schema_version():
+  '''
+  schema_version()
 
-# Goal is to take a single value represented as a string from the namelist file,
-# and convert it into the appropriate data_type defined in the mirage_param_def
-def handle_data_type(val_str, data_type):
-  if data_type.startswith('C'):
-    max_length = int(data_type[1:])
-    if val_str[0] != "'" or val_str[-1] != "'":
-      print('ERROR: string value not fully contained in quotes. This is a problem, fix it.')
-      print('received: %s'%(val_str.replace('c',',')))
-      sys.exit()
-    val = val_str[1:-1].replace('c',',')
-    if len(val) > max_length:
-      print('ERROR: string length exceeds max length set by mirage definitions. This is a problem, fix it.')
-      print('received: %s'%(val_str.replace('c',',')))
-      print('max length: %i'%(max_length))
-      sys.exit()
-  elif data_type == 'DP':
+  Description:
+    Short hash identifying the reader version and the MIRAGE definitions of
+  every parameter that can be read (name, group, dtype and dimensions). Parse
+  results produced under a different schema_version() should not be reused.
+
+  Output:
+    version:  (str) hex digest
+  '''
+  import hashlib
+  defs = sorted((pdef.name, pdef.group, pdef.dtype, pdef.dim, pdef.lower) for pdef in get_schema().values())
+  return hashlib.sha1(repr((PARSER_VERSION, defs)).encode()).hexdigest()[:16]
+
+def _finite_burn():
+  # mint is only imported once a FINITE-BURNS value is actually stored
+  from mint.objects.BURN import FINITE_BURN
+  return FINITE_BURN()
+
+# group name -> constructor of the custom formatted data object for that group
+notable_groups = {'FINITE-BURNS': _finite_burn}
+indexed_groups = {'FINITE-BURNS': _finite_burn}
+
+class NamelistError(ValueError):
+  '''
+  NamelistError(msg, file=None, line=None, column=None, param=None)
+
+  Description:
+    Problem found while reading a gin namelist, raised instead of stopping the
+  interpreter so a batch can carry on with its other files. Records as much
+  of where it was found as is known, the rest being None: the file, the
+  1-based line and column, and the parameter being assigned. str() leads with
+  that location.
+  '''
+  def __init__(self, msg, file=None, line=None, column=None, param=None):
+    ValueError.__init__(self, msg)
+    self.msg    = msg
+    self.file   = file
+    self.line   = line
+    self.column = column
+    self.param  = param
+
+  def __reduce__(self):
+    # keep the location when sent back from a read_many() worker
+    return (type(self), (self.msg, self.file, self.line, self.column, self.param))
+
+  def __str__(self):
+    where = []
+    if self.file is not None:
+      where.append(str(self.file))
+    if self.line is not None:
+      where.append('line %i'%(self.line))
+    if self.column is not None:
+      where.append('column %i'%(self.column))
+    if self.param is not None:
+      where.append('parameter %s'%(self.param))
+    if not where:
+      return self.msg
+    return '%s: %s'%(', '.join(where), self.msg)
+
+  def locate(self, file=None, line=None, column=None, param=None):
+    '''
+    locate(self, file=None, line=None, column=None, param=None)
+
+    Description:
+      Fill in any parts of the location that are not yet known, as the error
+    passes up through code that knows more of it. Returns the error itself.
+    '''
+    if self.file is None:
+      self.file = file
+    if self.line is None:
+      self.line = line
+    if self.column is None:
+      self.column = column
+    if self.param is None:
+      self.param = param
+    return self
+
+class NamelistSyntaxError(NamelistError):
+  '''
+  Text that cannot be lexed or assembled into assignment statements.
+  '''
+
+class InvalidParameterError(NamelistError):
+  '''
+  Assignment to a parameter that is not in any MIRAGE definition.
+  '''
+
+class InvalidIndexError(NamelistError):
+  '''
+  Wrong number of indices for a parameter, or an index outside its dimensions.
+  '''
+
+class InvalidValueError(NamelistError):
+  '''
+  Value that is not valid for the parameter's MIRAGE data type.
+  '''
+
+class IncludeError(NamelistError):
+  '''
+  INCLUDE of a fragment that does not exist, or a cycle of fragments that
+  include each other.
+  '''
+
+# Token types emitted by tokenize_namelist()
+TOK_NAME    = 'NAME'     # parameter name on the lhs of an assignment
+TOK_INDEX   = 'INDEX'    # list of ints from the (i,j,...) following a name
+TOK_EQUALS  = 'EQUALS'   # the = separating lhs and rhs
+TOK_REPEAT  = 'REPEAT'   # the n in n*value
+TOK_LITERAL = 'LITERAL'  # unquoted value such as 1.0E3 or .TRUE.
+TOK_STRING  = 'STRING'   # quoted value, kept with its quotes
+TOK_NULL    = 'NULL'     # the n of n null values, from ,, or a bare n*
+TOK_END     = 'END'      # ; terminator, nothing after it is read
+TOK_ERROR   = 'ERROR'    # NamelistSyntaxError for text that could not be lexed
+
+# Single compiled pattern covering every token in a namelist line, including the
+# whitespace and commas separating it from the previous token. Order of the
+# alternatives matters: strings must be matched before anything that could eat a
+# quote, and n* must be matched before a plain literal. eol matches when only
+# separators are left on the line. The separators are kept as sep since the
+# commas in them are where null values are.
+_token_pattern = re.compile(r"""
+  (?P<sep>[\s,]*)
+  (?:(?P<string>'(?:[^']|'')*')
+    |(?P<repeat>\d+)\s*\*
+    |(?P<name>[A-Za-z][A-Za-z0-9_]*)(?:\s*\((?P<index>[^)]*)(?P<close>\)?))?
+    |(?P<equals>=)
+    |(?P<comment>[!#$])
+    |(?P<end>;)
+    |(?P<literal>[^\s,=!#$;*()']+)
+    |(?P<eol>$)
+    |(?P<bad>.)
+  )""", re.VERBOSE)
+
+def tokenize_namelist(lines, first_lnum=1):
+  '''
+  tokenize_namelist(lines, first_lnum=1)
+
+  Description:
+    Single pass lexer for MIRAGE gin namelist text. Each line is cut at 80
+  columns and scanned once with a compiled pattern, emitting typed tokens.
+  Names and unquoted literals are uppercased since namelists are
+  case-insensitive; the contents of quoted strings are kept as written.
+  Comments (! # $) run to the end of the line and a ; outside of a string
+  terminates the namelist. Null values, which leave the values at their
+  positions as they are, come out as TOK_NULL: every comma after an = or
+  after the comma ending a value (1.0,,3.0 has one, even with the commas on
+  different lines) and every n* not directly followed by a value (2*,5.0 has
+  two).
+
+  Inputs:
+    lines:    (iterable) lines of namelist text, e.g. an open file
+
+  Optional Args (type):
+    first_lnum: (int) line number of the first line, when lexing part of a file
+
+  Output:
+    generator of (type, value, lnum, col) tuples, where type is one of the
+    TOK_* constants, lnum is 1-based and col is 0-based. value is a list of
+    ints for TOK_INDEX, an int for TOK_REPEAT and TOK_NULL, the NamelistSyntaxError for
+    TOK_ERROR and a str otherwise. Lexing carries on at the next line after a
+    TOK_ERROR; iter_statements() raises or collects it.
+  '''
+  # lines have a max length of 80 chars
+  spans = ((line, 0, min(len(line),80), lnum) for lnum,line in enumerate(lines,first_lnum))
+  return _tokenize_spans(spans, _token_pattern.match, str, ',')
+
+# the same pattern for lexing straight from a bytes buffer
+_token_pattern_bytes = re.compile(_token_pattern.pattern.encode(), re.VERBOSE)
+
+def _decode(val):
+  return val.decode('utf-8','replace')
+
+def tokenize_namelist_bytes(buf, first_lnum=1):
+  '''
+  tokenize_namelist_bytes(buf, first_lnum=1)
+
+  Description:
+    tokenize_namelist() for namelist text held in a bytes-like buffer, such as
+  a memory-mapped file. The buffer is matched in place line by line without
+  creating a str for each line. Only names, indices and quoted strings are
+  decoded; unquoted literals are returned as uppercased bytes, which the value
+  conversion accepts directly.
+
+  Inputs:
+    buf:      (bytes, mmap) namelist text
+
+  Optional Args (type):
+    first_lnum: (int) line number of the first line
+
+  Output:
+    generator of (type, value, lnum, col) tuples as from tokenize_namelist()
+  '''
+  return _tokenize_spans(_buffer_spans(buf, first_lnum), _token_pattern_bytes.match, _decode, b',')
+
+def _buffer_spans(buf, first_lnum):
+  # (buf, start, end, lnum) of each line of a bytes buffer for _tokenize_spans()
+  pos  = 0
+  size = len(buf)
+  lnum = first_lnum
+  while pos < size:
+    eol = buf.find(b'\n', pos)
+    if eol < 0:
+      eol = size
+    # lines have a max length of 80 chars
+    yield buf, pos, min(eol, pos+80), lnum
+    pos   = eol+1
+    lnum += 1
+
+def _counted_lines(lines, stats):
+  # lines (or buffer spans) as the lexer pulls them, adding each to stats.lines
+  for line in lines:
+    stats.lines += 1
+    yield line
+
+def _tokenize_spans(spans, match, decode, comma):
+  # Shared lexer loop for tokenize_namelist() and tokenize_namelist_bytes().
+  # spans yields (text, start, end, lnum) for each line, where text[start:end]
+  # is the part of the line to read, decode turns a matched name, index or
+  # string into a str and comma is a comma of the text's type.
+  # Null values are only seen in the separators, so the commas are counted
+  # across tokens, lines and comments: last is 'equals' or 'value' for what the
+  # commas follow and held an n* waiting to see whether a value follows it.
+  last   = None
+  commas = 0
+  held   = None
+  lnum   = None
+  for line, pos, end, lnum in spans:
+    start = pos
+    while pos < end:
+      m    = match(line,pos,end)
+      kind = m.lastgroup
+      sep  = m.end('sep')
+      if sep > pos:
+        commas += m.group('sep').count(comma)
+      pos  = m.end()
+      if kind == 'eol' or kind == 'comment':
+        break
+      elif kind in ('name','index','close'):
+        col = m.start('name')-start
+      else:
+        col = m.start(kind)-start
+      if held is not None:
+        if commas or kind not in ('literal','string'):
+          yield (TOK_NULL, held[1], held[2], held[3])
+          last = 'value'
+        else:
+          yield held
+        held = None
+      if commas:
+        nulls  = commas if last == 'equals' else commas-1 if last == 'value' else 0
+        commas = 0
+        if nulls > 0:
+          yield (TOK_NULL, nulls, lnum, col)
+      if kind == 'repeat':
+        held = (TOK_REPEAT, int(m.group('repeat')), lnum, col)
+        continue
+      last = 'equals' if kind == 'equals' else 'value'
+      if kind == 'literal':
+        yield (TOK_LITERAL, m.group(kind).upper(), lnum, col)
+      elif kind == 'string':
+        yield (TOK_STRING, decode(m.group(kind)), lnum, col)
+      elif kind == 'equals':
+        yield (TOK_EQUALS, '=', lnum, col)
+      elif kind in ('name','index','close'):
+        param = decode(m.group('name')).upper()
+        yield (TOK_NAME, param, lnum, col)
+        index_str = m.group('index')
+        if index_str is not None:
+          index_str = decode(index_str)
+          icol      = m.start('index')-1-start
+          if not m.group('close'):
+            err = NamelistSyntaxError('Invalid indices provided, need a closing parenthesis '\
+                                      'for the lhs: %s'%(decode(line[start+col:end]).strip()),
+                                      line=lnum, column=icol+1, param=param)
+            yield (TOK_ERROR, err, lnum, icol)
+            break
+          try:
+            indices = [int(idx) for idx in index_str.split(',')]
+          except ValueError:
+            err = NamelistSyntaxError('Invalid indices provided: (%s)'%(index_str),
+                                      line=lnum, column=icol+1, param=param)
+            yield (TOK_ERROR, err, lnum, icol)
+            break
+          yield (TOK_INDEX, indices, lnum, icol)
+      elif kind == 'end':
+        yield (TOK_END, ';', lnum, col)
+        return
+      elif decode(m.group(kind)) == "'":
+        err = NamelistSyntaxError('string value not fully contained in quotes: %s'%(
+                                  decode(line[start+col:end]).strip()), line=lnum, column=col+1)
+        yield (TOK_ERROR, err, lnum, col)
+        break
+      else:
+        err = NamelistSyntaxError('Unexpected character (%s)'%(decode(m.group(kind))),
+                                  line=lnum, column=col+1)
+        yield (TOK_ERROR, err, lnum, col)
+        break
+  # without a ; the namelist ends with the text
+  if held is not None:
+    yield (TOK_NULL, held[1], held[2], held[3])
+    last = 'value'
+  nulls = commas if last == 'equals' else commas-1 if last == 'value' else 0
+  if nulls > 0:
+    yield (TOK_NULL, nulls, lnum, 0)
+
+# maps Fortran D exponents onto the E that float() and numpy understand
+_exponent_table = str.maketrans('Dd','Ee')
+_exponent_bytes = bytes.maketrans(b'Dd',b'Ee')
+
+# unquoted literals are bytes when read by tokenize_namelist_bytes()
+_logical_values = {'.TRUE.': True, '.FALSE.': False, b'.TRUE.': True, b'.FALSE.': False}
+
+def _value_text(val):
+  # value as text for messages, whichever tokenizer produced it
+  return val if isinstance(val,str) else _decode(val)
+
+# range of the int64 that I values are converted to
+_int64_min = int(np.iinfo(np.int64).min)
+_int64_max = int(np.iinfo(np.int64).max)
+
+def _float_overflow(vals, val_strs):
+  # positions of values too large for their float type, which become inf,
+  # unless the text itself says inf
+  return [i for i in np.flatnonzero(np.isinf(vals)).tolist()
+          if _value_text(val_strs[i]).strip().lstrip('+-')[:3].lower() != 'inf']
+
+def convert_values(val_strs, data_type):
+  '''
+  convert_values(val_strs, data_type)
+
+  Description:
+    Convert the value strings from a namelist file into the data_type defined
+  in their MIRAGE parameter definition. Every value string of an assignment
+  (or of a whole file) for one data_type is converted in a single pass, using
+  numpy's string to number conversion for numeric types. Fortran D exponents
+  are accepted. Invalid values do not stop the conversion; the position of
+  every one of them is returned instead.
+
+  Inputs:
+    val_strs:   (list) value strings, quoted strings keeping their quotes.
+                       Unquoted values may also be bytes.
+    data_type:  (str) MIRAGE data_type (DP, SP, I, L, Cn)
+
+  Output:
+    vals:       (ndarray) converted values, None if any were invalid
+    bad:        (list) indices into val_strs of the invalid values
+  '''
+  if data_type in ('DP','SP'):
     try:
-      val = float(val_str)
-    except:
-      print('ERROR: Invalid float type provided')
-      print('recieved: %s'%(val_str.replace('c',',')))
-      sys.exit()
+      joined = '\n'.join(val_strs)
+      if 'D' in joined or 'd' in joined:
+        val_strs = joined.translate(_exponent_table).split('\n')
+    except TypeError:
+      # literals from tokenize_namelist_bytes() are bytes
+      try:
+        val_strs = b'\n'.join(val_strs).translate(_exponent_bytes).split(b'\n')
+      except TypeError:
+        # a quoted string among them, which is invalid for a number anyway
+        val_strs = [val.translate(_exponent_table if isinstance(val,str) else _exponent_bytes)
+                    for val in val_strs]
+    dtype = numpy_dtype(data_type)
+    try:
+      vals = np.array(val_strs, dtype=np.float64)
+    except ValueError:
+      # only pay for the per-value loop when there is something to report
+      bad = []
+      for i,val_str in enumerate(val_strs):
+        try:
+          val = float(val_str)
+        except ValueError:
+          bad.append(i)
+          continue
+        with np.errstate(over='ignore'):
+          val = np.array([val], dtype=dtype)
+        if _float_overflow(val, [val_str]):
+          bad.append(i)
+      return None, bad
+    if data_type == 'SP':
+      with np.errstate(over='ignore'):
+        vals = vals.astype(dtype)
+    bad = _float_overflow(vals, val_strs)
+    if bad:
+      return None, bad
+    return vals, []
   elif data_type == 'I':
     try:
-      val = int(val_str)
-    except:
-      print('ERROR: Invalid int type provided')
-      print('recieved: %s'%(val_str.replace('c',',')))
-      sys.exit()
+      return np.array(val_strs, dtype=np.int64), []
+    except (ValueError, OverflowError):
+      # a value that int() accepts is still invalid past the int64 range
+      bad = []
+      for i,val_str in enumerate(val_strs):
+        try:
+          val = int(val_str)
+        except ValueError:
+          bad.append(i)
+          continue
+        if not _int64_min <= val <= _int64_max:
+          bad.append(i)
+      return None, bad
   elif data_type == 'L':
-    if val_str == '.TRUE.':
-      val = True
-    elif val_str == '.FALSE.':
-      val = False
-    else:
-      print('ERROR: Invalid boolean type provided, expected .TRUE. or .FALSE.')
-      print('recieved: %s'%(val_str.replace('c',',')))
-      sys.exit()
+    vals = [_logical_values.get(val_str) for val_str in val_strs]
+    bad  = [i for i,val in enumerate(vals) if val is None]
+    if bad:
+      return None, bad
+    return np.array(vals, dtype=np.bool_), []
+  elif data_type.startswith('C'):
+    max_length = int(data_type[1:])
+    vals = []
+    bad  = []
+    for i,val_str in enumerate(val_strs):
+      # an unquoted bytes literal is invalid, decode it so it is reported as such
+      if not isinstance(val_str,str):
+        val_str = _decode(val_str)
+      # a doubled quote inside a string is an escaped single quote
+      val = val_str[1:-1].replace("''","'")
+      if len(val_str) < 2 or val_str[0] != "'" or val_str[-1] != "'" or len(val) > max_length:
+        bad.append(i)
+      vals.append(val)
+    if bad:
+      return None, bad
+    return np.array(vals, dtype='U%i'%(max_length)), []
   else:
-    print('ERROR: Unknown mirage data_type (%s)'%(data_type))
-    sys.exit()
+    raise ValueError('Unknown mirage data_type (%s)'%(data_type))
 
-  return val
+# Description of what went wrong for each data_type, used when reporting invalid
+# values found by convert_values()
+_invalid_value_msgs = {'DP': 'Invalid or out of range float type provided',
+                       'SP': 'Invalid or out of range (32-bit) float type provided',
+                       'I':  'Invalid or out of range (64-bit) int type provided',
+                       'L':  'Invalid boolean type provided, expected .TRUE. or .FALSE.'}
 
 # Goal is to convert n-dimensional indices to a single 1D index so that all n
 # dimensions can be accessed from a single 1D list
-# Assuming order of depth of indices & data_dim is last, first, middle
-def flatten_index(indices, data_dim):
-  # note that indices & data_dim are one-indexed, but python is zero-indexed, so
-  # flattening the indices to a 1D python list index will involve subtracting 1
-  # from the values in indices but not doing so with values in data_dim
-  if len(indices) == 0:
-    # dimensionless parameters will still be accessed from a list with a single value
-    return 0
-  elif len(indices) == 1:
-    return indices[-1]-1
-  elif len(indices) == 2:
-    return (indices[-1]-1)*data_dim[-2] + (indices[-2]-1)
-  elif len(indices) == 3:
-    return (indices[-1]-1)*(data_dim[-2]*data_dim[-3]) + (indices[-2]-1)*data_dim[-3] + (indices[-3]-1)
-  else:
-    print('ERROR: Not yet handling 4D+ dimensional parameters yet')
-    sys.exit()
-  
-def handle_assignment(gin_dict, assignment):
-  # this is only needed for the very first call
-  if assignment == '':
+# Indices are in Fortran (column-major) order: the first index varies fastest
+def flatten_index(indices, data_dim, lower=None):
+  '''
+  flatten_index(indices, data_dim, lower=None)
+
+  Description:
+    Convert MIRAGE indices of any number of dimensions to a 0-based flat index
+  into the Fortran (column-major) ordering of all of the parameter's values.
+
+  Inputs:
+    indices:  (list) indices as written in the namelist
+    data_dim: (list) number of values in each dimension
+
+  Optional Args (type):
+    lower:    (list) lower bound of each dimension, defaults to 1 for all
+
+  Output:
+    flat_index: (int) 0-based position in the flattened values
+
+  Raises InvalidIndexError for an index outside the dimensions.
+  '''
+  if lower is None:
+    lower = [1]*len(data_dim)
+  # dimensionless parameters will still be accessed from a list with a single value
+  flat_index = 0
+  stride     = 1
+  for idx, extent, low in zip(indices, data_dim, lower):
+    if idx < low or idx >= low+extent:
+      raise InvalidIndexError('Index %i out of range, expected %i to %i'%(idx,low,low+extent-1))
+    flat_index += (idx-low)*stride
+    stride     *= extent
+  return flat_index
+
+def _scatter_nested(target, start, vals, dim):
+  # Write vals into nested lists shaped like dim (outermost list is the last
+  # dimension, as on the per-index FINITE_BURN objects) starting at the flat
+  # Fortran-order position start. Each contiguous run along the first dimension
+  # is a single slice assignment, however many boundaries the values cross.
+  if len(dim) == 1:
+    target[start:start+len(vals)] = vals
     return
-  # all lines will have exactly one assignment statement, so this will work
-  lhs, rhs = assignment.split('=',1)
-  # this will grab the parameter name regardless of whether indices are provided
-  param = lhs.split('(')[0]
-  
-  # param name must be defined in mirage_keys_read, where it will get the group name
-  # and get the appropriate mirage docs info from the fb object TODO: more than fb obj
-  if param in mirage_keys_read.keys():
-    group = mirage_keys_read[param]
-    mirage_param_def = getattr(fb,param)
+  block = 1
+  for extent in dim[:-1]:
+    block *= extent
+  i, offset = divmod(start, block)
+  pos = 0
+  while pos < len(vals):
+    count = min(block-offset, len(vals)-pos)
+    _scatter_nested(target[i], offset, vals[pos:pos+count], dim[:-1])
+    pos   += count
+    i     += 1
+    offset = 0
+
+class ValueRuns(object):
+  '''
+  ValueRuns(counts, values)
+
+  Description:
+    The values of an assignment as (count, value) runs, so an n*value entry
+  stays a single run however large n is. Runs are only expanded once they
+  have been cut down to the room left in the parameter (clamp()), and then
+  straight into the storage (fill()). len() is the number of values the runs
+  expand to, and iterating yields every expanded value. A run whose value is
+  None is of null values, which take up positions without storing anything;
+  pieces() splits the runs around them.
+
+  Inputs:
+    counts:     (list) number of copies of each value
+    values:     (list) converted values, one per run
+  '''
+  __slots__ = ('counts','values')
+
+  def __init__(self, counts, values):
+    self.counts = counts
+    self.values = values
+
+  def __repr__(self):
+    return 'ValueRuns(%s)'%(', '.join(repr(val) if count == 1 else '%i*%r'%(count,val)
+                                       for count, val in zip(self.counts, self.values)))
+
+  def __len__(self):
+    return sum(self.counts)
+
+  def __iter__(self):
+    for count, val in zip(self.counts, self.values):
+      for _ in range(count):
+        yield val
+
+  def __eq__(self, other):
+    if isinstance(other, ValueRuns):
+      return self.counts == other.counts and self.values == other.values
+    return NotImplemented
+
+  def clamp(self, limit):
+    '''
+    clamp(self, limit)
+
+    Description:
+      The runs cut down to at most limit values, without expanding anything.
+    Returns self if they already fit.
+    '''
+    total = 0
+    for i, count in enumerate(self.counts):
+      if total+count > limit:
+        counts = self.counts[:i]
+        if limit > total:
+          counts = counts+[limit-total]
+        return ValueRuns(counts, self.values[:len(counts)])
+      total += count
+    return self
+
+  def pieces(self):
+    '''
+    pieces(self)
+
+    Description:
+      Generate (offset, runs) for every stretch of values between null values,
+    offset being the position of its first value. Yields only self when there
+    are no null values.
+    '''
+    if None not in self.values:
+      yield 0, self
+      return
+    start  = 0
+    offset = 0
+    counts = []
+    values = []
+    for count, val in zip(self.counts, self.values):
+      if val is None:
+        if counts:
+          yield start, ValueRuns(counts, values)
+          counts = []
+          values = []
+        start = offset+count
+      else:
+        counts.append(count)
+        values.append(val)
+      offset += count
+    if counts:
+      yield start, ValueRuns(counts, values)
+
+  def tolist(self):
+    '''
+    tolist(self)
+
+    Description:
+      Every value expanded into a list.
+    '''
+    if all(count == 1 for count in self.counts):
+      return list(self.values)
+    out = []
+    for count, val in zip(self.counts, self.values):
+      out.extend([val]*count)
+    return out
+
+  def fill(self, target, start):
+    '''
+    fill(self, target, start)
+
+    Description:
+      Write every value into the ndarray target starting at position start, in
+    a single slice assignment. The runs must fit (see clamp()).
+    '''
+    stop = start+len(self)
+    if len(self.counts) == 1:
+      target[start:stop] = self.values[0]
+    elif all(count == 1 for count in self.counts):
+      target[start:stop] = self.values
+    else:
+      target[start:stop] = np.repeat(np.array(self.values, dtype=target.dtype), self.counts)
+
+# One parsed assignment statement, as yielded by iter_assignments(). indices are
+# the indices of the first value as written (1-based unless the dimension has a
+# different lower bound) and values are the ValueRuns of the rhs, already
+# converted to the data type from the parameter's MIRAGE definition.
+Assignment = namedtuple('Assignment', ['param','group','indices','values','lnum'])
+
+def parse_assignment(param, indices, rhs, lnum=None, stats=None, errors=None):
+  '''
+  parse_assignment(param, indices, rhs, lnum=None, stats=None, errors=None)
+
+  Description:
+    Resolve the group and indices of a single assignment statement and convert
+  its values to the data type in the parameter's MIRAGE definition.
+
+  Inputs:
+    param:    (str) parameter name from the lhs
+    indices:  (list) ints from the lhs, or None if not provided
+    rhs:      (list) (repeat, value_str, lnum, col) for each rhs value, where
+                     repeat is the n of an n*value entry (1 otherwise) and
+                     value_str is None for n null values
+    lnum:     (int) line number the assignment starts on, if known
+    stats:    (ReadStats) instrumentation to record the dispatch and
+                          conversion time and value counts in, if any
+    errors:   (list) collect problems here instead of raising the first one,
+                     returning None for an assignment that has any
+
+  Output:
+    assignment: (Assignment) parsed assignment record
+  '''
+  if stats is not None:
+    started = time.perf_counter()
+  # param name must be defined in the schema, where it will get the group name
+  # and the appropriate mirage docs info
+  mirage_param_def = get_schema().get(param)
+  if mirage_param_def is not None:
+    group = mirage_param_def.group
   else:
-    print('ERROR: Invalid parameter (%s) provided, please remove from '\
-          'namelist file and try again.'%(param))
-    sys.exit()
+    return _assignment_error(errors, InvalidParameterError(
+           'Invalid parameter provided, please remove from namelist file and try again',
+           line=lnum, param=param))
   
-  # if indices are provided, store them as a list of ints
-  if '(' in lhs:
-    if ')' not in lhs:
-      print('ERROR: Invalid indices provided for parameter %s, need a closing '\
-            'parenthesis for the lhs: %s'%(param,lhs.replace('c',',').replace('x','*')))
-      sys.exit()
-    indices = lhs.split('(')[1].split(')')[0].split(',')
-    indices = list(map(int, indices))
+  if indices is not None:
     # mismatch between provided indices dimension and what the mirage docs expect
-    if len(indices) != len(mirage_param_def['dim']):
-      print('ERROR: Invalid dimensions (%i) used for parameter %s.'%(len(indices),param))
-      print('Expected dimension %i based on the MIRAGE parameter definition.'%(len(mirage_param_def['dim'])))
-      sys.exit()
+    if len(indices) != len(mirage_param_def.dim):
+      return _assignment_error(errors, InvalidIndexError(
+             'Invalid dimensions (%i) used, expected dimension %i based on the MIRAGE '\
+             'parameter definition'%(len(indices),len(mirage_param_def.dim)),
+             line=lnum, param=param))
   else:
     # if no indices provided, default to first index for every dimension for
     # this parameter (will also work for non-dimensional parameters)
-    indices = [1]*len(mirage_param_def['dim'])
+    indices = list(mirage_param_def.lower)
   
   
-  # Goal is to take a string containing the rhs of an assignment statement, and
-  # extract the values into a list, rhs_vals, with the correct data type
-  rhs_vals = []
-  rhs_vals_str = rhs.split(',')
-  # every rhs will end in an extra comma, so ignore the last split
-  for val_str in rhs_vals_str[:-1]:
-    # remember we replaced * with x since string values could contain * but not lowercase chars
-    if 'x' in val_str:
-      multiplier, val_str = val_str.split('x',1)
-      # extract the data from the val_str into the correct data type
-      val = handle_data_type(val_str, mirage_param_def['dtype'])
-      # add multiple copies of this data into the rhs_vals list corresponding to
-      # the number tied to the * in the namelist
-      rhs_vals.extend(int(multiplier)*[val])
+  # Goal is to take the rhs values of an assignment statement and extract them
+  # into a list, rhs_vals, with the correct data type. All values are converted
+  # in one batch and then repeated according to the n of any n*value entries.
+  data_type = mirage_param_def.dtype
+  if stats is not None:
+    converting = time.perf_counter()
+  # null values are left out of the conversion and kept as None
+  given = [i for i,val in enumerate(rhs) if val[1] is not None]
+  if len(given) == len(rhs):
+    given = None
+    vals, bad = convert_values([val[1] for val in rhs], data_type)
+  else:
+    vals, bad = convert_values([rhs[i][1] for i in given], data_type)
+    bad = [given[i] for i in bad]
+  if vals is None:
+    if data_type.startswith('C'):
+      msg = 'string value not fully contained in quotes or longer than %s characters'%(data_type[1:])
     else:
-      val = handle_data_type(val_str, mirage_param_def['dtype'])
-      rhs_vals.append(val)
+      msg = _invalid_value_msgs[data_type]
+    # every bad value is reported when collecting, or the statement as a whole
+    # if the conversion failed without pointing at one
+    problems = [InvalidValueError('%s: %s'%(msg,_value_text(rhs[i][1])), line=rhs[i][2],
+                                  column=rhs[i][3]+1, param=param) for i in bad] or \
+               [InvalidValueError(msg, line=lnum, param=param)]
+    if errors is None:
+      raise problems[0]
+    errors.extend(problems)
+    return None
+  # n*value entries are kept as runs; they are only expanded once they have
+  # been clamped to the parameter's dimensions when stored
+  vals = vals.tolist()
+  if given is not None:
+    values = [None]*len(rhs)
+    for i, val in zip(given, vals):
+      values[i] = val
+    vals = values
+  rhs_vals = ValueRuns([val[0] for val in rhs], vals)
+  
+  if stats is not None:
+    stats.times['dispatch'] += converting-started
+    stats.times['convert']  += time.perf_counter()-converting
+    stats.assignments       += 1
+    stats.values            += len(rhs_vals)
+    stats.repeats           += sum(1 for multiplier in rhs_vals.counts if multiplier != 1)
+  
+  return Assignment(param, group, indices, rhs_vals, lnum)
+
+def _assignment_error(errors, err):
+  # raise err, or add it to errors and skip the assignment when collecting
+  if errors is None:
+    raise err
+  errors.append(err)
+  return None
+
+def index_key(pdef, offset):
+  '''
+  index_key(pdef, offset)
+
+  Description:
+    Key used in an indexed group's dictionary (e.g. the burn number '01') for
+  the given 0-based offset along the parameter's last dimension. Keys are
+  zero-padded to the width of the largest index.
+  '''
+  low = pdef.lower[-1]
+  return str(low+offset).rjust(len(str(pdef.dim[-1]+low-1)),'0')
+
+def _warn_trimmed(pdef, indices, trimmed):
+  # the one warning every storage mode gives for values past a parameter's end
+  print('WARNING: assignment to %s(%s) exceeded maximum values allowed by parameter (dimensions %s), '
+        'trimming off %i excess values.'%(pdef.name, ','.join(map(str, indices)),
+                                          ','.join(map(str, pdef.dim)), trimmed))
+
+def store_assignment(gin_dict, assignment):
+  '''
+  store_assignment(gin_dict, assignment)
+
+  Description:
+    Store the values of a parsed assignment in the appropriately defined object
+  in gin_dict, trimming off any values past the parameter's MIRAGE dimensions.
+
+  Inputs:
+    gin_dict:   (dict) parsed namelist data, updated in place
+    assignment: (Assignment) parsed assignment record
+
+  Output:
+    trimmed:    (int) number of values trimmed off
+  '''
+  param, group, indices, rhs_vals, lnum = assignment
+  mirage_param_def = get_schema()[param]
   
-  flat_index = flatten_index(indices,mirage_param_def['dim'])
+  try:
+    flat_index = flatten_index(indices,mirage_param_def.dim,mirage_param_def.lower)
+  except NamelistError as err:
+    raise err.locate(line=lnum, param=param)
   # flat_max represents the total number of values that the parameter can store in 1D
-  flat_max = int(np.prod(mirage_param_def['dim']))
+  flat_max = mirage_param_def.size
   vals_length = len(rhs_vals)
-  # all 3 values represent 1D indices now, so we can determine whether the indices of
+  trimmed = 0
+  # both values represent 1D indices now, so we can determine whether the indices of
   # values being attempted to set will be within the limits set by MIRAGE docs
   if vals_length + flat_index > flat_max:
-    print('WARNING: exceeded maximum values allowed by parameter, trimming off excess values.')
+    trimmed = vals_length + flat_index - flat_max
     vals_length = flat_max - flat_index
-    rhs_vals = rhs_vals[:vals_length]
-  
-  # non-notable groups do not have a custom formatted data object, so use a generic object instead
-  if group not in notable_groups.keys():
-    if group not in gin_dict.keys():
-      gin_dict[group] = Obj()
-    if not hasattr(gin_dict[group], param):
-      # initialize parameter with the all possible indices flattened to 1D and set to None
-      setattr(gin_dict[group], param, [None]*flat_max)
-    if len(mirage_param_def['dim']) > 0:
-      getattr(gin_dict[group],param)[flat_index:flat_index+vals_length] = rhs_vals
-    else:
-      setattr(gin_dict[group],param,rhs_vals[0])
+    rhs_vals = rhs_vals.clamp(vals_length)
+    _warn_trimmed(mirage_param_def, indices, trimmed)
+  # nothing past the parameter's dimensions is ever expanded, and the positions
+  # of null values are skipped over
+  for offset, piece in rhs_vals.pieces():
+    _store_values(gin_dict, mirage_param_def, flat_index+offset, piece.tolist())
+  return trimmed
+
+def _store_values(gin_dict, mirage_param_def, flat_index, rhs_vals):
+  # store_assignment() of a list of values that fits from flat_index on
+  param       = mirage_param_def.name
+  group       = mirage_param_def.group
+  vals_length = len(rhs_vals)
   # groups that are indexed like FINITE-BURNS have another level of dictionary with
-  # the 1D indices being keys, which requires some messy logic to handle overflow between
-  # these indices
-  elif group in indexed_groups.keys():
+  # the last dimension's indices (e.g. burn number) being keys, each holding a
+  # custom formatted data object with everything for that index
+  if group in indexed_groups.keys():
     if group not in gin_dict.keys():
       gin_dict[group] = {}
-    # total number of values that the parameter can store past in each 1D index
-    flat_max_1D = int(np.prod(mirage_param_def['dim'][:-1]))
-    # first lower index in the 2nd-dimension can be some offset from 0
-    idx_2D_low = flat_index % flat_max_1D
-
-    if len(mirage_param_def['dim']) > 2:
-      flat_max_2D = int(np.prod(mirage_param_def['dim'][:-2]))
-      idx_3D_low = idx_2D_low % flat_max_2D
-    
-    # Calculate the number of 1D indices that will be covered by looking at the number
-    # of values to be covered in the first index and then find how many flat_max_1D
-    # it would take to cover the rest of the values
-    covered_1D_objects = 2 + ((vals_length - (flat_max_1D-idx_2D_low+1)) // flat_max_1D)
-    # iterate over each 1D index to be covered
-    for i in range(covered_1D_objects):
-      # TODO assuming last index is the first dimension for now (true for FINITE-BURNS)
-      idx_1D = str(indices[-1]+i).rjust(len(str(mirage_param_def['dim'][-1])),'0')
+    dim = mirage_param_def.dim
+    # number of values stored under each key of the last dimension
+    block = mirage_param_def.strides[-1]
+    first, offset = divmod(flat_index, block)
+    pos = 0
+    i   = first
+    while pos < vals_length:
+      idx_1D = index_key(mirage_param_def, i)
       # use custom class constructor if not yet initialized
       if idx_1D not in gin_dict[group].keys():
         gin_dict[group][idx_1D] = indexed_groups[group]()
-      # if the first 1D index is already covered, other lower indices will always start at 0
-      if i != 0:
-        idx_2D_low = 0
-      # upper index will be the lesser of the remaining values left or the amount
-      # that can be stored in a single 1D index
-      idx_2D_high = min(vals_length+idx_2D_low,flat_max_1D)
-      # ensure that rhs_vals are being "used up" in contiguous order from index 0 to the end
-      rhs_vals_offset = len(rhs_vals)-vals_length
-      if len(mirage_param_def['dim']) == 3:
-        vals_length_3D = idx_2D_high-idx_2D_low
-        idx_3D_low = idx_2D_low % flat_max_2D
-        covered_2D_objects = 2 + ((vals_length_3D - (flat_max_2D-idx_3D_low+1)) // flat_max_2D)
-        offset_2D = idx_2D_low // flat_max_2D
-        for j in range(covered_2D_objects):
-          if j != 0:
-            idx_3D_low = 0
-          idx_3D_high = min(vals_length_3D+idx_3D_low,flat_max_2D)
-          getattr(gin_dict[group][idx_1D],param)[offset_2D+j][idx_3D_low:idx_3D_high] = rhs_vals[rhs_vals_offset:rhs_vals_offset+(idx_3D_high-idx_3D_low)]
-          rhs_vals_offset += idx_3D_high-idx_3D_low
-          vals_length_3D -= idx_3D_high-idx_3D_low
-          
-      elif len(mirage_param_def['dim']) == 2:
-        getattr(gin_dict[group][idx_1D],param)[idx_2D_low:idx_2D_high] = rhs_vals[rhs_vals_offset:rhs_vals_offset+(idx_2D_high-idx_2D_low)]
-      else:
+      if len(dim) == 1:
         # 1D params will just hold a single value for each 1D index
-        setattr(gin_dict[group][idx_1D],param,rhs_vals[i])
-      # decrement by number of values "used up" in this iteration so the next one will
-      # have the appropriate number of vals remaining
-      vals_length -= idx_2D_high-idx_2D_low
-  else:
-    # notable groups that are not indexed groups are handled similarly to non-notable
-    # groups with a custom class called
-    if group not in gin_dict.keys():
-      gin_dict[group] = notable_groups[group]()
-    if not hasattr(gin_dict[group], param):
-      setattr(gin_dict[group], param, [None]*flat_max)
-    if len(mirage_param_def['dim']) > 0:
-      getattr(gin_dict[group],param)[flat_index:flat_index+vals_length] = rhs_vals
-    else:
-      setattr(gin_dict[group],param,rhs_vals[0])
+        setattr(gin_dict[group][idx_1D],param,rhs_vals[pos])
+        count = 1
+      else:
+        count = min(block-offset, vals_length-pos)
+        _scatter_nested(getattr(gin_dict[group][idx_1D],param), offset,
+                        rhs_vals[pos:pos+count], dim[:-1])
+      pos   += count
+      i     += 1
+      offset = 0
+    return
   
-  # # Print out parsed contents of file
-  # print(assignment.replace('c',',').replace('x','*'))
+  if group not in gin_dict.keys():
+    # non-notable groups do not have a custom formatted data object, so use a
+    # generic object instead
+    if group not in notable_groups.keys():
+      gin_dict[group] = Obj()
+    else:
+      gin_dict[group] = notable_groups[group]()
+  if not hasattr(gin_dict[group], param):
+    # initialize parameter with the all possible indices flattened to 1D and set to None
+    setattr(gin_dict[group], param, [None]*mirage_param_def.size)
+  if len(mirage_param_def.dim) > 0:
+    getattr(gin_dict[group],param)[flat_index:flat_index+vals_length] = rhs_vals
+  else:
+    setattr(gin_dict[group],param,rhs_vals[0])
 
+# numpy dtype used to store each MIRAGE data_type in array-backed mode. Character
+# types Cn are stored as fixed-width unicode of length n. Integers are stored in
+# the same 64 bits convert_values() checks them against, so any value it accepts
+# fits.
+mirage_numpy_types = {'DP': np.float64,
+                      'SP': np.float32,
+                      'I':  np.int64,
+                      'L':  np.bool_}
 
-def read_finiteburn_file(ginnl):
-  comsyms = ('!','#','$')
-  
-  if not os.path.exists(ginnl):
-    print('\nERROR: gin namelist file provided does not exist!')
-    print('\n%s\n'%ginnl)
-    sys.exit()
-  
-  # Complex data structure with the first level of keys being mirage group names.
-  # Most of these group names will point to an object storing the data read in
-  # for the parameters in this group.
-  # Some more notable group names such as FINITE-BURNS,... will point to another
-  # dictionary where the keys will be the first dimension indices (burn number)
-  # and each of these index keys will point to a formatted object storing the data
-  # read in for the parameters in this group.
-  gin_dict = {}
-  
-  # Will store completed assignment statements cleaned up to unify into a single
-  # format. This could span over multiple lines in the namelist file or there
-  # could be multiple completed assignment statements in a single line.
-  #
-  # Once complete, the completed assignment statement is passed onto a helper
-  # function handle_assignment() which will turn the statement into the appropriate
-  # data type and then store the data in an appropriately defined object in
-  # the gin_dict data structure.
-  assignment = ''
-  
-  with open(ginnl,'r') as ifid:
-    semicolon_exit = False
-    for lnum,line in enumerate(ifid):
-      # lines are case-insensitive and have a max length of 80 chars
-      line = line[:80].strip().upper()
-      
-      # skip lines with no comments or data
-      if line == '':
-        continue
-      
-      # if first non-whitespace char is ; the namelist file terminates there
-      if line[0] == ';':
-        break
+def numpy_dtype(data_type):
+  '''
+  numpy_dtype(data_type)
 
-      # regex to find complete strings within the line
-      string_pattern = "'.*?'"
-      # stores list of all complete strings in the line
-      string_matches = re.findall(string_pattern,line)
-      # stores list of the segments of the line between complete strings
-      anti_string_matches = re.split(string_pattern,line)
-      
-      
-      # Clean up the segments between complete strings and then alternate merge
-      # with the string_matches
-      # line_clean will have no whitespaces, comments, strange delimiters will be corrected,
-      # and commas inside strings will be replaced with lowercase c since everything is uppercase
-      # and asterisks outside strings will be replaced with lowercase x
-      line_clean = '' 
-      for i,anti_string in enumerate(anti_string_matches):
-        # remove all whitespaces and replace asterisks with lowercase x
-        anti_string = anti_string.replace(' ','').replace('\t','').replace('*','x')
-        # remove all comments (merging stops since a comment lasts till the end of line)
-        if any(com in anti_string for com in comsyms):
-          comment_pattern = "[!#$].*"
-          anti_string = re.sub(comment_pattern,'',anti_string)
-          line_clean = f'{line_clean}{anti_string}'
-          break
-        # there will always be one more anti_string than string, so last iteration needs special case
-        elif i == len(anti_string_matches)-1:
-          line_clean = f'{line_clean}{anti_string}'
-        else:
-          # Any char other than space, !, $, #, =, ' acts as a delimiter between strings
-          # MIRAGE technically lets = act as a delimiter but it's a PITA to support that here
-          # since we need to keep variable assignment statements intact
-          if '=' not in anti_string and ',' not in anti_string and len(anti_string) > 0:
-            # replace this character with a comma, but not the whole string since
-            # that would screw up multiplier syntax such as ITPEQ='2000',98*'2000'
-            # could also screw up multi-assignment lines
-            anti_string = f',{anti_string[1:]}'
-          # alternate merging of strings and anti_strings happens here
-          # also replacing of commas in strings with lowercase c
-          line_clean = f'{line_clean}{anti_string}{string_matches[i].replace(",","c")}'
-      
-      # if the original line was purely a comment, we will skip it here
-      if line_clean == '':
-        continue
-      
-      # lines ending with a semicolon signal to stop reading the file, but the
-      # rest of the current line still needs to be processed
-      if line_clean.endswith(';'):
-        semicolon_exit = True
-        # don't forget to trim the ; off the end before processing
-        line_clean = line_clean[:-1]
-      
-      # force every line to end with a comma to make multiline assignment easier to handle
-      if not line_clean.endswith(','):
-        line_clean = f'{line_clean},'
-      
-      # handle multi-assignment lines
-      if '=' in line_clean:
-        # regex to find the lhs of assignment statements after the start of a line
-        assignment_pattern = ",[A-Z].*?="
-        # stores list of lhs after the start of the line
-        assignment_matches = re.findall(assignment_pattern,line_clean)
-        # stores list of everything else including the lhs at the start of the line and all the rhs
-        anti_assignment_matches = re.split(assignment_pattern,line_clean)
-        
-        # iterate over everything else and alternate
-        for i,anti_assignment in enumerate(anti_assignment_matches):
-          # first iteration will either be just an rhs or the lhs and rhs of the first
-          # assignment statement in the line
-          if i == 0:
-            # line starts with an rhs, so append to the previous lhs at the end of assignment
-            if '=' not in anti_assignment:
-              assignment = f'{assignment}{anti_assignment}'
-            # line starts with an lhs, so append to assignment as a new assignment statement
-            else:
-              handle_assignment(gin_dict, assignment)
-              assignment = anti_assignment
-          else:
-            # keep a comma at the end of the previous line since we split
-            assignment = f'{assignment},'
-            handle_assignment(gin_dict, assignment)
-            # if multi-assignment is actually present, trim the comma off the
-            # start of the lhs and merge with the corresponding rhs before appending
-            # to assignment
-            assignment = f'{assignment_matches[i-1][1:]}{anti_assignment}'
-      # handle multiline assignment by appending line to previous assignment statement
-      # stored in assignment list
-      else:
-        assignment = f'{assignment}{line_clean}'
-      
-      # found a semicolon at the end of the line earlier, so we'll stop reading
-      # the file here since we finished processing the current line
-      if semicolon_exit:
+  Description:
+    Map a MIRAGE data_type (DP, SP, I, L, Cn) to the numpy dtype used to store it.
+  '''
+  if data_type.startswith('C'):
+    return np.dtype('U%s'%(data_type[1:] or 1))
+  elif data_type in mirage_numpy_types.keys():
+    return np.dtype(mirage_numpy_types[data_type])
+  else:
+    raise ValueError('Unknown mirage data_type (%s)'%(data_type))
+
+class ParamArray(object):
+  '''
+  ParamArray(data_type, dim)
+
+  Description:
+    Typed storage for every value of a single parameter. values is an ndarray
+  with the parameter's MIRAGE dimensions in Fortran order, so values[...,i-1]
+  holds everything for 1D index i (e.g. burn number i). isset is a boolean
+  array of the same shape recording which values were actually assigned,
+  since unset values read as zero/blank.
+
+  Inputs:
+    data_type:  (str) MIRAGE data_type of the parameter
+    dim:        (list) MIRAGE dimensions of the parameter
+  '''
+  __slots__ = ('_flat','_mask','values','isset')
+
+  def __init__(self, data_type, dim):
+    size       = int(np.prod(dim))
+    # flat views are written to by assign(), values and isset are reshaped views
+    # of the same memory
+    self._flat   = np.zeros(size, dtype=numpy_dtype(data_type))
+    self._mask   = np.zeros(size, dtype=np.bool_)
+    self.values  = self._flat.reshape(dim, order='F')
+    self.isset   = self._mask.reshape(dim, order='F')
+
+  def __repr__(self):
+    return 'ParamArray(%s, shape=%s, set=%i)'%(self.values.dtype,self.values.shape,
+                                               np.count_nonzero(self._mask))
+
+  def __getstate__(self):
+    # values and isset are views of the flat arrays and are made again when
+    # unpickled, rather than pickled as copies of their own
+    return (self._flat, self._mask, self.values.shape)
+
+  def __setstate__(self, state):
+    self._flat, self._mask, dim = state
+    self.values = self._flat.reshape(dim, order='F')
+    self.isset  = self._mask.reshape(dim, order='F')
+
+  def assign(self, flat_index, vals):
+    '''
+    assign(self, flat_index, vals)
+
+    Description:
+      Write a run of values, a list or ValueRuns, starting at a 0-based flat
+    (Fortran order) index, trimming off any values past the end of the
+    parameter. Returns the number of values trimmed off.
+    '''
+    vals_length = len(vals)
+    trimmed     = 0
+    if vals_length + flat_index > self._flat.size:
+      trimmed     = vals_length + flat_index - self._flat.size
+      vals_length = self._flat.size - flat_index
+      vals = vals.clamp(vals_length) if isinstance(vals, ValueRuns) else vals[:vals_length]
+    if isinstance(vals, ValueRuns):
+      # nothing is written at the positions of null values
+      for offset, piece in vals.pieces():
+        start = flat_index+offset
+        piece.fill(self._flat, start)
+        self._mask[start:start+len(piece)] = True
+    else:
+      self._flat[flat_index:flat_index+vals_length] = vals
+      self._mask[flat_index:flat_index+vals_length] = True
+    return trimmed
+
+class SparseParamArray(ParamArray):
+  '''
+  SparseParamArray(data_type, dim)
+
+  Description:
+    ParamArray that only holds the values actually assigned, as sorted,
+  disjoint runs of consecutive flat (Fortran order) positions, each run one
+  ndarray. Overlapping or adjacent assignments are merged into one run, so a
+  fragment setting a couple of burns holds a couple of short runs, whatever
+  the parameter's MIRAGE dimensions. values, isset and the flat views are
+  materialized densely the first time they are used after an assignment and
+  kept until the next one; they are read-only.
+
+  Inputs:
+    data_type:  (str) MIRAGE data_type of the parameter
+    dim:        (list) MIRAGE dimensions of the parameter
+  '''
+  __slots__ = ('dtype','dim','size','_starts','_runs','_dense')
+
+  def __init__(self, data_type, dim):
+    self.dtype   = numpy_dtype(data_type)
+    self.dim     = tuple(dim)
+    self.size    = int(np.prod(dim))
+    self._starts = []
+    self._runs   = []
+    self._dense  = None
+
+  def __repr__(self):
+    return 'SparseParamArray(%s, shape=%s, set=%i, runs=%i)'%(self.dtype, self.dim,
+                                                             self.count(), len(self._runs))
+
+  def __getstate__(self):
+    # only the runs are pickled, never the materialized arrays
+    return (self.dtype, self.dim, self.size, self._starts, self._runs)
+
+  def __setstate__(self, state):
+    self.dtype, self.dim, self.size, self._starts, self._runs = state
+    self._dense = None
+
+  def count(self):
+    '''
+    count(self)
+
+    Description:
+      Number of values assigned.
+    '''
+    return sum(len(run) for run in self._runs)
+
+  def runs(self):
+    '''
+    runs(self)
+
+    Description:
+      (start, values) of every run of assigned values in flat order, values
+    being the run's own ndarray.
+    '''
+    return zip(self._starts, self._runs)
+
+  def assign(self, flat_index, vals):
+    vals_length = len(vals)
+    trimmed     = 0
+    if vals_length + flat_index > self.size:
+      trimmed     = vals_length + flat_index - self.size
+      vals_length = self.size - flat_index
+      vals = vals.clamp(vals_length) if isinstance(vals, ValueRuns) else vals[:vals_length]
+    if vals_length <= 0:
+      return trimmed
+    if isinstance(vals, ValueRuns):
+      # nothing is written at the positions of null values
+      for offset, piece in vals.pieces():
+        run = np.empty(len(piece), dtype=self.dtype)
+        piece.fill(run, 0)
+        self._insert(flat_index+offset, run)
+    else:
+      run = np.empty(vals_length, dtype=self.dtype)
+      run[:] = vals
+      self._insert(flat_index, run)
+    return trimmed
+
+  def _insert(self, flat_index, run):
+    # add a run of values starting at flat_index, merging it with the runs it
+    # overlaps or touches
+    stop = flat_index+len(run)
+    # runs from first up to last overlap or touch the new one and are merged into it
+    first = bisect_left(self._starts, flat_index)
+    if first and self._starts[first-1]+len(self._runs[first-1]) >= flat_index:
+      first -= 1
+    last = bisect_right(self._starts, stop)
+    if first < last:
+      pieces = [run]
+      head_start, head = self._starts[first], self._runs[first]
+      if head_start < flat_index:
+        pieces.insert(0, head[:flat_index-head_start])
+      tail_start, tail = self._starts[last-1], self._runs[last-1]
+      if tail_start+len(tail) > stop:
+        pieces.append(tail[stop-tail_start:])
+      flat_index = min(flat_index, head_start)
+      run = np.concatenate(pieces) if len(pieces) > 1 else run
+    self._starts[first:last] = [flat_index]
+    self._runs[first:last]   = [run]
+    self._dense = None
+
+  def get(self, flat_index, default=None):
+    '''
+    get(self, flat_index, default=None)
+
+    Description:
+      Value at a 0-based flat (Fortran order) index, or default if it was not
+    assigned, without materializing anything.
+    '''
+    i = bisect_right(self._starts, flat_index)-1
+    if i >= 0 and flat_index-self._starts[i] < len(self._runs[i]):
+      return self._runs[i].item(flat_index-self._starts[i])
+    return default
+
+  def densify(self):
+    '''
+    densify(self)
+
+    Description:
+      Dense, writable ParamArray copy of the values.
+    '''
+    arr = ParamArray.__new__(ParamArray)
+    arr._flat, arr._mask = self._materialize(copy=True)
+    arr.values = arr._flat.reshape(self.dim, order='F')
+    arr.isset  = arr._mask.reshape(self.dim, order='F')
+    return arr
+
+  def _materialize(self, copy=False):
+    if self._dense is None or copy:
+      flat = np.zeros(self.size, dtype=self.dtype)
+      mask = np.zeros(self.size, dtype=np.bool_)
+      for start, run in zip(self._starts, self._runs):
+        flat[start:start+len(run)] = run
+        mask[start:start+len(run)] = True
+      if copy:
+        return flat, mask
+      flat.flags.writeable = False
+      mask.flags.writeable = False
+      self._dense = (flat, mask)
+    return self._dense
+
+  _flat  = property(lambda self: self._materialize()[0])
+  _mask  = property(lambda self: self._materialize()[1])
+  values = property(lambda self: self._materialize()[0].reshape(self.dim, order='F'))
+  isset  = property(lambda self: self._materialize()[1].reshape(self.dim, order='F'))
+
+class ArrayGroup(Obj):
+  '''
+  ArrayGroup(name)
+
+  Description:
+    Container for the parameters of one MIRAGE group in array-backed mode, with
+  one ParamArray attribute per parameter that has been assigned.
+  '''
+  def __init__(self,name='obj'):
+    Obj.__init__(self,name)
+
+class IndexRecord(object):
+  '''
+  IndexRecord(group, index)
+
+  Description:
+    Base of the record types made by record_type(). A record is a view of
+  everything an IndexedArrayGroup holds for one index of the last dimension
+  (e.g. one burn number), with one attribute per parameter of the group.
+  Nothing is copied: an attribute is the value at that index, a numpy view
+  for parameters with more than one dimension, or None if no value of the
+  parameter was assigned at that index. Setting an attribute stores into the
+  group's ParamArray, values and isset alike, as an assignment would.
+
+  Inputs:
+    group:  (IndexedArrayGroup) group the record belongs to
+    index:  (int) index of the last dimension, as written in the namelist
+  '''
+  __slots__ = ('group','index')
+  # parameter names of the group, in schema order, and (first, last+1) of
+  # its indices, set on each record type
+  params    = ()
+  bounds    = (0, 0)
+
+  def __init__(self, group, index):
+    self.group = group
+    self.index = index
+
+  def __repr__(self):
+    vals = []
+    for param in self.params:
+      val = getattr(self, param)
+      if val is not None:
+        vals.append('%s=%s'%(param, val.tolist() if isinstance(val, np.ndarray) else repr(val)))
+    return '%s(%i: %s)'%(type(self).__name__, self.index, ', '.join(vals))
+
+def _record_value(pdef):
+  # getter of one parameter's value on a record
+  last = len(pdef.dim)-1
+  low  = pdef.lower[-1]
+  high = low+pdef.dim[-1]
+  name = pdef.name
+  def getter(record):
+    arr = record.group.__dict__.get(name)
+    if arr is None or not low <= record.index < high:
+      return None
+    offset = record.index-low
+    if last == 0:
+      # item() skips creating a numpy scalar
+      if not arr._mask.item(offset):
+        return None
+      return arr._flat.item(offset)
+    if not arr.isset[..., offset].any():
+      return None
+    return arr.values[..., offset]
+  return getter
+
+def _record_setter(pdef):
+  # setter of one parameter's value on a record, written through to the
+  # group's ParamArray as an assignment of the whole slice at that index
+  low   = pdef.lower[-1]
+  high  = low+pdef.dim[-1]
+  inner = int(np.prod(pdef.dim[:-1]))
+  name  = pdef.name
+  def setter(record, value):
+    if value is None:
+      raise TypeError('%s of a record cannot be unset'%name)
+    if not low <= record.index < high:
+      raise IndexError('%s has no index %i (indices %i to %i)'%(name, record.index, low, high-1))
+    vals = np.asarray(value, dtype=numpy_dtype(pdef.dtype)).reshape(-1)
+    if vals.size == 1:
+      vals = np.repeat(vals, inner)
+    elif vals.size != inner:
+      raise ValueError('%s takes %i values per index, not %i'%(name, inner, vals.size))
+    group = record.group
+    arr   = group.__dict__.get(name)
+    if arr is None:
+      arr = group._array_type()(pdef.dtype, pdef.dim)
+      setattr(group, name, arr)
+    arr.assign((record.index-low)*inner, vals)
+  return setter
+
+# {group: record type}, filled in by record_type()
+_record_types = {}
+
+def record_type(group):
+  '''
+  record_type(group)
+
+  Description:
+    Record type for one index of an indexed group such as FINITE-BURNS,
+  generated from the schema the first time it is needed. It is an
+  IndexRecord subclass with __slots__ and an attribute for every parameter
+  of the group, so records take no per-instance dictionary and misspelt
+  parameter names raise AttributeError. Setting an attribute assigns the
+  value(s) at the record's index in the group. The type's bounds are the
+  first and one past the last index of the group.
+
+  Inputs:
+    group:  (str) MIRAGE group name
+
+  Output:
+    cls:    (type) IndexRecord subclass, e.g. FiniteBurnsRecord
+  '''
+  cls = _record_types.get(group)
+  if cls is None:
+    pdefs = [pdef for pdef in get_schema().values() if pdef.group == group]
+    attrs = {'__slots__': (), 'params': tuple(pdef.name for pdef in pdefs),
+             'bounds': (min(pdef.lower[-1] for pdef in pdefs),
+                        max(pdef.lower[-1]+pdef.dim[-1] for pdef in pdefs))}
+    for pdef in pdefs:
+      attrs[pdef.name] = property(_record_value(pdef), _record_setter(pdef))
+    name = ''.join(word.capitalize() for word in group.split('-'))+'Record'
+    cls  = type(name, (IndexRecord,), attrs)
+    _record_types[group] = cls
+  return cls
+
+class IndexedArrayGroup(ArrayGroup):
+  '''
+  IndexedArrayGroup(name)
+
+  Description:
+    ArrayGroup of an indexed group such as FINITE-BURNS. The values are held
+  struct-of-arrays, one ParamArray per parameter with the index (e.g. burn
+  number) as the last dimension, and the group can also be used like the
+  per-index objects of the default storage by indexing it with the integer
+  index, e.g. group[3].DMA1. Iterating gives a record for every index with
+  anything assigned, in order.
+  '''
+  def __init__(self,name='obj'):
+    ArrayGroup.__init__(self,name)
+
+  def indices(self):
+    '''
+    indices(self)
+
+    Description:
+      Sorted array of every index with at least one value assigned.
+    '''
+    schema = get_schema()
+    # assigned[i] is set once anything is assigned at index i
+    assigned = None
+    for name, arr in self.__dict__.items():
+      if not isinstance(arr, ParamArray):
+        continue
+      pdef = schema[name]
+      mask = arr._mask
+      if len(pdef.dim) > 1:
+        # one row per index of the last dimension
+        mask = mask.reshape(pdef.dim[-1], -1).any(axis=1)
+      if assigned is None:
+        assigned = np.zeros(pdef.lower[-1]+pdef.dim[-1], dtype=np.bool_)
+      elif len(assigned) < pdef.lower[-1]+pdef.dim[-1]:
+        assigned = np.concatenate((assigned, np.zeros(pdef.lower[-1]+pdef.dim[-1]-len(assigned), dtype=np.bool_)))
+      assigned[pdef.lower[-1]:pdef.lower[-1]+pdef.dim[-1]] |= mask
+    if assigned is None:
+      return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(assigned)
+
+  def __getitem__(self, index):
+    if isinstance(index, (bool, np.bool_)) or not isinstance(index, (int, np.integer)):
+      raise TypeError('%s is indexed by an int, not %s'%(self._name, type(index).__name__))
+    cls = record_type(self._name)
+    low, high = cls.bounds
+    if not low <= index < high:
+      raise IndexError('%s has no index %i (indices %i to %i)'%(self._name, index, low, high-1))
+    return cls(self, int(index))
+
+  def _array_type(self):
+    # ParamArray class the group's parameters are stored in
+    for arr in self.__dict__.values():
+      if isinstance(arr, ParamArray):
+        return type(arr)
+    return ParamArray
+
+  def __iter__(self):
+    cls = record_type(self._name)
+    for index in self.indices().tolist():
+      yield cls(self, index)
+
+  def __contains__(self, index):
+    return index in self.indices().tolist()
+
+  def __len__(self):
+    return len(self.indices())
+
+  def __bool__(self):
+    # a group exists because something was assigned to it
+    return True
+
+def store_assignment_arrays(gin_dict, assignment, array_type=ParamArray):
+  '''
+  store_assignment_arrays(gin_dict, assignment, array_type=ParamArray)
+
+  Description:
+    Array-backed equivalent of store_assignment(). Every group is an
+  ArrayGroup holding one ParamArray per parameter, the indexed ones such as
+  FINITE-BURNS being an IndexedArrayGroup that can also be indexed by integer.
+
+  Inputs:
+    gin_dict:   (dict) parsed namelist data, updated in place
+    assignment: (Assignment) parsed assignment record
+
+  Optional Args (type):
+    array_type: (type) ParamArray class new parameters are stored in
+
+  Output:
+    trimmed:    (int) number of values trimmed off
+  '''
+  param, group, indices, rhs_vals, lnum = assignment
+  mirage_param_def = get_schema()[param]
+  try:
+    flat_index = flatten_index(indices, mirage_param_def.dim, mirage_param_def.lower)
+  except NamelistError as err:
+    raise err.locate(line=lnum, param=param)
+  if group not in gin_dict.keys():
+    if group in indexed_groups.keys():
+      gin_dict[group] = IndexedArrayGroup(group)
+    else:
+      gin_dict[group] = ArrayGroup(group)
+  arr = gin_dict[group].__dict__.get(param)
+  if arr is None:
+    arr = array_type(mirage_param_def.dtype, mirage_param_def.dim)
+    setattr(gin_dict[group], param, arr)
+  trimmed = arr.assign(flat_index, rhs_vals)
+  if trimmed:
+    _warn_trimmed(mirage_param_def, indices, trimmed)
+  return trimmed
+
+def store_assignment_sparse(gin_dict, assignment):
+  '''
+  store_assignment_sparse(gin_dict, assignment)
+
+  Description:
+    store_assignment_arrays() with every parameter a SparseParamArray, so
+  memory scales with the values assigned rather than the MIRAGE dimensions.
+  '''
+  return store_assignment_arrays(gin_dict, assignment, SparseParamArray)
+
+def _store_function(as_arrays):
+  # store_assignment function for each as_arrays storage mode
+  if as_arrays == 'sparse':
+    return store_assignment_sparse
+  return store_assignment_arrays if as_arrays else store_assignment
+
+def _flatten_nested(val, out):
+  # append the values of nested per-index lists in Fortran order (the outermost
+  # list is the last dimension)
+  if isinstance(val, list):
+    for elem in val:
+      _flatten_nested(elem, out)
+  else:
+    out.append(val)
+
+def iter_param_values(gin_dict):
+  '''
+  iter_param_values(gin_dict)
+
+  Description:
+    Flatten every parameter stored in gin_dict, whichever storage it uses
+  (default lists and per-index objects, or as_arrays=True).
+
+  Inputs:
+    gin_dict: (dict) parsed namelist data
+
+  Output:
+    generator of (pdef, values, isset), where values is the flat Fortran-order
+    list of all of the parameter's values and isset is a boolean array marking
+    the ones that were assigned
+  '''
+  schema = get_schema()
+  for group, data in gin_dict.items():
+    for pdef in schema.values():
+      if pdef.group == group:
+        flat = _flat_values(pdef, data)
+        if flat is not None:
+          yield (pdef,)+flat
+
+def _flat_values(pdef, data):
+  # (values, isset) of one parameter of a group as iter_param_values() gives
+  # them, or None if it is not assigned
+  if pdef.group in indexed_groups.keys() and isinstance(data, dict):
+    # one object per index of the last dimension, keyed by that index
+    block  = pdef.strides[-1]
+    values = [None]*pdef.size
+    for key, obj in data.items():
+      val = getattr(obj, pdef.name, None)
+      if val is None:
+        continue
+      start = (int(key)-pdef.lower[-1])*block
+      flat  = []
+      _flatten_nested(val, flat)
+      values[start:start+block] = flat
+    isset = np.fromiter((val is not None for val in values), dtype=np.bool_, count=pdef.size)
+    return (values, isset) if isset.any() else None
+  val = getattr(data, pdef.name, None)
+  if val is None:
+    return None
+  elif isinstance(val, ParamArray):
+    return val._flat.tolist(), val._mask
+  elif isinstance(val, list):
+    return val, np.fromiter((elem is not None for elem in val), dtype=np.bool_, count=len(val))
+  return [val], np.ones(1, dtype=np.bool_)
+
+def _typed_arrays(pdef, values, isset):
+  # flat typed (values, isset) arrays of a list of values with None where unset
+  flat = np.zeros(pdef.size, dtype=numpy_dtype(pdef.dtype))
+  pos  = np.flatnonzero(isset)
+  flat[pos] = [values[i] for i in pos.tolist()]
+  return flat, np.asarray(isset, dtype=np.bool_)
+
+def param_arrays(gin_dict):
+  '''
+  param_arrays(gin_dict)
+
+  Description:
+    Every assigned parameter of a parsed gin_dict in either storage mode as
+  flat typed arrays. Array-backed parameters are returned as they are, without
+  copying; lists and per-index objects are converted.
+
+  Inputs:
+    gin_dict: (dict) parsed namelist data
+
+  Output:
+    arrays:   (dict) {param: (values, isset)}, flat Fortran-order ndarrays
+  '''
+  arrays = {}
+  for group, data in gin_dict.items():
+    if isinstance(data, ArrayGroup):
+      for name, arr in data.__dict__.items():
+        if isinstance(arr, ParamArray):
+          arrays[name] = (arr._flat, arr._mask)
+      continue
+    # lists and per-index objects, with None where unset
+    for pdef, values, isset in iter_param_values({group: data}):
+      arrays[pdef.name] = _typed_arrays(pdef, values, isset)
+  return arrays
+
+def param_array(gin_dict, param):
+  '''
+  param_array(gin_dict, param)
+
+  Description:
+    One parameter of a parsed gin_dict as param_arrays() gives it, looking at
+  nothing else: an array-backed parameter is returned as it is (a sparse one
+  materialized), a list or per-index objects are converted.
+
+  Inputs:
+    gin_dict: (dict) parsed namelist data
+    param:    (str) parameter name
+
+  Output:
+    arrays:   (tuple) (values, isset), flat Fortran-order ndarrays, or None if
+                      the parameter is not assigned
+  '''
+  pdef = get_schema()[param]
+  data = gin_dict.get(pdef.group)
+  if data is None:
+    return None
+  if isinstance(data, ArrayGroup):
+    arr = data.__dict__.get(param)
+    return (arr._flat, arr._mask) if isinstance(arr, ParamArray) else None
+  flat = _flat_values(pdef, data)
+  return None if flat is None else _typed_arrays(pdef, *flat)
+
+def handle_assignment(gin_dict, param, indices, rhs):
+  '''
+  handle_assignment(gin_dict, param, indices, rhs)
+
+  Description:
+    Convert the values of a single assignment statement and store them in
+  gin_dict. Shorthand for parse_assignment() followed by store_assignment().
+  '''
+  store_assignment(gin_dict, parse_assignment(param, indices, rhs))
+
+class ReadStats(object):
+  '''
+  ReadStats(callback=None)
+
+  Description:
+    Optional instrumentation of the read path. Pass one to
+  read_finiteburn_file(), iter_assignments() or read_many() and it adds up,
+  over every file read with it:
+    times:        seconds spent in each phase
+                    lex         reading lines and lexing them into tokens
+                    statements  assembling tokens into assignment statements
+                    dispatch    resolving each parameter, its group and indices
+                    convert     converting values
+                    store       writing values into gin_dict
+    files:        number of files read
+    lines:        number of lines lexed, up to the ; terminator of each file
+    statements:   number of assignment statements found, valid or not
+    assignments:  number of assignment statements converted
+    values:       number of values, an n*value entry counting as n
+    repeats:      number of n*value entries
+    trimmed:      number of values trimmed off past a parameter's dimensions
+    group_bytes:  approximate memory held by each group of the gin_dicts read,
+                  {group: bytes}
+  Nothing is timed or counted on reads without a ReadStats.
+
+  Optional Args (type):
+    callback:   (function) called as callback(ginnl, file_stats) after each
+                           file is read, file_stats being a ReadStats for that
+                           file alone. Useful for logging slow files.
+  '''
+  phases = ('lex','statements','dispatch','convert','store')
+
+  def __init__(self, callback=None):
+    self.callback    = callback
+    self.times       = dict.fromkeys(self.phases, 0.0)
+    self.files       = 0
+    self.lines       = 0
+    self.statements  = 0
+    self.assignments = 0
+    self.values      = 0
+    self.repeats     = 0
+    self.trimmed     = 0
+    self.group_bytes = {}
+
+  def __repr__(self):
+    times = ', '.join('%s=%.3fs'%(phase,self.times[phase]) for phase in self.phases)
+    return 'ReadStats(files=%i, lines=%i, statements=%i, assignments=%i, values=%i, repeats=%i, '\
+           'trimmed=%i, %s)'%(self.files, self.lines, self.statements, self.assignments, self.values,
+                              self.repeats, self.trimmed, times)
+
+  def __getstate__(self):
+    # the callback stays behind when stats are sent between processes
+    state = dict(self.__dict__)
+    state['callback'] = None
+    return state
+
+  @property
+  def total_time(self):
+    return sum(self.times.values())
+
+  def merge(self, other):
+    '''
+    merge(self, other)
+
+    Description:
+      Add the times, counts and group sizes of another ReadStats to this one.
+    '''
+    for phase, secs in other.times.items():
+      self.times[phase] = self.times.get(phase, 0.0)+secs
+    self.files       += other.files
+    self.lines       += other.lines
+    self.statements  += other.statements
+    self.assignments += other.assignments
+    self.values      += other.values
+    self.repeats     += other.repeats
+    self.trimmed     += other.trimmed
+    for group, nbytes in other.group_bytes.items():
+      self.group_bytes[group] = self.group_bytes.get(group, 0)+nbytes
+
+  def timed(self, phase, iterable):
+    '''
+    timed(self, phase, iterable)
+
+    Description:
+      Iterate over iterable, adding the time spent producing each item to
+    times[phase]. Time the caller spends between items is not counted.
+    '''
+    times    = self.times
+    clock    = time.perf_counter
+    iterator = iter(iterable)
+    while True:
+      start = clock()
+      try:
+        item = next(iterator)
+      except StopIteration:
+        times[phase] += clock()-start
+        return
+      times[phase] += clock()-start
+      yield item
+
+def _nbytes(val, seen):
+  # approximate memory held by val and everything it references, each object
+  # counted once
+  if id(val) in seen:
+    return 0
+  seen.add(id(val))
+  if isinstance(val, SparseParamArray):
+    return sys.getsizeof(val)+_nbytes(val._starts, seen)+sum(run.nbytes for run in val._runs)
+  elif isinstance(val, ParamArray):
+    return sys.getsizeof(val)+val._flat.nbytes+val._mask.nbytes
+  elif isinstance(val, np.ndarray):
+    return val.nbytes
+  elif isinstance(val, (list, tuple)):
+    return sys.getsizeof(val)+sum(_nbytes(elem, seen) for elem in val)
+  elif isinstance(val, dict):
+    return sys.getsizeof(val)+sum(_nbytes(key, seen)+_nbytes(elem, seen) for key, elem in val.items())
+  elif hasattr(val, '__dict__'):
+    return sys.getsizeof(val)+_nbytes(val.__dict__, seen)
+  return sys.getsizeof(val)
+
+def group_footprint(gin_dict):
+  '''
+  group_footprint(gin_dict)
+
+  Description:
+    Approximate memory held by each group of a parsed gin_dict, including the
+  objects, lists and arrays holding its values.
+
+  Inputs:
+    gin_dict:   (dict) parsed namelist data
+
+  Output:
+    group_bytes: (dict) {group: bytes}
+  '''
+  return {group: _nbytes(data, set()) for group, data in gin_dict.items()}
+
+def _statement(param, indices, rhs, start, errors):
+  # the assembled statement, unless nothing was assigned in it
+  if rhs:
+    yield param, indices, rhs, start
+    return
+  err = NamelistSyntaxError('Expected a value after =', line=start, param=param)
+  if errors is None:
+    raise err
+  errors.append(err)
+
+def iter_statements(tokens, errors=None):
+  '''
+  iter_statements(tokens, errors=None)
+
+  Description:
+    Assemble assignment statements from a stream of tokenize_namelist()
+  tokens. An assignment could span over multiple lines in the namelist file or
+  there could be multiple assignment statements in a single line, so it is only
+  complete once the next name followed by = (or the end of the file) is
+  reached. A name on the rhs that is not followed by = is an unquoted word
+  such as T or VELOC, which is kept as a value of the statement so it is
+  reported as an invalid value of its parameter.
+
+  Inputs:
+    tokens:   (iterable) (type, value, lnum, col) tokens
+
+  Optional Args (type):
+    errors:   (list) collect syntax errors here instead of raising the first
+                     one. A statement with an error is skipped up to the next
+                     name followed by =.
+
+  Output:
+    generator of (param, indices, rhs, lnum) as taken by parse_assignment()
+  '''
+  param   = None
+  indices = None
+  rhs     = []
+  start   = None
+  # set while skipping the rest of a statement with an error in it
+  skip    = False
+  tokens  = iter(tokens)
+  # token read past a name that turned out not to be needed, read again next
+  pending = None
+  while True:
+    if pending is not None:
+      token, pending = pending, None
+    else:
+      token = next(tokens, None)
+      if token is None:
+        break
+    kind, value, lnum, col = token
+    try:
+      if kind == TOK_NAME:
+        index = None
+        ahead = next(tokens, None)
+        if ahead is not None and ahead[0] == TOK_INDEX:
+          index = ahead[1]
+          ahead = next(tokens, None)
+        if index is None and param is not None and (ahead is None or ahead[0] not in (TOK_EQUALS, TOK_ERROR)):
+          # an unquoted word on the rhs
+          pending = ahead
+          if not skip:
+            rhs.append((1, value, lnum, col))
+          continue
+        # the name starts the next statement, so the current one is complete
+        if param is not None and not skip:
+          yield from _statement(param, indices, rhs, start, errors)
+        param   = value
+        indices = index
+        rhs     = []
+        start   = lnum
+        skip    = False
+        if ahead is not None and ahead[0] == TOK_ERROR:
+          raise ahead[1]
+        if ahead is None or ahead[0] != TOK_EQUALS:
+          pending = ahead
+          raise NamelistSyntaxError('Expected = after parameter', line=lnum, column=col+1, param=param)
+      elif kind == TOK_REPEAT:
+        # the lexer only emits n* directly followed by its value
+        multiplier = value
+        kind, value, lnum, col = next(tokens)
+        rhs.append((multiplier, value, lnum, col))
+      elif kind in (TOK_LITERAL, TOK_STRING):
+        rhs.append((1, value, lnum, col))
+      elif kind == TOK_NULL:
+        rhs.append((value, None, lnum, col))
+        value = '%i*'%(value)
+      elif kind == TOK_END:
         break
+      elif kind == TOK_ERROR:
+        raise value
+      else:
+        raise NamelistSyntaxError('Unexpected %s'%(value), line=lnum, column=col+1)
+      if param is None and not skip:
+        raise NamelistSyntaxError('Value %s has no parameter to assign to'%(_value_text(value)),
+                                  line=lnum, column=col+1)
+    except NamelistError as err:
+      if errors is None:
+        raise
+      errors.append(err.locate(param=param))
+      skip = True
   
   # final case needed since no other way of knowing if last assignment is complete
-  handle_assignment(gin_dict, assignment)
+  if param is not None and not skip:
+    yield from _statement(param, indices, rhs, start, errors)
+
+def _parse_statements(tokens, stats, errors):
+  # parse_assignment() every statement of a token stream, timing the lexing and
+  # statement assembly into stats if given
+  if stats is None:
+    for param, indices, rhs, lnum in iter_statements(tokens, errors):
+      assignment = parse_assignment(param, indices, rhs, lnum, errors=errors)
+      if assignment is not None:
+        yield assignment
+    return
+  lexed = stats.times['lex']
+  try:
+    for param, indices, rhs, lnum in stats.timed('statements', iter_statements(stats.timed('lex', tokens), errors)):
+      stats.statements += 1
+      assignment = parse_assignment(param, indices, rhs, lnum, stats, errors)
+      if assignment is not None:
+        yield assignment
+  finally:
+    # pulling statements includes the lexing it pulled in, which is counted apart
+    stats.times['statements'] -= stats.times['lex']-lexed
+
+def _source_name(ginnl):
+  # file name reported in errors, for a path or an open file
+  if hasattr(ginnl,'read'):
+    return getattr(ginnl,'name',None)
+  return ginnl
+
+def iter_assignments(ginnl, use_mmap=False, stats=None, errors=None):
+  '''
+  iter_assignments(ginnl, use_mmap=False, stats=None, errors=None)
+
+  Description:
+    Stream the assignment statements of a gin namelist file, yielding each one
+  as soon as it is complete. Values are converted but nothing is stored, so the
+  caller is free to filter or forward assignments while the file is still being
+  read.
+
+  Inputs:
+    ginnl:    (str or file) path to the namelist file or an open text file
+
+  Optional Args (type):
+    use_mmap: (bool) memory-map the file and lex it as bytes with
+                     tokenize_namelist_bytes() instead of decoding it line
+                     by line. Reads give the same results either way; peak
+                     memory is set by the largest statement rather than the
+                     lines, so measure with ginnl_bench.compare_mmap() before
+                     relying on it
+    stats:    (ReadStats) instrumentation to record the lex, statements,
+                          dispatch and convert phases in
+    errors:   (list) collect every NamelistError here instead of raising the
+                     first one. Statements with errors are skipped and the
+                     rest of the file is still read.
+
+  Output:
+    generator of Assignment(param, group, indices, values, lnum) records
+  '''
+  name  = _source_name(ginnl)
+  first = 0 if errors is None else len(errors)
+  try:
+    for assignment in _file_assignments(ginnl, use_mmap, stats, errors):
+      yield assignment
+  except NamelistError as err:
+    raise err.locate(file=name)
+  finally:
+    if errors is not None:
+      for err in errors[first:]:
+        err.locate(file=name)
+
+def _file_assignments(ginnl, use_mmap, stats, errors):
+  # iter_assignments() without adding the file name to errors
+  if hasattr(ginnl,'read'):
+    lines = ginnl if stats is None else _counted_lines(ginnl, stats)
+    for assignment in _parse_statements(tokenize_namelist(lines), stats, errors):
+      yield assignment
+    return
+  
+  if not os.path.exists(ginnl):
+    raise NamelistError('gin namelist file provided does not exist')
+  
+  if use_mmap:
+    with open(ginnl,'rb') as ifid:
+      # an empty file cannot be mapped, and has nothing to read anyway
+      if os.fstat(ifid.fileno()).st_size == 0:
+        return
+      with mmap.mmap(ifid.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        if stats is None:
+          tokens = tokenize_namelist_bytes(buf)
+        else:
+          tokens = _tokenize_spans(_counted_lines(_buffer_spans(buf, 1), stats),
+                                   _token_pattern_bytes.match, _decode, b',')
+        for assignment in _parse_statements(tokens, stats, errors):
+          yield assignment
+    return
+  
+  with open(ginnl,'r') as ifid:
+    lines = ifid if stats is None else _counted_lines(ifid, stats)
+    for assignment in _parse_statements(tokenize_namelist(lines), stats, errors):
+      yield assignment
+
+def read_finiteburn_file(ginnl, as_arrays=False, use_mmap=False, stats=None, errors=None):
+  '''
+  read_finiteburn_file(ginnl, as_arrays=False, use_mmap=False, stats=None, errors=None)
+
+  Description:
+    Read a gin namelist file into a dictionary keyed by mirage group name.
+
+  Inputs:
+    ginnl:      (str or file) path to the namelist file or an open text file
+
+  Optional Args (type):
+    as_arrays:  (bool or str) store every group as an ArrayGroup of typed
+                       ParamArray values instead of lists and objects, or of
+                       SparseParamArray values holding only what was assigned
+                       if 'sparse'
+    use_mmap:   (bool) memory-map the file and lex it as bytes, see
+                       iter_assignments()
+    stats:      (ReadStats) instrumentation to record phase times, counts and
+                            group sizes in
+    errors:     (list) collect every NamelistError found here instead of
+                       raising the first one. The whole file is read, skipping
+                       only the statements with errors, so one pass reports
+                       all of its problems.
+
+  Output:
+    gin_dict:   (dict) parsed namelist data
+
+  Raises NamelistError (or one of its subclasses) for the first problem found,
+  unless collecting them in errors.
+  '''
+  # Complex data structure with the first level of keys being mirage group names.
+  # Most of these group names will point to an object storing the data read in
+  # for the parameters in this group.
+  # Some more notable group names such as FINITE-BURNS,... will point to another
+  # dictionary where the keys will be the first dimension indices (burn number)
+  # and each of these index keys will point to a formatted object storing the data
+  # read in for the parameters in this group.
+  gin_dict = {}
+  
+  # Each completed assignment statement is stored in an appropriately defined
+  # object in the gin_dict data structure as soon as it is read.
+  # In array-backed mode every group is instead an ArrayGroup of typed arrays.
+  store = _store_function(as_arrays)
+  if errors is not None:
+    store = _collecting(store, errors, _source_name(ginnl))
+  try:
+    if stats is None:
+      for assignment in iter_assignments(ginnl, use_mmap=use_mmap, errors=errors):
+        store(gin_dict, assignment)
+      return gin_dict
+    
+    file_stats = ReadStats()
+    clock      = time.perf_counter
+    for assignment in iter_assignments(ginnl, use_mmap=use_mmap, stats=file_stats, errors=errors):
+      start = clock()
+      file_stats.trimmed += store(gin_dict, assignment)
+      file_stats.times['store'] += clock()-start
+  except NamelistError as err:
+    # errors from storing are only located to the line
+    raise err.locate(file=_source_name(ginnl))
+  _finish_stats(stats, file_stats, ginnl, gin_dict)
   
   return gin_dict
+
+def _collecting(store, errors, name):
+  # store function that adds a problem storing an assignment to errors instead
+  # of raising it, and skips that assignment
+  def collecting_store(gin_dict, assignment):
+    try:
+      return store(gin_dict, assignment)
+    except NamelistError as err:
+      errors.append(err.locate(file=name))
+      return 0
+  return collecting_store
+
+def _finish_stats(stats, file_stats, ginnl, gin_dict):
+  # add the stats of one completed file to stats and report them to its callback
+  file_stats.files       = 1
+  file_stats.group_bytes = group_footprint(gin_dict)
+  stats.merge(file_stats)
+  if stats.callback is not None:
+    stats.callback(ginnl, file_stats)
   
     
+# Result for a single file from read_many(). gin_dict is None and error holds the
+# NamelistError if the file could not be read. diagnostics holds every problem
+# collected from the file when reading with collect=True.
+BatchResult = namedtuple('BatchResult', ['path','gin_dict','error','diagnostics'])
+
+def _read_file(ginnl, as_arrays=False, stats=None, collect=False):
+  # Worker for read_many(). The file is read into its finished storage here, so
+  # the calling process only has to unpickle the result; array-backed storage
+  # pickles as a few ndarrays per parameter. When stats is a ReadStats the
+  # file's phases are recorded in it and it is sent back along with the result.
+  errors = [] if collect else None
+  try:
+    gin_dict = read_finiteburn_file(ginnl, as_arrays=as_arrays, stats=stats, errors=errors)
+  except NamelistError as err:
+    return None, err, errors or [], stats
+  except Exception as err:
+    # a failure that is not a problem with the file should not stop the batch either
+    return None, NamelistError(repr(err), file=ginnl), errors or [], stats
+  return gin_dict, None, errors or [], stats
+
+def read_many(paths, workers=None, chunksize=None, as_arrays=False, stats=None, collect=False):
+  '''
+  read_many(paths, workers=None, chunksize=None, as_arrays=False, stats=None, collect=False)
+
+  Description:
+    Read a batch of gin namelist files across a pool of worker processes.
+  Each worker reads whole files into their finished gin_dicts, which are sent
+  back as they are, so the calling process does no per-value work. A file that
+  fails to parse is reported in its result instead of stopping the batch.
+  Array-backed storage (as_arrays=True or 'sparse') is the cheapest to send
+  back.
+
+  Inputs:
+    paths:      (list) paths to the namelist files
+
+  Optional Args (type):
+    workers:    (int) number of worker processes, defaults to os.cpu_count().
+                      1 reads the files in the current process.
+    chunksize:  (int) number of files handed to a worker at a time
+    as_arrays:  (bool or str) store results as in read_finiteburn_file(as_arrays=)
+    stats:      (ReadStats) instrumentation to record phase times, counts and
+                            group sizes of every file that was read in. The
+                            callback is called in this process.
+    collect:    (bool) read every file to the end, collecting all of its
+                       problems in diagnostics as read_finiteburn_file(errors=)
+                       does, rather than stopping at the first one
+
+  Output:
+    results:    (list) BatchResult(path, gin_dict, error, diagnostics) for each
+                       path, in the same order as paths
+  '''
+  paths = list(paths)
+  if workers is None:
+    workers = os.cpu_count() or 1
+  workers = max(1, min(workers, len(paths)))
+  # each file is recorded in a fresh ReadStats when instrumented
+  file_stats = [None if stats is None else ReadStats() for path in paths]
+  modes      = [as_arrays]*len(paths)
+  collects   = [collect]*len(paths)
+  
+  if workers == 1:
+    parsed = map(_read_file, paths, modes, file_stats, collects)
+  else:
+    if chunksize is None:
+      # a few chunks per worker balances load without paying IPC per file
+      chunksize = max(1, len(paths)//(workers*4))
+    from concurrent.futures import ProcessPoolExecutor
+    pool   = ProcessPoolExecutor(max_workers=workers)
+    parsed = pool.map(_read_file, paths, modes, file_stats, collects, chunksize=chunksize)
+  
+  results = []
+  try:
+    for path, (gin_dict, error, diagnostics, path_stats) in zip(paths, parsed):
+      if path_stats is not None and error is None:
+        stats.merge(path_stats)
+        if stats.callback is not None:
+          stats.callback(path, path_stats)
+      results.append(BatchResult(path, gin_dict, error, diagnostics))
+  finally:
+    if workers > 1:
+      pool.shutdown()
+  
+  return results
+
+# Matches a line that starts a new assignment statement. Every statement starting
+# at the beginning of a line ends the previous one, so these lines split a file
+# into chunks of whole statements that can be parsed independently.
+_statement_start = re.compile(r"\s*[A-Za-z][A-Za-z0-9_]*\s*(?:\([^)]*\))?\s*=")
+
+class NamelistSession(object):
+  '''
+  NamelistSession(ginnl, as_arrays=False)
+
+  Description:
+    Keeps a parsed namelist file up to date across edits. The file is split
+  into chunks of whole assignment statements, and the hash, line span and
+  parsed assignments of each chunk are remembered. When read() is called again
+  only chunks whose text changed are lexed, and only the parameters assigned
+  in changed, added, removed or reordered chunks are reset and rebuilt in the
+  existing gin_dict. The result is the same as a full read_finiteburn_file().
+
+  Inputs:
+    ginnl:      (str) path to the namelist file
+
+  Optional Args (type):
+    as_arrays:  (bool or str) store results as in read_finiteburn_file(as_arrays=)
+  '''
+  def __init__(self, ginnl, as_arrays=False):
+    self.ginnl     = ginnl
+    self.as_arrays = as_arrays
+    self.gin_dict  = None
+    # number of chunks that had to be lexed by the last read()
+    self.reparsed  = 0
+    # [hash, first line number, assignments, ends with ;] for each chunk in order
+    self._chunks   = []
+
+  def _split(self, lines):
+    # (first, stop) line ranges of each chunk
+    starts = [0]
+    match  = _statement_start.match
+    for i in range(1,len(lines)):
+      if match(lines[i][:80]):
+        starts.append(i)
+    starts.append(len(lines))
+    return [(starts[i],starts[i+1]) for i in range(len(starts)-1) if starts[i] < starts[i+1]]
+
+  def _lex(self, lines, first_lnum):
+    tokens      = list(tokenize_namelist(lines, first_lnum))
+    terminated  = any(tok[0] == TOK_END for tok in tokens)
+    assignments = [parse_assignment(param, indices, rhs, lnum)
+                   for param, indices, rhs, lnum in iter_statements(tokens)]
+    return assignments, terminated
+
+  def read(self):
+    '''
+    read(self)
+
+    Description:
+      Bring gin_dict up to date with the file, re-parsing only what changed
+    since the previous read().
+
+    Output:
+      gin_dict: (dict) parsed namelist data
+    '''
+    import hashlib
+    if not os.path.exists(self.ginnl):
+      raise NamelistError('gin namelist file provided does not exist', file=self.ginnl)
+    with open(self.ginnl,'r') as ifid:
+      lines = ifid.readlines()
+    
+    # previous chunks by hash, in file order, so identical chunks match up in order
+    previous = {}
+    for pos, chunk in enumerate(self._chunks):
+      previous.setdefault(chunk[0],[]).append((pos,chunk))
+    
+    chunks   = []
+    changed  = set()
+    last_pos = -1
+    self.reparsed = 0
+    for first, stop in self._split(lines):
+      key = hashlib.blake2b(''.join(lines[first:stop]).encode(), digest_size=16).digest()
+      if key in previous:
+        pos, chunk = previous[key].pop(0)
+        if not previous[key]:
+          del previous[key]
+        assignments, terminated = chunk[2], chunk[3]
+        shift = first+1-chunk[1]
+        if shift:
+          assignments = [assignment._replace(lnum=assignment.lnum+shift) for assignment in assignments]
+        # a chunk that moved ahead of one that used to come before it can change
+        # which of two overlapping assignments wins
+        if pos < last_pos:
+          changed.update(assignment.param for assignment in assignments)
+        last_pos = max(last_pos,pos)
+      else:
+        try:
+          assignments, terminated = self._lex(lines[first:stop], first+1)
+        except NamelistError as err:
+          # nothing has been changed yet, so the session is still as of the last read()
+          raise err.locate(file=self.ginnl)
+        changed.update(assignment.param for assignment in assignments)
+        self.reparsed += 1
+      chunks.append([key, first+1, assignments, terminated])
+      if terminated:
+        break
+    # anything assigned in a chunk that no longer exists has to be rebuilt too
+    for leftovers in previous.values():
+      for pos, chunk in leftovers:
+        changed.update(assignment.param for assignment in chunk[2])
+    self._chunks = chunks
+    
+    if self.gin_dict is None:
+      self.gin_dict = {}
+      changed = None
+    try:
+      self._update(changed)
+    except NamelistError as err:
+      # gin_dict is part way through being rebuilt, so start over on the next read()
+      self.gin_dict = None
+      self._chunks  = []
+      raise err.locate(file=self.ginnl)
+    return self.gin_dict
+
+  def _update(self, changed):
+    # Reset every changed parameter and store all of its assignments again in
+    # file order. changed=None stores everything.
+    schema = get_schema()
+    store  = _store_function(self.as_arrays)
+    if changed is not None:
+      if not changed:
+        return
+      for param in changed:
+        self._reset(schema[param])
+    for chunk in self._chunks:
+      for assignment in chunk[2]:
+        if changed is None or assignment.param in changed:
+          store(self.gin_dict, assignment)
+    if changed is not None:
+      for group in set(schema[param].group for param in changed):
+        self._prune(group)
+
+  def _reset(self, pdef):
+    data = self.gin_dict.get(pdef.group)
+    if data is None:
+      return
+    if isinstance(data, dict):
+      # per-index objects go back to the value they were constructed with
+      default = getattr(indexed_groups[pdef.group](), pdef.name, None)
+      for obj in data.values():
+        setattr(obj, pdef.name, copy.deepcopy(default))
+    elif pdef.name in data.__dict__:
+      delattr(data, pdef.name)
+
+  def _prune(self, group):
+    # drop anything a full read would not have created: per-index objects no
+    # assignment reaches any more, and groups left without parameters
+    data = self.gin_dict.get(group)
+    if data is None:
+      return
+    if isinstance(data, dict):
+      schema = get_schema()
+      keep   = set()
+      for chunk in self._chunks:
+        for assignment in chunk[2]:
+          if assignment.group != group:
+            continue
+          pdef  = schema[assignment.param]
+          flat  = flatten_index(assignment.indices, pdef.dim, pdef.lower)
+          block = pdef.strides[-1]
+          for offset, piece in assignment.values.pieces():
+            first = flat+offset
+            count = min(len(piece), pdef.size-first)
+            for i in range(first//block, (first+count-1)//block+1):
+              keep.add(index_key(pdef, i))
+      for key in [key for key in data.keys() if key not in keep]:
+        del data[key]
+      if not data:
+        del self.gin_dict[group]
+    elif not any(not attr.startswith('_') for attr in data.__dict__):
+      del self.gin_dict[group]
+
+# INCLUDE 'path' on a line of its own, optionally followed by a comment
+_include_line = re.compile(r"^\s*INCLUDE\s*'([^']+)'\s*(?:[!#$].*)?$", re.IGNORECASE)
+
+class FragmentCache(object):
+  '''
+  FragmentCache()
+
+  Description:
+    In-memory cache of parsed namelist fragments for reading many files that
+  are assembled from shared pieces. A line holding only
+
+    INCLUDE 'path'
+
+  (optionally followed by a comment) reads the fragment at path in its place,
+  path being relative to the directory of the file that includes it. Includes
+  nest, and an include cycle raises IncludeError. A ; terminator ends only the
+  fragment it is in, including any INCLUDE lines after it. An INCLUDE must
+  come between complete assignment statements.
+
+    Every distinct fragment is lexed and parsed once and its assignments
+  kept, together with where its includes are. A fragment is parsed again only
+  if its modification time or size changes, so reading a family of variants
+  costs about as much as parsing their unique fragments, plus storing each
+  variant's assignments.
+
+  Output (attributes):
+    hits:     (int) fragments taken from the cache
+    misses:   (int) fragments that had to be parsed
+  '''
+  def __init__(self):
+    # {path: (stat stamp, parts)}, parts being lists of assignments and
+    # (path, lnum) of the includes between them
+    self._parsed = {}
+    self.hits    = 0
+    self.misses  = 0
+
+  def __repr__(self):
+    return 'FragmentCache(%i fragments, hits=%i, misses=%i)'%(len(self._parsed), self.hits, self.misses)
+
+  def clear(self):
+    self._parsed.clear()
+
+  def _parts(self, path):
+    try:
+      st = os.stat(path)
+    except OSError:
+      raise NamelistError('gin namelist file provided does not exist', file=path)
+    stamp  = (st.st_mtime_ns, st.st_size)
+    cached = self._parsed.get(path)
+    if cached is not None and cached[0] == stamp:
+      self.hits += 1
+      return cached[1]
+    self.misses += 1
+    with open(path,'r') as ifid:
+      lines = ifid.readlines()
+    parts = []
+    first = 0
+    try:
+      for lnum, line in enumerate(lines+[None], 1):
+        match = None if line is None else _include_line.match(line)
+        if line is not None and match is None:
+          continue
+        # everything since the previous include is lexed as one piece
+        tokens = list(tokenize_namelist(lines[first:lnum-1], first+1))
+        parts.append(list(_parse_statements(tokens, None, None)))
+        if match is None or any(tok[0] == TOK_END for tok in tokens):
+          break
+        target = os.path.join(os.path.dirname(path), match.group(1).strip())
+        parts.append((os.path.abspath(target), lnum))
+        first = lnum
+    except NamelistError as err:
+      raise err.locate(file=path)
+    self._parsed[path] = (stamp, parts)
+    return parts
+
+  def segments(self, path):
+    '''
+    segments(self, path)
+
+    Description:
+      Resolve the includes of a file, returning (fragment, assignments) for
+    each piece of it in the order they apply, fragment being the file the
+    assignments were read from.
+    '''
+    segments = []
+    self._resolve(os.path.abspath(path), [], segments)
+    return segments
+
+  def _resolve(self, path, stack, segments):
+    stack.append(path)
+    for part in self._parts(path):
+      if isinstance(part, list):
+        if part:
+          segments.append((path, part))
+        continue
+      target, lnum = part
+      if target in stack:
+        chain = stack[stack.index(target):]+[target]
+        raise IncludeError('INCLUDE cycle: %s'%(' -> '.join(chain)), file=path, line=lnum)
+      if not os.path.exists(target):
+        raise IncludeError('included file %s does not exist'%(target), file=path, line=lnum)
+      self._resolve(target, stack, segments)
+    stack.pop()
+
+  def fragments(self, paths):
+    '''
+    fragments(self, paths)
+
+    Description:
+      Every distinct file that reading paths uses, in the order first used.
+    '''
+    if isinstance(paths, str):
+      paths = [paths]
+    seen = {}
+    for path in paths:
+      seen[os.path.abspath(path)] = None
+      for fragment, assignments in self.segments(path):
+        seen[fragment] = None
+    return list(seen)
+
+  def read(self, paths, as_arrays=False):
+    '''
+    read(self, paths, as_arrays=False)
+
+    Description:
+      Read a file, or a list of fragment files in order, resolving includes,
+    into one gin_dict, as if all of the text had been read in sequence.
+
+    Inputs:
+      paths:      (str or list) namelist file, or fragment files with later
+                                ones overriding earlier ones
+
+    Optional Args (type):
+      as_arrays:  (bool or str) storage mode, as in read_finiteburn_file()
+
+    Output:
+      gin_dict:   (dict) parsed namelist data
+    '''
+    if isinstance(paths, str):
+      paths = [paths]
+    store    = _store_function(as_arrays)
+    gin_dict = {}
+    for path in paths:
+      for fragment, assignments in self.segments(path):
+        try:
+          for assignment in assignments:
+            store(gin_dict, assignment)
+        except NamelistError as err:
+          raise err.locate(file=fragment)
+    return gin_dict
+
+def read_fragments(paths, as_arrays=False, cache=None):
+  '''
+  read_fragments(paths, as_arrays=False, cache=None)
+
+  Description:
+    Read a namelist file, or a list of fragment files in order, following
+  INCLUDE lines. See FragmentCache.
+
+  Optional Args (type):
+    as_arrays:  (bool or str) storage mode, as in read_finiteburn_file()
+    cache:      (FragmentCache) cache shared between reads, so each fragment
+                                is only parsed once. Defaults to a new one.
+  '''
+  if cache is None:
+    cache = FragmentCache()
+  return cache.read(paths, as_arrays=as_arrays)
+
 if __name__ == '__main__':
+  from IPython import embed
   list_nl = read_finiteburn_file('/home/jason.russell/list.nl')
   # tmp_nl = read_finiteburn_file('/home/jason.russell/tmp.nl')
   embed()
@@ -0,0 +1,530 @@
+import os
+import sys
+import copy
+import json
+import socket
+import argparse
+import tempfile
+import threading
+import socketserver
+
+# The reader (and numpy with it) is only imported by the service itself, so a
+# client pays for nothing beyond the standard library. A NamelistError sent back
+# by the service is rebuilt by importing it when one actually arrives.
+
+def default_socket():
+  '''
+  default_socket()
+
+  Description:
+    Socket path used when none is given: $GINNL_SOCKET, or a per-user socket in
+  the temporary directory.
+  '''
+  path = os.environ.get('GINNL_SOCKET')
+  if path:
+    return path
+  return os.path.join(tempfile.gettempdir(), 'ginnl-%i.sock'%(os.getuid()))
+
+def _masked(vals, mask):
+  # nested lists of values with None wherever nothing was assigned
+  if isinstance(vals, list):
+    return [_masked(val, flag) for val, flag in zip(vals, mask)]
+  return vals if mask else None
+
+def _param_values(pdef, arr, index=None):
+  # JSON-able values of one ParamArray, optionally only those at one index of
+  # the last dimension, or None if none of them were assigned
+  values, isset = arr.values, arr.isset
+  if index is not None:
+    offset = index-pdef.lower[-1]
+    if not 0 <= offset < pdef.dim[-1]:
+      raise ValueError('%s index %i is outside %i-%i'%(pdef.name, index, pdef.lower[-1],
+                                                       pdef.lower[-1]+pdef.dim[-1]-1))
+    values, isset = values[..., offset], isset[..., offset]
+  if not isset.any():
+    return None
+  if values.size == 1:
+    return values.item() if values.ndim == 0 else values.ravel().item(0)
+  return _masked(values.tolist(), isset.tolist())
+
+class _Watched(object):
+  # state of one watched file: its session, the gin_dict queries are answered
+  # from, the stat it was last read at and the error of the last read, if it
+  # failed
+  __slots__ = ('session','gin_dict','stamp','error','reads')
+
+  def __init__(self, session):
+    self.session  = session
+    self.gin_dict = None
+    self.stamp    = None
+    self.error    = None
+    self.reads    = 0
+
+def _fork(gin_dict):
+  # gin_dict for the session to update while queries use the original: new
+  # groups holding the same ParamArrays. The session only ever removes arrays
+  # from a group and stores new ones, so the original is left as it was.
+  return {group: copy.copy(data) for group, data in gin_dict.items()}
+
+class NamelistService(object):
+  '''
+  NamelistService(paths=(), as_arrays=True, interval=0.5)
+
+  Description:
+    Keeps namelist files parsed in memory and answers queries about them. Each
+  file is held in a NamelistSession, so when it changes only the edited parts
+  are re-parsed. A background thread started by start() polls the files every
+  interval seconds and re-reads the ones whose modification time, size or
+  inode changed; refresh() does the same on demand. A file is re-parsed
+  without holding up queries about it: they keep being answered from the
+  previous result until the new one is swapped in whole, so they never see a
+  half-updated file, and may be up to interval seconds behind an edit.
+
+    Queries are made with the methods below in process, or as newline
+  delimited JSON over a Unix socket once serve() or start() is listening,
+  see NamelistClient. Values come back as nested lists indexed like the
+  namelist indices (first index outermost, 0-based), with None for anything
+  not assigned; parameters with a single value come back as that value.
+
+  Optional Args (type):
+    paths:      (list) namelist files to watch from the start
+    as_arrays:  (bool or str) storage mode of the sessions, True or 'sparse'
+    interval:   (float) seconds between polls of the watched files
+  '''
+  def __init__(self, paths=(), as_arrays=True, interval=0.5):
+    import ginnl_reader
+    self._reader   = ginnl_reader
+    self.as_arrays = as_arrays
+    self.interval  = interval
+    self._files    = {}
+    # _lock guards _files and what queries read from it, _parse_lock makes
+    # re-reads of the sessions one at a time; take _parse_lock first
+    self._lock       = threading.RLock()
+    self._parse_lock = threading.Lock()
+    self._stopped  = threading.Event()
+    self._server   = None
+    self._threads  = []
+    for path in paths:
+      self.watch(path)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def watch(self, path):
+    '''
+    watch(self, path)
+
+    Description:
+      Start watching a file and read it. A file that cannot be read is still
+    watched, and queries about it raise its error until it can be.
+    '''
+    path = os.path.abspath(path)
+    with self._parse_lock:
+      with self._lock:
+        if path in self._files:
+          return path
+        self._files[path] = _Watched(self._reader.NamelistSession(path, as_arrays=self.as_arrays))
+      self._check(path)
+    return path
+
+  def unwatch(self, path):
+    '''
+    unwatch(self, path)
+
+    Description:
+      Stop watching a file and drop its parsed state.
+    '''
+    with self._lock:
+      self._files.pop(os.path.abspath(path), None)
+
+  def _check(self, path):
+    # re-read path if it changed since it was last read, returning True if it
+    # was. Called with _parse_lock held; the parse itself runs outside _lock
+    # and the result is swapped in under it.
+    with self._lock:
+      watched = self._files.get(path)
+    if watched is None:
+      return False
+    try:
+      st    = os.stat(path)
+      stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+      stamp = None
+    if stamp is not None and stamp == watched.stamp:
+      return False
+    session = watched.session
+    if session.gin_dict is not None:
+      session.gin_dict = _fork(session.gin_dict)
+    try:
+      gin_dict, error = session.read(), None
+    except self._reader.NamelistError as err:
+      gin_dict, error = watched.gin_dict, err
+    with self._lock:
+      watched.gin_dict = gin_dict
+      watched.stamp    = stamp
+      watched.error    = error
+      watched.reads   += 1
+    return True
+
+  def refresh(self):
+    '''
+    refresh(self)
+
+    Description:
+      Re-read every watched file that changed, returning their paths.
+    '''
+    with self._parse_lock:
+      with self._lock:
+        paths = list(self._files)
+      return [path for path in paths if self._check(path)]
+
+  def _gin_dict(self, path):
+    watched = self._files.get(os.path.abspath(path))
+    if watched is None:
+      raise KeyError('%s is not being watched'%(path))
+    if watched.error is not None:
+      raise watched.error
+    return watched.gin_dict
+
+  def files(self):
+    '''
+    files(self)
+
+    Description:
+      {path: {'reads': n, 'error': message or None}} for every watched file.
+    '''
+    with self._lock:
+      return {path: {'reads': watched.reads,
+                     'error': None if watched.error is None else str(watched.error)}
+              for path, watched in self._files.items()}
+
+  def groups(self, path):
+    '''
+    groups(self, path)
+
+    Description:
+      Names of the groups assigned in a watched file.
+    '''
+    with self._lock:
+      return sorted(self._gin_dict(path))
+
+  def get(self, path, param, index=None):
+    '''
+    get(self, path, param, index=None)
+
+    Description:
+      Values of one parameter in a watched file, None if it was not assigned.
+
+    Inputs:
+      path:     (str) watched namelist file
+      param:    (str) parameter name
+
+    Optional Args (type):
+      index:    (int) only the values at this index of the last dimension,
+                      e.g. a burn number
+    '''
+    pdef = self._reader.get_schema().get(param)
+    if pdef is None:
+      raise self._reader.InvalidParameterError('Unknown parameter', param=param)
+    with self._lock:
+      arr = getattr(self._gin_dict(path).get(pdef.group), param, None)
+      if arr is None:
+        return None
+      return _param_values(pdef, arr, index)
+
+  def burn(self, path, index, group='FINITE-BURNS'):
+    '''
+    burn(self, path, index, group='FINITE-BURNS')
+
+    Description:
+      {param: values} of everything assigned at one index of an indexed group
+    (e.g. one burn number) in a watched file.
+    '''
+    if group not in self._reader.indexed_groups:
+      raise ValueError('%s is not an indexed group'%(group))
+    schema = self._reader.get_schema()
+    with self._lock:
+      data = self._gin_dict(path).get(group)
+      out  = {}
+      if data is None:
+        return out
+      for name, arr in data.__dict__.items():
+        if isinstance(arr, self._reader.ParamArray):
+          values = _param_values(schema[name], arr, index)
+          if values is not None:
+            out[name] = values
+      return out
+
+  def dump(self, path):
+    '''
+    dump(self, path)
+
+    Description:
+      {group: {param: values}} of everything assigned in a watched file.
+    '''
+    schema = self._reader.get_schema()
+    with self._lock:
+      out = {}
+      for group, data in self._gin_dict(path).items():
+        out[group] = {name: _param_values(schema[name], arr) for name, arr in data.__dict__.items()
+                      if isinstance(arr, self._reader.ParamArray)}
+      return out
+
+  def handle(self, request):
+    '''
+    handle(self, request)
+
+    Description:
+      Answer one decoded JSON request, {"op": name, ...arguments}, with
+    {"result": ...} or {"error": {"type": ..., "message": ...}}. NamelistErrors
+    also carry their file, line, column and param.
+    '''
+    ops = {'ping':    lambda: 'pong',
+           'files':   self.files,
+           'watch':   self.watch,
+           'unwatch': self.unwatch,
+           'refresh': self.refresh,
+           'groups':  self.groups,
+           'get':     self.get,
+           'burn':    self.burn,
+           'dump':    self.dump}
+    try:
+      if not isinstance(request, dict) or request.get('op') not in ops:
+        raise ValueError('Unknown request: %r'%(request,))
+      args = dict(request)
+      return {'result': ops[args.pop('op')](**args)}
+    except self._reader.NamelistError as err:
+      return {'error': {'type': type(err).__name__, 'message': err.msg, 'file': err.file,
+                        'line': err.line, 'column': err.column, 'param': err.param}}
+    except (KeyError, ValueError, TypeError) as err:
+      return {'error': {'type': type(err).__name__, 'message': str(err.args[0]) if err.args else str(err)}}
+
+  def _watch_loop(self):
+    while not self._stopped.wait(self.interval):
+      self.refresh()
+
+  def serve(self, socket_path=None):
+    '''
+    serve(self, socket_path=None)
+
+    Description:
+      Answer requests on a Unix socket until close() is called or a shutdown
+    request arrives, watching the files in a background thread meanwhile. A
+    stale socket file left at socket_path is replaced.
+    '''
+    self._bind(socket_path)
+    watcher = threading.Thread(target=self._watch_loop, daemon=True)
+    self._threads.append(watcher)
+    watcher.start()
+    self._server.serve_forever()
+
+  def _bind(self, socket_path):
+    if socket_path is None:
+      socket_path = default_socket()
+    if os.path.exists(socket_path):
+      probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      try:
+        probe.connect(socket_path)
+        raise OSError('a service is already listening on %s'%(socket_path))
+      except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(socket_path)
+      finally:
+        probe.close()
+    self._server = _Server(socket_path, _Handler)
+    self._server.service = self
+    self.socket_path     = socket_path
+
+  def start(self, socket_path=None):
+    '''
+    start(self, socket_path=None)
+
+    Description:
+      Start watching and serving in background threads and return the socket
+    path. Use close() (or the service as a context manager) to stop.
+    '''
+    self._bind(socket_path)
+    self._threads = [threading.Thread(target=self._server.serve_forever, daemon=True),
+                     threading.Thread(target=self._watch_loop, daemon=True)]
+    for thread in self._threads:
+      thread.start()
+    return self.socket_path
+
+  def close(self):
+    '''
+    close(self)
+
+    Description:
+      Stop the watcher and the server and remove the socket file.
+    '''
+    self._stopped.set()
+    if self._server is not None:
+      self._server.shutdown()
+      self._server.server_close()
+      try:
+        os.unlink(self.socket_path)
+      except OSError:
+        pass
+      self._server = None
+    for thread in self._threads:
+      thread.join()
+    self._threads = []
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+class _Handler(socketserver.StreamRequestHandler):
+  # one JSON request per line, each answered with one JSON line
+  def handle(self):
+    service = self.server.service
+    for line in self.rfile:
+      try:
+        request = json.loads(line)
+      except ValueError as err:
+        response = {'error': {'type': 'ValueError', 'message': 'Invalid JSON: %s'%(err)}}
+      else:
+        if isinstance(request, dict) and request.get('op') == 'shutdown':
+          self.wfile.write(b'{"result": null}\n')
+          # shutdown() waits for serve_forever() to return, so not from this thread
+          threading.Thread(target=service.close, daemon=True).start()
+          return
+        response = service.handle(request)
+      self.wfile.write(json.dumps(response).encode()+b'\n')
+
+class NamelistClient(object):
+  '''
+  NamelistClient(socket_path=None, timeout=None)
+
+  Description:
+    Connection to a NamelistService over its Unix socket, with the same query
+  methods as the service. Paths are made absolute here, so they are relative
+  to the client's working directory. Errors raised by the service are raised
+  again here: NamelistErrors as the same subclass, and KeyError, ValueError
+  and TypeError as themselves.
+
+  Optional Args (type):
+    socket_path:  (str) socket of the service, defaults to default_socket()
+    timeout:      (float) seconds to wait for each response
+  '''
+  def __init__(self, socket_path=None, timeout=None):
+    self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._sock.settimeout(timeout)
+    self._sock.connect(socket_path or default_socket())
+    self._file = self._sock.makefile('rb')
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    self._file.close()
+    self._sock.close()
+
+  def request(self, op, **args):
+    '''
+    request(self, op, **args)
+
+    Description:
+      Send one request and return its result, raising its error if it failed.
+    '''
+    args['op'] = op
+    self._sock.sendall(json.dumps(args).encode()+b'\n')
+    line = self._file.readline()
+    if not line:
+      raise ConnectionError('the service closed the connection')
+    response = json.loads(line)
+    error    = response.get('error')
+    if error is None:
+      return response['result']
+    if error['type'] in ('KeyError','ValueError','TypeError'):
+      raise {'KeyError': KeyError, 'ValueError': ValueError, 'TypeError': TypeError}[error['type']](error['message'])
+    import ginnl_reader
+    cls = getattr(ginnl_reader, error['type'], ginnl_reader.NamelistError)
+    if not (isinstance(cls, type) and issubclass(cls, ginnl_reader.NamelistError)):
+      cls = ginnl_reader.NamelistError
+    raise cls(error['message'], file=error.get('file'), line=error.get('line'),
+              column=error.get('column'), param=error.get('param'))
+
+  def ping(self):
+    return self.request('ping')
+
+  def files(self):
+    return self.request('files')
+
+  def watch(self, path):
+    return self.request('watch', path=os.path.abspath(path))
+
+  def unwatch(self, path):
+    return self.request('unwatch', path=os.path.abspath(path))
+
+  def refresh(self):
+    return self.request('refresh')
+
+  def groups(self, path):
+    return self.request('groups', path=os.path.abspath(path))
+
+  def get(self, path, param, index=None):
+    return self.request('get', path=os.path.abspath(path), param=param, index=index)
+
+  def burn(self, path, index, group='FINITE-BURNS'):
+    return self.request('burn', path=os.path.abspath(path), index=index, group=group)
+
+  def dump(self, path):
+    return self.request('dump', path=os.path.abspath(path))
+
+  def shutdown(self):
+    return self.request('shutdown')
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Namelist service keeping parsed gin namelists in memory')
+  parser.add_argument('--socket', default=None, help='Unix socket path (default %s)'%(default_socket()))
+  commands = parser.add_subparsers(dest='command', required=True)
+  serve = commands.add_parser('serve', help='run the service in the foreground')
+  serve.add_argument('files', nargs='*')
+  serve.add_argument('--interval', type=float, default=0.5, help='seconds between polls of the files')
+  serve.add_argument('--sparse', action='store_true', help='use sparse array storage')
+  for name in ('files', 'refresh', 'ping', 'shutdown'):
+    commands.add_parser(name)
+  for name in ('watch', 'unwatch', 'groups', 'dump'):
+    commands.add_parser(name).add_argument('path')
+  get = commands.add_parser('get')
+  get.add_argument('path')
+  get.add_argument('param')
+  get.add_argument('--index', type=int, default=None)
+  burn = commands.add_parser('burn')
+  burn.add_argument('path')
+  burn.add_argument('index', type=int)
+  burn.add_argument('--group', default='FINITE-BURNS')
+  args = parser.parse_args(argv)
+
+  if args.command == 'serve':
+    service = NamelistService(args.files, as_arrays='sparse' if args.sparse else True,
+                              interval=args.interval)
+    service.start(args.socket)
+    try:
+      # returns once a shutdown request has closed the service
+      for thread in service._threads:
+        thread.join()
+    except KeyboardInterrupt:
+      service.close()
+    return 0
+
+  with NamelistClient(args.socket) as client:
+    query = dict(vars(args))
+    for key in ('socket', 'command'):
+      del query[key]
+    try:
+      result = getattr(client, args.command)(**query)
+    except (KeyError, ValueError, TypeError) as err:
+      # NamelistErrors are ValueErrors too
+      print('ERROR: %s'%(err.args[0] if isinstance(err, KeyError) else err), file=sys.stderr)
+      return 1
+  print(json.dumps(result, indent=1))
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,126 @@
+import numpy as np
+
+from itertools import groupby
+
+from ginnl_reader import iter_param_values
+
+# lines are read up to 80 chars, so nothing is written past that
+MAX_COLUMNS = 80
+
+def format_value(val, data_type):
+  '''
+  format_value(val, data_type)
+
+  Description:
+    Format a single value as namelist text for the given MIRAGE data_type.
+  Floats are written with repr() so they read back to the same value.
+
+  Inputs:
+    val:        (any) value to format
+    data_type:  (str) MIRAGE data_type (DP, SP, I, L, Cn)
+
+  Output:
+    val_str:    (str) namelist text of the value
+  '''
+  if data_type.startswith('C'):
+    # a single quote inside a string is written as a doubled quote
+    return "'%s'"%(str(val).replace("'","''"))
+  elif data_type in ('DP','SP'):
+    return repr(float(val)).upper()
+  elif data_type == 'I':
+    return str(int(val))
+  elif data_type == 'L':
+    return '.TRUE.' if val else '.FALSE.'
+  else:
+    raise ValueError('Unknown mirage data_type (%s)'%(data_type))
+
+def unflatten_index(flat_index, pdef):
+  '''
+  unflatten_index(flat_index, pdef)
+
+  Description:
+    Inverse of flatten_index(): convert a 0-based flat (Fortran order) index
+  into the parameter's indices as they are written in a namelist.
+
+  Inputs:
+    flat_index: (int) 0-based position in the flattened values
+    pdef:       (ParamDef) compiled definition of the parameter
+
+  Output:
+    indices:    (list) namelist indices
+  '''
+  indices = []
+  for extent, low in zip(pdef.dim, pdef.lower):
+    flat_index, idx = divmod(flat_index, extent)
+    indices.append(idx+low)
+  return indices
+
+def _set_runs(isset):
+  # (start, stop) of every contiguous run of assigned values
+  edges = np.flatnonzero(np.diff(np.concatenate(([0], isset.view(np.int8), [0]))))
+  return zip(edges[::2].tolist(), edges[1::2].tolist())
+
+def _assignment_lines(lhs, items):
+  # Lay out one assignment over as many lines as needed to stay within
+  # MAX_COLUMNS, continuation lines starting with the next value
+  head   = ' %s = '%(lhs)
+  indent = ' '*len(head) if len(head) <= MAX_COLUMNS//2 else '    '
+  line   = head
+  empty  = True
+  last   = len(items)-1
+  for k, item in enumerate(items):
+    piece = item+',' if k < last else item
+    if not empty and len(line)+len(piece) > MAX_COLUMNS:
+      yield line.rstrip()+'\n'
+      line = indent
+    line += piece+' '
+    empty = False
+  yield line.rstrip()+'\n'
+
+def iter_namelist_lines(gin_dict):
+  '''
+  iter_namelist_lines(gin_dict)
+
+  Description:
+    Generate the namelist text for a parsed gin_dict one line at a time. Each
+  contiguous run of assigned values of a parameter becomes one assignment
+  starting at the index of its first value, with repeated values collapsed
+  into n*value form.
+
+  Inputs:
+    gin_dict: (dict) parsed namelist data from read_finiteburn_file(),
+                     with or without as_arrays
+
+  Output:
+    generator of lines, each ending in a newline
+  '''
+  for pdef, values, isset in iter_param_values(gin_dict):
+    for start, stop in _set_runs(isset):
+      indices = unflatten_index(start, pdef)
+      lhs     = '%s(%s)'%(pdef.name, ','.join(map(str, indices)))
+      items   = []
+      for val, run in groupby(values[start:stop]):
+        count   = sum(1 for _ in run)
+        val_str = format_value(val, pdef.dtype)
+        items.append(val_str if count == 1 else '%i*%s'%(count,val_str))
+      for line in _assignment_lines(lhs, items):
+        yield line
+
+def write_finiteburn_file(gin_dict, ginnl):
+  '''
+  write_finiteburn_file(gin_dict, ginnl)
+
+  Description:
+    Write a parsed gin_dict back out as a MIRAGE gin namelist. Lines are
+  streamed to the file as they are generated.
+
+  Inputs:
+    gin_dict: (dict) parsed namelist data from read_finiteburn_file(),
+                     with or without as_arrays
+    ginnl:    (str or file) path to write to or an open text file
+  '''
+  if hasattr(ginnl,'write'):
+    ginnl.writelines(iter_namelist_lines(gin_dict))
+    return
+  with open(ginnl,'w') as ofid:
+    ofid.writelines(iter_namelist_lines(gin_dict))
@@ -0,0 +1,42 @@
+import io
+import pickle
+
+import pytest
+
+import ginnl_reader as gr
+
+@pytest.fixture
+def paths(tmp_path):
+  texts = ['DMA1(1)=1.0\nMA1D(2)=2*3.0\n', 'DMA1(1)=abc\nMA1D(1)=4.0\n', 'BURN(1)=1,2,3\n']
+  paths = []
+  for i, text in enumerate(texts):
+    path = tmp_path/('f%i.nl'%(i))
+    path.write_text(text)
+    paths.append(str(path))
+  return paths
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_read_many_order_and_errors(paths, workers):
+  results = gr.read_many(paths, workers=workers, as_arrays=True)
+  assert [result.path for result in results] == paths
+  assert results[0].gin_dict['FINITE-BURNS'].MA1D.values[1:3].tolist() == [3.0, 3.0]
+  assert results[1].gin_dict is None
+  assert isinstance(results[1].error, gr.InvalidValueError)
+  assert results[1].error.file == paths[1]
+  assert results[2].gin_dict['FINITE-BURNS'].BURN.values[:3].tolist() == [1, 2, 3]
+
+def test_read_many_collect_and_stats(paths):
+  stats   = gr.ReadStats()
+  results = gr.read_many(paths, workers=2, as_arrays='sparse', stats=stats, collect=True)
+  assert [len(result.diagnostics) for result in results] == [0, 1, 0]
+  assert results[1].gin_dict['FINITE-BURNS'].MA1D.get(0) == 4.0
+  assert stats.files == 3
+  assert stats.assignments == 4
+
+def test_param_array_pickles_views():
+  gin_dict = gr.read_finiteburn_file(io.StringIO('MA1A(1,2)=5.0'), as_arrays=True)
+  arr      = pickle.loads(pickle.dumps(gin_dict))['FINITE-BURNS'].MA1A
+  assert arr.values[0,1] == 5.0
+  arr.assign(0, [7.0])
+  # values and isset still share the memory written by assign()
+  assert arr.values[0,0] == 7.0 and arr.isset[0,0]
@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+import ginnl_bench as bench
+import ginnl_reader as gr
+
+def test_reference_accepts_generated_text():
+  for seed in range(3):
+    text = bench.generate_namelist(5, 20, seed=seed)
+    assert bench.reference_read(text.splitlines(True))
+
+def test_reference_null_values():
+  ref = bench.reference_read(['DMA1(1)=4*9.0\n', 'DMA1(1)=1.0,\n', ' ,3.0, 2*, 5.0\n'])
+  assert ref[('FINITE-BURNS','DMA1')][:6] == [1.0, 9.0, 3.0, 9.0, None, 5.0]
+
+def test_reference_rejects_unquoted_word():
+  with pytest.raises(bench.Rejected):
+    bench.reference_read(['CMPTF(1)=T\n'])
+
+def test_differential_check(tmp_path):
+  pytest.importorskip('mint')
+  paths = [bench.write_namelist(str(tmp_path/'small.nl'), 'small', 0),
+           bench.write_namelist(str(tmp_path/'invalid.nl'), 'small', 1, invalid=True)]
+  assert bench.differential_check(paths) == []
+
+def test_differential_check_catches_mismatch(tmp_path):
+  pytest.importorskip('mint')
+  path = bench.write_namelist(str(tmp_path/'small.nl'), 'small', 0)
+  def shifted(ginnl):
+    # a reader that drops null values, as a run of commas collapsing would
+    with open(ginnl) as ifid:
+      text = ifid.read().replace(',,', ',')
+    return gr.read_finiteburn_file(io.StringIO(text))
+  failures = bench.differential_check([path], {'shifted': shifted})
+  assert [name for name, _, _ in failures] == ['shifted']
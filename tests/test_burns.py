@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import ginnl_reader as gr
+from ginnl_burns import burn_index, burn_params, burn_table, BurnModel
+
+TEXT = '''DMA1(1)=100.0
+MA1D(1)=10.0
+MA1F(1,1)=10.0
+MA1M(1,1)=1.0
+DMA1(2)=200.0
+MA1D(2)=10.0
+MA1F(1,2)=10.0
+MA1M(1,2)=1.0
+BURN(3)=2
+DMA1(3)=300.0
+MA1D(3)=5.0
+'''
+
+@pytest.fixture
+def gin_dict(tmp_path):
+  path = tmp_path/'burns.nl'
+  path.write_text(TEXT)
+  return gr.read_finiteburn_file(str(path), as_arrays=True)
+
+def test_burn_params():
+  names = [pdef.name for pdef in burn_params()]
+  assert 'DMA1' in names and 'MA1A' in names
+
+def test_burn_table(gin_dict):
+  table = burn_table(gin_dict, fill=np.nan)
+  assert table.index[:3].tolist() == [1, 2, 3]
+  assert table.present[:4].tolist() == [True, True, True, False]
+  assert table.DMA1[:3].tolist() == [100.0, 200.0, 300.0]
+  assert np.isnan(table.DMA1[3])
+  assert table.MA1F.shape == (99, 5)
+  assert table.MA1F[1, 0] == 10.0
+  assert len(table.select(table.present)) == 3
+
+def test_burn_index(gin_dict):
+  index = burn_index(gin_dict)
+  assert index.burns.tolist() == [1, 2, 3]
+  # burn 3 is cut off by delta-V, so MA1D is not its duration
+  assert index.ends.tolist() == [110.0, 210.0, 300.0]
+  assert index.active_at(105.0) == 1
+  assert index.active_at(150.0) == 0
+  assert index.active_at(np.array([105.0, 150.0, 205.0])).tolist() == [1, 0, 2]
+  assert index.next_burn(150.0) == 2
+  assert index.previous_burn(150.0) == 1
+  assert index.starting_between(100.0, 300.0).tolist() == [1, 2]
+  assert index.count_starting_between(0.0, 1000.0) == 3
+
+def test_burn_model(gin_dict):
+  model = BurnModel(gin_dict, mass=100.0, k=1.0)
+  assert model.burns.tolist() == [1, 2, 3]
+  assert model.mass_used()[:2].tolist() == [10.0, 10.0]
+  assert np.isnan(model.mass_used()[2])
+  # burns take their mass in order, the second starts with what the first left
+  assert model.start_mass[:2].tolist() == [100.0, 90.0]
+  dv = model.delta_v()
+  assert dv[0] == pytest.approx(10.0*np.log(100.0/90.0))
+  assert dv[1] == pytest.approx(10.0*np.log(90.0/80.0))
+  assert np.isnan(dv[2])
+  tau, active = model.tau(np.array([105.0]))
+  assert tau[:, 0].tolist() == [5.0, -95.0, -195.0]
+  assert active[:, 0].tolist() == [True, False, False]
+
+def test_burn_model_direction(gin_dict):
+  model = BurnModel(gin_dict)
+  assert np.isnan(model.start_mass).all()
+  direction = model.direction(np.array([0.0]))
+  assert direction.shape == (3, 1, 3)
+  assert direction[0, 0].tolist() == [1.0, 0.0, 0.0]
+
+def test_burn_model_k(gin_dict):
+  with pytest.raises(ValueError) as info:
+    BurnModel(gin_dict, mass=100.0).delta_v()
+  assert 'burn(s) 1, 2, 3' in str(info.value)
+  gin_dict['FINITE-BURNS'][1].MA1K = 2.0
+  model = BurnModel(gin_dict, mass=100.0)
+  with pytest.raises(ValueError) as info:
+    model.acceleration(np.array([0.0]))
+  assert 'burn(s) 2, 3' in str(info.value)
+  # k only fills in the burns without MA1K
+  model = BurnModel(gin_dict, mass=100.0, k=1.0)
+  assert model.k.tolist() == [2.0, 1.0, 1.0]
+  assert model.acceleration(np.array([0.0]))[:2, 0] == pytest.approx([2.0*10.0/100.0, 10.0/90.0])
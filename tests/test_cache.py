@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import ginnl_reader as gr
+from ginnl_cache import ParseCache
+
+@pytest.fixture
+def cache(tmp_path):
+  return ParseCache(str(tmp_path/'cache'))
+
+def test_hit_after_miss(cache, tmp_path):
+  path = tmp_path/'a.nl'
+  path.write_text('DMA1(1)=1.0,2.0\n')
+  first  = cache.read(str(path), as_arrays=True)
+  second = cache.read(str(path), as_arrays=True)
+  assert (cache.misses, cache.hits) == (1, 1)
+  assert second['FINITE-BURNS'].DMA1.values[:2].tolist() == [1.0, 2.0]
+  assert first['FINITE-BURNS'].DMA1.values[:2].tolist() == [1.0, 2.0]
+
+def test_storage_modes_are_separate_entries(cache, tmp_path):
+  path = tmp_path/'a.nl'
+  path.write_text('DMA1(1)=1.0\n')
+  dense  = cache.read(str(path), as_arrays=True)
+  sparse = cache.read(str(path), as_arrays='sparse')
+  assert cache.misses == 2
+  assert isinstance(sparse['FINITE-BURNS'].DMA1, gr.SparseParamArray)
+  assert not isinstance(dense['FINITE-BURNS'].DMA1, gr.SparseParamArray)
+
+def test_edit_is_a_miss(cache, tmp_path):
+  path = tmp_path/'a.nl'
+  path.write_text('DMA1(1)=1.0\n')
+  cache.read(str(path), as_arrays=True)
+  path.write_text('DMA1(1)=2.0\n')
+  assert cache.read(str(path), as_arrays=True)['FINITE-BURNS'].DMA1.values[0] == 2.0
+  assert cache.misses == 2
+
+def test_parse_error_names_file(cache, tmp_path):
+  path = tmp_path/'bad.nl'
+  path.write_text('DMA1(1)=abc\n')
+  with pytest.raises(gr.InvalidValueError) as info:
+    cache.read(str(path))
+  assert info.value.file == str(path)
+  assert info.value.line == 1
+
+def test_evicts_least_recently_used(tmp_path):
+  cache = ParseCache(str(tmp_path/'cache'), max_bytes=1)
+  for i in range(3):
+    path = tmp_path/('f%i.nl'%(i))
+    path.write_text('DMA1(1)=%i.0\n'%(i))
+    cache.read(str(path), as_arrays=True)
+  assert len(os.listdir(cache.cache_dir)) <= 1
+
+# truncated, not a gin_dict, garbage, a class or module that no longer exists
+@pytest.mark.parametrize('damage', [lambda data: data[:len(data)//2], lambda data: b'\x80\x05Kx.',
+                                    lambda data: b'junk', lambda data: b'cginnl_reader\nNoSuchClass\n.',
+                                    lambda data: b'cno_such_module\nThing\n.'])
+def test_damaged_entry_is_a_miss(cache, tmp_path, damage):
+  path = tmp_path/'a.nl'
+  path.write_text('DMA1(1)=1.0\n')
+  cache.read(str(path), as_arrays=True)
+  entry = cache._entry(cache.key(path.read_bytes(), True))
+  with open(entry, 'rb') as cfid:
+    data = cfid.read()
+  with open(entry, 'wb') as cfid:
+    cfid.write(damage(data))
+  assert cache.read(str(path), as_arrays=True)['FINITE-BURNS'].DMA1.values[0] == 1.0
+  assert (cache.misses, cache.hits) == (2, 0)
+  assert cache.read(str(path), as_arrays=True)['FINITE-BURNS'].DMA1.values[0] == 1.0
+  assert cache.hits == 1
+
+def test_miss_decodes_like_an_uncached_read(cache, tmp_path):
+  path = tmp_path/'crlf.nl'
+  path.write_bytes(b"MA1T(1)='01-JAN-2020 00:00:00.0 UTC'\r\nDMA1(1)=1.0,\r\n2.0\r\n")
+  uncached = gr.read_finiteburn_file(str(path), as_arrays=True)['FINITE-BURNS']
+  cached   = cache.read(str(path), as_arrays=True)['FINITE-BURNS']
+  assert cached.MA1T.values[0] == uncached.MA1T.values[0]
+  assert cached.DMA1.values[:2].tolist() == uncached.DMA1.values[:2].tolist() == [1.0, 2.0]
@@ -0,0 +1,62 @@
+import pytest
+
+import ginnl_reader as gr
+from ginnl_diff import diff_files, diff_namelists, format_diff, main, ADDED, CHANGED, REMOVED
+
+@pytest.fixture
+def paths(tmp_path):
+  old = tmp_path/'old.nl'
+  new = tmp_path/'new.nl'
+  old.write_text('DMA1(1)=1.0,2.0\nMA1D(2)=120.0\n')
+  new.write_text('MA1D(2)=125.5\nDMA1(1)=1.0\nDMA1(3)=3.0\n')
+  return str(old), str(new)
+
+def test_diff_files(paths):
+  diffs = {diff.pdef.name: diff for diff in diff_files(*paths)}
+  assert sorted(diffs) == ['DMA1', 'MA1D']
+  dma1 = diffs['DMA1']
+  assert dma1.flat.tolist() == [1, 2]
+  assert dma1.kind.tolist() == [REMOVED, ADDED]
+  assert dma1.burns.tolist() == [2, 3]
+  ma1d = diffs['MA1D']
+  assert ma1d.kind.tolist() == [CHANGED]
+  assert ma1d.delta.tolist() == [5.5]
+  assert ma1d.indices.tolist() == [[2]]
+
+def test_no_difference_for_formatting(tmp_path):
+  old = tmp_path/'old.nl'
+  new = tmp_path/'new.nl'
+  old.write_text('DMA1(1)=2*1.0\n')
+  new.write_text('! same values\nDMA1(1) = 1.0, 1.0\n')
+  assert diff_files(str(old), str(new)) == []
+
+def test_tolerances(tmp_path):
+  old = tmp_path/'old.nl'
+  new = tmp_path/'new.nl'
+  old.write_text('DMA1(1)=1.0\nMA1D(1)=1.0\n')
+  new.write_text('DMA1(1)=1.001\nMA1D(1)=1.001\n')
+  assert len(diff_files(str(old), str(new))) == 2
+  assert diff_files(str(old), str(new), atol=0.01) == []
+  diffs = diff_files(str(old), str(new), atol=0.01, tolerances={'MA1D': (0.0, 0.0)})
+  assert [diff.pdef.name for diff in diffs] == ['MA1D']
+
+def test_groups_filter(paths):
+  assert diff_files(*paths, groups=['SPACECRAFT']) == []
+
+def test_format_diff(paths):
+  lines = list(format_diff(diff_files(*paths)))
+  assert 'FINITE-BURNS  MA1D(2)  burn 2  changed  ' in lines[-1]
+  assert lines[-1].rstrip().endswith('(+5.5)')
+
+def test_main_exit_status(paths, tmp_path, capsys):
+  assert main(list(paths)) == 1
+  assert main([paths[0], paths[0]]) == 0
+  assert main([paths[0], str(tmp_path/'missing.nl')]) == 2
+  assert 'ERROR' in capsys.readouterr().err
+
+def test_mixed_storage_modes(tmp_path):
+  pytest.importorskip('mint')
+  path = tmp_path/'a.nl'
+  path.write_text('DMA1(1)=1.0,2.0\n')
+  dense = gr.read_finiteburn_file(str(path), as_arrays=True)
+  assert diff_namelists(gr.read_finiteburn_file(str(path)), dense) == []
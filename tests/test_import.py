@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+import ginnl_bench
+
+def test_import_time_within_budget():
+  # the best of a few runs, so a busy machine does not fail it
+  own = min(ginnl_bench.import_time()[0] for _ in range(3))
+  assert own < ginnl_bench.import_budget
+
+def test_import_has_no_side_effects():
+  code = ('import sys, ginnl_reader as gr\n'
+          'assert gr._schema is None\n'
+          'assert not [name for name in sys.modules if name.split(".")[0] in ("mint","IPython")]\n')
+  subprocess.run([sys.executable, '-c', code], check=True,
+                 cwd=os.path.dirname(os.path.abspath(ginnl_bench.__file__)))
@@ -0,0 +1,81 @@
+import pytest
+
+import ginnl_reader as gr
+
+def _write(path, text):
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(text)
+  return str(path)
+
+def test_include_in_place(tmp_path):
+  _write(tmp_path/'common'/'burns.nl', 'DMA1(1)=1.0,2.0\n')
+  main = _write(tmp_path/'main.nl', "MA1D(1)=5.0\nINCLUDE 'common/burns.nl' ! shared burns\nDMA1(2)=20.0\n")
+  gin_dict = gr.read_fragments(main, as_arrays=True)
+  data     = gin_dict['FINITE-BURNS']
+  assert data.DMA1.values[:2].tolist() == [1.0, 20.0]
+  assert data.MA1D.values[0] == 5.0
+
+def test_same_as_reading_the_text_in_sequence(tmp_path):
+  _write(tmp_path/'a.nl', "DMA1(1)=1.0\nINCLUDE 'sub/b.nl'\n")
+  _write(tmp_path/'sub'/'b.nl', "MA1D(1)=2.0\nINCLUDE 'c.nl'\n")
+  _write(tmp_path/'sub'/'c.nl', 'DMA1(1)=3.0\n')
+  flat = _write(tmp_path/'flat.nl', 'DMA1(1)=1.0\nMA1D(1)=2.0\nDMA1(1)=3.0\n')
+  got    = gr.param_arrays(gr.read_fragments(str(tmp_path/'a.nl'), as_arrays=True))
+  expect = gr.param_arrays(gr.read_finiteburn_file(flat, as_arrays=True))
+  assert sorted(got) == sorted(expect)
+  for name in expect:
+    assert got[name][0].tolist() == expect[name][0].tolist()
+
+def test_fragment_list_overrides_in_order(tmp_path):
+  base = _write(tmp_path/'base.nl', 'DMA1(1)=1.0,2.0\n')
+  top  = _write(tmp_path/'top.nl', 'DMA1(2)=5.0\n')
+  assert gr.read_fragments([base, top], as_arrays=True)['FINITE-BURNS'].DMA1.values[:2].tolist() == [1.0, 5.0]
+
+def test_terminator_ends_only_its_fragment(tmp_path):
+  _write(tmp_path/'sub.nl', "DMA1(1)=1.0;\nDMA1(2)=2.0\n")
+  main = _write(tmp_path/'main.nl', "INCLUDE 'sub.nl'\nMA1D(1)=3.0\n")
+  data = gr.read_fragments(main, as_arrays=True)['FINITE-BURNS']
+  assert data.DMA1.isset[:2].tolist() == [True, False]
+  assert data.MA1D.values[0] == 3.0
+
+def test_cache_parses_each_fragment_once(tmp_path):
+  _write(tmp_path/'common.nl', 'DMA1(1)=1.0\n')
+  one   = _write(tmp_path/'one.nl', "INCLUDE 'common.nl'\nMA1D(1)=1.0\n")
+  two   = _write(tmp_path/'two.nl', "INCLUDE 'common.nl'\nMA1D(1)=2.0\n")
+  cache = gr.FragmentCache()
+  assert cache.read(two, as_arrays=True)['FINITE-BURNS'].MA1D.values[0] == 2.0
+  cache.read(one, as_arrays=True)
+  assert (cache.misses, cache.hits) == (3, 1)
+  assert cache.fragments([one, two]) == [one, str(tmp_path/'common.nl'), two]
+
+def test_edited_fragment_is_parsed_again(tmp_path):
+  common = tmp_path/'common.nl'
+  _write(common, 'DMA1(1)=1.0\n')
+  main  = _write(tmp_path/'main.nl', "INCLUDE 'common.nl'\n")
+  cache = gr.FragmentCache()
+  cache.read(main, as_arrays=True)
+  common.write_text('DMA1(1)=22.0\n')
+  assert cache.read(main, as_arrays=True)['FINITE-BURNS'].DMA1.values[0] == 22.0
+
+def test_missing_include(tmp_path):
+  main = _write(tmp_path/'main.nl', "DMA1(1)=1.0\nINCLUDE 'nope.nl'\n")
+  with pytest.raises(gr.IncludeError) as info:
+    gr.read_fragments(main)
+  assert info.value.file == main
+  assert info.value.line == 2
+
+def test_include_cycle(tmp_path):
+  a = _write(tmp_path/'a.nl', "INCLUDE 'b.nl'\n")
+  _write(tmp_path/'b.nl', "DMA1(1)=1.0\nINCLUDE 'a.nl'\n")
+  with pytest.raises(gr.IncludeError) as info:
+    gr.read_fragments(a)
+  assert 'cycle' in info.value.msg
+  assert info.value.file == str(tmp_path/'b.nl')
+
+def test_error_names_the_fragment(tmp_path):
+  sub  = _write(tmp_path/'sub.nl', 'MA1D(1)=1.0\nDMA1(1)=abc\n')
+  main = _write(tmp_path/'main.nl', "INCLUDE 'sub.nl'\n")
+  with pytest.raises(gr.InvalidValueError) as info:
+    gr.read_fragments(main, as_arrays=True)
+  assert info.value.file == sub
+  assert info.value.line == 2
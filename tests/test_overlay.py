@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+import ginnl_reader as gr
+from ginnl_overlay import NamelistOverlay, read_overlay
+
+def _read(tmp_path, name, text, as_arrays='sparse'):
+  path = tmp_path/name
+  path.write_text(text)
+  return gr.read_finiteburn_file(str(path), as_arrays=as_arrays)
+
+def test_later_layer_overrides(tmp_path):
+  base    = _read(tmp_path, 'base.nl', 'DMA1(1)=1.0,2.0,3.0\nMA1A(1,1)=4.0\n')
+  top     = _read(tmp_path, 'top.nl', 'DMA1(2)=20.0\n')
+  overlay = NamelistOverlay([base, top])
+  assert overlay.value('DMA1', [1]) == 1.0
+  assert overlay.value('DMA1', [2]) == 20.0
+  assert overlay.value('DMA1', [3]) == 3.0
+  assert overlay.value('DMA1', [4]) is None
+  assert overlay.value('MA1A') == 4.0
+  assert overlay.param('MA1D') is None
+  assert list(overlay) == ['FINITE-BURNS']
+
+def test_single_layer_is_a_view(tmp_path):
+  base    = _read(tmp_path, 'base.nl', 'DMA1(1)=1.0\n', as_arrays=True)
+  overlay = NamelistOverlay([base])
+  arr     = overlay.param('DMA1')
+  assert np.shares_memory(arr._flat, base['FINITE-BURNS'].DMA1._flat)
+  assert not arr._flat.flags.writeable
+
+def test_sparse_layers_stay_sparse(tmp_path):
+  base    = _read(tmp_path, 'base.nl', 'DMA1(1)=1.0\nMA1A(1,1)=4.0\nMA1D(1)=5.0\n')
+  top     = _read(tmp_path, 'top.nl', 'DMA1(1)=2.0\nMA1A(1,1)=6.0\n')
+  overlay = NamelistOverlay([base, top])
+  assert overlay.value('DMA1') == 2.0
+  for layer in (base, top):
+    group = layer['FINITE-BURNS']
+    assert group.DMA1._dense is not None
+    assert group.MA1A._dense is None
+  assert base['FINITE-BURNS'].MA1D._dense is None
+
+def test_default_storage_layers(tmp_path):
+  pytest.importorskip('mint')
+  base    = _read(tmp_path, 'base.nl', 'DMA1(1)=1.0,2.0\n', as_arrays=False)
+  top     = _read(tmp_path, 'top.nl', 'DMA1(2)=5.0\n', as_arrays=True)
+  overlay = NamelistOverlay([base, top])
+  assert overlay['FINITE-BURNS'].DMA1.values[:3].tolist() == [1.0, 5.0, 0.0]
+  assert overlay['FINITE-BURNS'][2].DMA1 == 5.0
+
+def test_assign_is_copy_on_write(tmp_path):
+  base    = _read(tmp_path, 'base.nl', 'DMA1(1)=1.0\n', as_arrays=True)
+  overlay = NamelistOverlay([base])
+  assert overlay.value('DMA1') == 1.0
+  overlay.assign('DMA1', [7.0, 8.0])
+  assert overlay.value('DMA1', [2]) == 8.0
+  assert base['FINITE-BURNS'].DMA1.values[:2].tolist() == [1.0, 0.0]
+  with pytest.raises(gr.InvalidParameterError):
+    overlay.assign('NOPE', [1.0])
+
+def test_push_invalidates(tmp_path):
+  overlay = NamelistOverlay([_read(tmp_path, 'base.nl', 'DMA1(1)=1.0\n')])
+  assert overlay.value('DMA1') == 1.0
+  overlay.push(_read(tmp_path, 'top.nl', 'DMA1(1)=3.0\n'))
+  assert overlay.value('DMA1') == 3.0
+
+def test_flatten_matches_sequential_read(tmp_path):
+  base = tmp_path/'base.nl'
+  top  = tmp_path/'top.nl'
+  base.write_text('DMA1(1)=1.0,2.0,3.0\nMA1A(1,2)=4.0\n')
+  top.write_text('DMA1(2)=20.0\nMA1D(3)=6.0\n')
+  overlay = read_overlay([str(base), str(top)])
+  both    = tmp_path/'both.nl'
+  both.write_text(base.read_text()+top.read_text())
+  expect  = gr.param_arrays(gr.read_finiteburn_file(str(both), as_arrays=True))
+  for as_arrays in (True, 'sparse'):
+    got = gr.param_arrays(overlay.flatten(as_arrays=as_arrays))
+    assert sorted(got) == sorted(expect)
+    for name, (values, isset) in expect.items():
+      assert (got[name][1] == isset).all()
+      assert (got[name][0][isset] == values[isset]).all()
+
+def test_read_overlay_locates_errors(tmp_path):
+  good = tmp_path/'good.nl'
+  bad  = tmp_path/'bad.nl'
+  good.write_text('DMA1(1)=1.0\n')
+  bad.write_text('DMA1(1)=abc\n')
+  with pytest.raises(gr.InvalidValueError) as info:
+    read_overlay([str(good), str(bad)])
+  assert info.value.file == str(bad)
+
+@pytest.mark.parametrize('as_arrays', [False, True, 'sparse'])
+def test_param_array(tmp_path, as_arrays):
+  if as_arrays is False:
+    pytest.importorskip('mint')
+  gin_dict = _read(tmp_path, 'a.nl', 'DMA1(2)=2.0\n', as_arrays=as_arrays)
+  values, isset = gr.param_array(gin_dict, 'DMA1')
+  assert isset[:3].tolist() == [False, True, False]
+  assert values[1] == 2.0
+  assert gr.param_array(gin_dict, 'MA1D') is None
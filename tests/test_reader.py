@@ -0,0 +1,283 @@
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import ginnl_reader as gr
+
+def read(text, as_arrays=True, errors=None, stats=None):
+  return gr.read_finiteburn_file(io.StringIO(text), as_arrays=as_arrays, errors=errors, stats=stats)
+
+def dma1(text, as_arrays=True):
+  arr = read(text, as_arrays)['FINITE-BURNS'].DMA1
+  return arr.values[:4].tolist(), arr.isset[:4].tolist()
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+@pytest.mark.parametrize('text', ['DMA1(1)=1.0,,3.0', 'DMA1(1)=1.0,\n ,3.0'])
+def test_null_value_keeps_position(text, as_arrays):
+  assert dma1(text, as_arrays) == ([1.0, 0.0, 3.0, 0.0], [True, False, True, False])
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+def test_null_repeat_keeps_position(as_arrays):
+  assert dma1('DMA1(1)=2*, 5.0', as_arrays) == ([0.0, 0.0, 5.0, 0.0], [False, False, True, False])
+
+def test_null_value_leaves_earlier_assignment():
+  values, isset = dma1('DMA1(1)=4*9.0\nDMA1(1)=1.0,,3.0')
+  assert values == [1.0, 9.0, 3.0, 9.0]
+  assert all(isset)
+
+def test_null_value_default_storage():
+  pytest.importorskip('mint')
+  burns = read('DMA1(1)=4*9.0\nDMA1(1)=2*, 5.0', as_arrays=False)['FINITE-BURNS']
+  assert [burns[key].DMA1 for key in ('01','02','03','04')] == [9.0, 9.0, 5.0, 9.0]
+
+def test_repeat_with_space_is_not_null():
+  assert dma1('DMA1(1)=2* 5.0') == ([5.0, 5.0, 0.0, 0.0], [True, True, False, False])
+
+@pytest.mark.parametrize('text, param, column', [('DMA1(1)=abc', 'DMA1', 9),
+                                                 ('CMPTF(1)=T', 'CMPTF', 10),
+                                                 ('LPLANE(1)=VELOC', 'LPLANE', 11)])
+def test_unquoted_word_is_invalid_value(text, param, column):
+  with pytest.raises(gr.InvalidValueError) as info:
+    read(text+'\nMA1D(1)=2.0')
+  assert (info.value.line, info.value.column, info.value.param) == (1, column, param)
+  errors = []
+  gin_dict = read(text+'\nMA1D(1)=2.0', errors=errors)
+  assert [type(err) for err in errors] == [gr.InvalidValueError]
+  # the statement after the word is still read
+  assert gin_dict['FINITE-BURNS'].MA1D.values[0] == 2.0
+
+@pytest.mark.parametrize('text', ['DMA1(1)=', 'DMA1(1)=\nMA1D(1)=2.0', 'DMA1(1)= ;'])
+def test_empty_rhs_is_rejected(text):
+  with pytest.raises(gr.NamelistSyntaxError):
+    read(text)
+  errors = []
+  read(text, errors=errors)
+  assert [(err.line, err.param) for err in errors] == [(1, 'DMA1')]
+
+def test_missing_equals_keeps_next_statement():
+  errors   = []
+  gin_dict = read('FOO MA1D(1)=2.0', errors=errors)
+  assert [err.param for err in errors] == ['FOO']
+  assert gin_dict['FINITE-BURNS'].MA1D.values[0] == 2.0
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+def test_integer_past_32_bits_is_stored(as_arrays):
+  arr = read('BURN(1)=3000000000', as_arrays)['FINITE-BURNS'].BURN
+  assert arr.values[0] == 3000000000
+
+@pytest.mark.parametrize('as_arrays', [False, True, 'sparse'])
+def test_integer_past_64_bits_is_invalid(as_arrays):
+  if as_arrays is False:
+    pytest.importorskip('mint')
+  with pytest.raises(gr.InvalidValueError) as info:
+    read('BURN(1)=1,99999999999999999999', as_arrays)
+  assert (info.value.line, info.value.column, info.value.param) == (1, 11, 'BURN')
+
+def test_convert_values_reports_out_of_range():
+  vals, bad = gr.convert_values(['1', '-99999999999999999999', 'x', '9223372036854775807'], 'I')
+  assert vals is None
+  assert bad == [1, 2]
+
+def test_single_precision_values():
+  arr = read('SHS=1.5D0')['ATMOSPHERE'].SHS
+  assert arr.values.dtype == np.float32
+  assert arr.values[0] == 1.5
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+@pytest.mark.parametrize('text, column', [('SHS=1.0E39', 5), ('SHS=-4D38', 5), ('DMA1(1)=1.0,1.0E400', 13)])
+def test_float_past_its_range_is_invalid(text, column, as_arrays):
+  with pytest.raises(gr.InvalidValueError) as info:
+    read(text, as_arrays)
+  assert (info.value.line, info.value.column) == (1, column)
+  assert 'out of range' in info.value.msg
+
+def test_convert_values_reports_float_overflow():
+  vals, bad = gr.convert_values(['3.4E38', '3.5E38', '-1D39', 'x', 'inf'], 'SP')
+  assert vals is None
+  assert bad == [1, 2, 3]
+  vals, bad = gr.convert_values(['3.4E38', '3.5E38', '-1D39'], 'SP')
+  assert vals is None
+  assert bad == [1, 2]
+  vals, bad = gr.convert_values(['3.5E38', '1E308'], 'DP')
+  assert bad == []
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+def test_three_dimensional_assignment(as_arrays):
+  arr = read('KMNC(4,1,1)=1.0,2.0', as_arrays)['SOL-PRESSURE'].KMNC
+  # Fortran order: the value after (4,1,1) is (1,2,1)
+  assert arr.values[3,0,0] == 1.0 and arr.values[0,1,0] == 2.0
+  assert arr.isset.sum() == 2
+
+@pytest.mark.parametrize('as_arrays', [False, True, 'sparse'])
+def test_trim_warning_names_assignment(as_arrays, capsys):
+  if as_arrays is False:
+    pytest.importorskip('mint')
+  read('DMA1(98)=1.0,2.0,3.0\nMA1A(10,99)=1.0,2.0', as_arrays)
+  lines = capsys.readouterr().out.splitlines()
+  assert len(lines) == 2
+  assert 'DMA1(98)' in lines[0] and 'dimensions 99)' in lines[0] and 'trimming off 1 ' in lines[0]
+  assert 'MA1A(10,99)' in lines[1] and 'dimensions 10,99)' in lines[1]
+
+MMAP_TEXT = '''DMA1(1)=1.0D0,,3.0, 2*  ! comment, with commas
+ MA1A(1,2)=2*0.5,
+   -1.5E3
+ COORS(1,1)='EARTH,MOON', 'IT''S'
+ CMPTF(1)=.TRUE., BURN(1)=3000000000
+ UPRC(1)=3*'A', 'B'; DMA1(1)=99.0
+'''
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+def test_mmap_matches_text(tmp_path, as_arrays):
+  path = tmp_path/'a.nl'
+  path.write_text(MMAP_TEXT)
+  text = gr.param_arrays(gr.read_finiteburn_file(str(path), as_arrays=as_arrays))
+  mmap = gr.param_arrays(gr.read_finiteburn_file(str(path), as_arrays=as_arrays, use_mmap=True))
+  assert sorted(mmap) == sorted(text)
+  for name, (values, isset) in text.items():
+    assert mmap[name][0].tolist() == values.tolist()
+    assert mmap[name][1].tolist() == isset.tolist()
+  assert mmap['COORS'][0][:2].tolist() == ['EARTH,MOON', "IT'S"]
+  assert mmap['UPRC'][0][:5].tolist() == ['A', 'A', 'A', 'B', '']
+
+def test_mmap_errors_match_text(tmp_path):
+  path = tmp_path/'bad.nl'
+  path.write_text("DMA1(1)=1.0,abc\nSHS=1E39\nCOORS(1,1)=EARTH\nMA1D(1)=2.0\n")
+  found = {}
+  for use_mmap in (False, True):
+    errors = []
+    gin_dict = gr.read_finiteburn_file(str(path), as_arrays=True, use_mmap=use_mmap, errors=errors)
+    assert gin_dict['FINITE-BURNS'].MA1D.values[0] == 2.0
+    found[use_mmap] = [(type(err), err.line, err.column, err.param, err.file, str(err)) for err in errors]
+  assert found[True] == found[False]
+  assert [line for _, line, _, _, _, _ in found[True]] == [1, 2, 3]
+
+def test_mmap_empty_file(tmp_path):
+  path = tmp_path/'empty.nl'
+  path.write_text('')
+  assert gr.read_finiteburn_file(str(path), as_arrays=True, use_mmap=True) == {}
+
+STATS_TEXT = '''! header comment
+DMA1(1)=1.0,2*2.0, MA1D(1)=5.0
+MA1A(1,1)=
+  3*0.5,
+  1.0
+DMA1(5)=abc
+MASS=1.0;
+DMA1(1)=9.0
+'''
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_read_stats_counts(tmp_path, use_mmap):
+  path = tmp_path/'a.nl'
+  path.write_text(STATS_TEXT)
+  stats  = gr.ReadStats()
+  errors = []
+  gr.read_finiteburn_file(str(path), as_arrays=True, use_mmap=use_mmap, stats=stats, errors=errors)
+  assert len(errors) == 1
+  # lines up to and including the ;, every statement including the invalid
+  # one, and only the valid ones as assignments with their values
+  assert (stats.files, stats.lines, stats.statements) == (1, 7, 5)
+  assert (stats.assignments, stats.values, stats.repeats, stats.trimmed) == (4, 9, 2, 0)
+  assert sorted(stats.group_bytes) == ['FINITE-BURNS', 'SPACECRAFT']
+  assert all(secs >= 0.0 for secs in stats.times.values())
+
+def test_read_stats_trimmed_and_merged():
+  stats = gr.ReadStats()
+  gr.read_finiteburn_file(io.StringIO('DMA1(98)=3*1.0\n'), as_arrays=True, stats=stats)
+  gr.read_finiteburn_file(io.StringIO('DMA1(1)=1.0\nMA1D(1)=2.0\n'), as_arrays=True, stats=stats)
+  assert (stats.files, stats.lines, stats.statements, stats.assignments) == (2, 3, 3, 3)
+  assert (stats.values, stats.repeats, stats.trimmed) == (5, 1, 1)
+
+def test_read_without_stats_does_no_timing(monkeypatch):
+  # no clock is read and nothing is counted unless a ReadStats is passed
+  calls = []
+  clock = gr.time.perf_counter
+  monkeypatch.setattr(gr.time, 'perf_counter', lambda: calls.append(1) or clock())
+  read(STATS_TEXT.replace('abc', '4.0'))
+  assert calls == []
+  read(STATS_TEXT.replace('abc', '4.0'), stats=gr.ReadStats())
+  assert calls
+
+RECORD_TEXT = 'DMA1(1)=1.0,,3.0\nMA1A(1,3)=4.0,5.0\nBURN(2)=7\n'
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+def test_record_matches_param_array(as_arrays):
+  gin_dict = read(RECORD_TEXT, as_arrays)
+  group    = gin_dict['FINITE-BURNS']
+  schema   = gr.get_schema()
+  assert [record.index for record in group] == [1, 2, 3]
+  for i in range(1, 100):
+    record = group[i]
+    for name in record.params:
+      found = gr.param_array(gin_dict, name)
+      value = getattr(record, name)
+      if found is None:
+        assert value is None
+        continue
+      dim    = schema[name].dim
+      values = found[0].reshape(dim, order='F')
+      isset  = found[1].reshape(dim, order='F')
+      if values.ndim == 1:
+        assert value == (values[i-1] if isset[i-1] else None)
+      elif isset[..., i-1].any():
+        assert value.tolist() == values[..., i-1].tolist()
+      else:
+        assert value is None
+
+@pytest.mark.parametrize('as_arrays', [True, 'sparse'])
+def test_record_writes_through(as_arrays):
+  gin_dict = read(RECORD_TEXT, as_arrays)
+  record   = gin_dict['FINITE-BURNS'][2]
+  record.DMA1 = 8.0
+  record.MA1A = np.arange(10.0)
+  record.MA1D = 6.0
+  for name, expect in (('DMA1', 8.0), ('MA1D', 6.0)):
+    values, isset = gr.param_array(gin_dict, name)
+    assert (values[1], isset[1]) == (expect, True)
+    assert getattr(record, name) == expect
+  values, isset = (a.reshape(10, 99, order='F') for a in gr.param_array(gin_dict, 'MA1A'))
+  assert values[:, 1].tolist() == list(range(10)) and isset[:, 1].all()
+  assert values[0, 2] == 4.0 and isset[:, 3:].sum() == 0
+  assert isinstance(gin_dict['FINITE-BURNS'].MA1D, type(gin_dict['FINITE-BURNS'].DMA1))
+  with pytest.raises(ValueError):
+    record.MA1A = [1.0, 2.0]
+  with pytest.raises(TypeError):
+    record.DMA1 = None
+
+@pytest.mark.parametrize('index', [0, 101, -1])
+def test_record_index_out_of_range(index):
+  group = read(RECORD_TEXT)['FINITE-BURNS']
+  with pytest.raises(IndexError):
+    group[index]
+  with pytest.raises(TypeError):
+    group['01']
+
+@pytest.mark.parametrize('as_arrays', [False, True, 'sparse'])
+def test_huge_repeat_is_clamped_not_expanded(as_arrays):
+  stats = gr.ReadStats()
+  tracemalloc.start()
+  start = time.perf_counter()
+  gin_dict = read('ATMCOF(1,1,1)=100000000*1.5\nATMCOF(3,10,100)=5*2.5\n', as_arrays, stats=stats)
+  secs = time.perf_counter()-start
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  # expanding the repeat would take 800 MB and seconds, the clamp 3000 values
+  assert peak < 10*2**20
+  assert secs < 1.0
+  values, isset = gr.param_array(gin_dict, 'ATMCOF')
+  assert len(values) == 3000 and isset.all()
+  assert (values[:-1] == 1.5).all() and values[-1] == 2.5
+  assert (stats.values, stats.repeats, stats.trimmed) == (100000005, 2, 100000000-3000+4)
+
+@pytest.mark.parametrize('as_arrays', [False, True, 'sparse'])
+def test_repeat_past_lower_bound(as_arrays):
+  # SRPFA is dimensioned (1:3,0:10,0:10,1:2), 726 values
+  gin_dict = read('SRPFA(1,0,0,1)=2*3.0,,\nSRPFA(2,10,10,2)=20*1.5\n', as_arrays)
+  values, isset = gr.param_array(gin_dict, 'SRPFA')
+  assert np.flatnonzero(isset).tolist() == [0, 1, 724, 725]
+  assert values[[0, 1, 724, 725]].tolist() == [3.0, 3.0, 1.5, 1.5]
+  with pytest.raises(gr.NamelistError):
+    read('SRPFA(1,11,0,1)=2*3.0\n', as_arrays)
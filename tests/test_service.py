@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+
+import pytest
+
+import ginnl_reader as gr
+from ginnl_service import NamelistClient, NamelistService
+
+def _edit(path, text):
+  # rewrite path so its stamp changes even within the mtime resolution
+  path.write_text(text)
+  st = os.stat(str(path))
+  os.utime(str(path), ns=(st.st_atime_ns, st.st_mtime_ns+1000000))
+
+def _wait(predicate, timeout=5.0):
+  deadline = time.time()+timeout
+  while time.time() < deadline:
+    if predicate():
+      return True
+    time.sleep(0.02)
+  return predicate()
+
+@pytest.fixture
+def nl(tmp_path):
+  path = tmp_path/'a.nl'
+  path.write_text('DMA1(1)=1.0,2.0\nMA1A(1,1)=3.0\n')
+  return path
+
+def test_queries(nl):
+  service = NamelistService([str(nl)])
+  assert service.groups(str(nl)) == ['FINITE-BURNS']
+  assert service.get(str(nl), 'DMA1', index=2) == 2.0
+  assert service.burn(str(nl), 1)['DMA1'] == 1.0
+  assert service.dump(str(nl))['FINITE-BURNS']['DMA1'][:3] == [1.0, 2.0, None]
+  assert service.get(str(nl), 'MA1D') is None
+
+def test_unknown_parameter_and_file(nl, tmp_path):
+  service = NamelistService([str(nl)])
+  with pytest.raises(gr.InvalidParameterError):
+    service.get(str(nl), 'NOPE')
+  with pytest.raises(KeyError):
+    service.groups(str(tmp_path/'other.nl'))
+
+def test_refresh_after_edit(nl):
+  service = NamelistService([str(nl)])
+  assert service.refresh() == []
+  _edit(nl, 'DMA1(1)=5.0,2.0\nMA1A(1,1)=3.0\n')
+  assert service.refresh() == [str(nl)]
+  assert service.get(str(nl), 'DMA1', index=1) == 5.0
+  assert service.files()[str(nl)] == {'reads': 2, 'error': None}
+
+def test_reparse_leaves_published_result_alone(nl):
+  service = NamelistService([str(nl)])
+  before  = service._gin_dict(str(nl))
+  dma1    = before['FINITE-BURNS'].DMA1
+  _edit(nl, 'DMA1(1)=5.0\n')
+  service.refresh()
+  after = service._gin_dict(str(nl))
+  assert after is not before
+  assert before['FINITE-BURNS'].DMA1 is dma1
+  assert dma1.values[:2].tolist() == [1.0, 2.0]
+  assert hasattr(before['FINITE-BURNS'], 'MA1A')
+  assert not hasattr(after['FINITE-BURNS'], 'MA1A')
+  assert after['FINITE-BURNS'].DMA1.values[0] == 5.0
+
+def test_queries_not_blocked_by_parse(nl):
+  service = NamelistService([str(nl)])
+  done    = []
+  with service._parse_lock:
+    thread = threading.Thread(target=lambda: done.append(service.get(str(nl), 'DMA1', index=1)))
+    thread.start()
+    thread.join(5.0)
+  assert done == [1.0]
+
+def test_error_keeps_previous_values(nl):
+  service = NamelistService([str(nl)])
+  _edit(nl, 'DMA1(1)=abc\n')
+  service.refresh()
+  with pytest.raises(gr.InvalidValueError):
+    service.get(str(nl), 'DMA1')
+  assert 'line 1' in service.files()[str(nl)]['error']
+  _edit(nl, 'DMA1(1)=7.0\n')
+  service.refresh()
+  assert service.get(str(nl), 'DMA1', index=1) == 7.0
+
+def test_handle_errors(nl):
+  service = NamelistService([str(nl)])
+  assert service.handle({'op': 'ping'}) == {'result': 'pong'}
+  assert service.handle({'op': 'nope'})['error']['type'] == 'ValueError'
+  error = service.handle({'op': 'get', 'path': str(nl), 'param': 'NOPE'})['error']
+  assert error['type'] == 'InvalidParameterError'
+  assert error['param'] == 'NOPE'
+
+def test_start_and_client(nl, tmp_path):
+  with NamelistService([str(nl)], interval=0.05) as service:
+    socket_path = service.start(str(tmp_path/'s.sock'))
+    with NamelistClient(socket_path, timeout=5.0) as client:
+      assert client.request('ping') == 'pong'
+      assert client.request('get', path=str(nl), param='DMA1', index=2) == 2.0
+      with pytest.raises(gr.InvalidParameterError):
+        client.request('get', path=str(nl), param='NOPE')
+      _edit(nl, 'DMA1(1)=9.0\n')
+      assert _wait(lambda: client.request('get', path=str(nl), param='DMA1', index=1) == 9.0)
+  assert not os.path.exists(socket_path)
+
+def test_serve_watches_and_shuts_down(nl, tmp_path):
+  service     = NamelistService([str(nl)], interval=0.05)
+  socket_path = str(tmp_path/'s.sock')
+  server      = threading.Thread(target=service.serve, args=(socket_path,), daemon=True)
+  server.start()
+  assert _wait(lambda: os.path.exists(socket_path))
+  _edit(nl, 'DMA1(1)=4.0\n')
+  assert _wait(lambda: service.files()[str(nl)]['reads'] == 2)
+  with NamelistClient(socket_path, timeout=5.0) as client:
+    assert client.request('get', path=str(nl), param='DMA1', index=1) == 4.0
+    assert client.request('shutdown') is None
+  server.join(5.0)
+  assert not server.is_alive()
+  # close() runs in its own thread and may still be removing the socket
+  assert _wait(lambda: not os.path.exists(socket_path))
@@ -0,0 +1,96 @@
+import pytest
+
+import ginnl_reader as gr
+
+TEXT = '''DMA1(1)=1.0,2.0
+MA1D(1)=10.0
+MASS=500.0
+DMA1(3)=3.0
+'''
+
+def _arrays(gin_dict):
+  return {name: (values.tolist(), isset.tolist()) for name, (values, isset) in gr.param_arrays(gin_dict).items()}
+
+def _same_as_full_read(session):
+  full = gr.read_finiteburn_file(session.ginnl, as_arrays=session.as_arrays)
+  assert sorted(session.gin_dict) == sorted(full)
+  assert _arrays(session.gin_dict) == _arrays(full)
+
+@pytest.fixture
+def session(tmp_path):
+  path = tmp_path/'a.nl'
+  path.write_text(TEXT)
+  session = gr.NamelistSession(str(path), as_arrays=True)
+  session.read()
+  return session
+
+def test_first_read(session):
+  assert session.reparsed == 4
+  _same_as_full_read(session)
+
+def test_only_changed_chunks_are_lexed(session):
+  with open(session.ginnl, 'w') as ofid:
+    ofid.write(TEXT.replace('MA1D(1)=10.0', 'MA1D(1)=20.0'))
+  session.read()
+  assert session.reparsed == 1
+  assert session.gin_dict['FINITE-BURNS'].MA1D.values[0] == 20.0
+  _same_as_full_read(session)
+  session.read()
+  assert session.reparsed == 0
+
+def test_removed_and_reordered_chunks(session):
+  lines = TEXT.splitlines(True)
+  with open(session.ginnl, 'w') as ofid:
+    ofid.writelines([lines[3], lines[0], lines[1]])
+  session.read()
+  assert session.reparsed == 0
+  # the SPACECRAFT group is gone along with its only assignment
+  assert 'SPACECRAFT' not in session.gin_dict
+  _same_as_full_read(session)
+
+def test_reorder_changes_which_assignment_wins(session):
+  with open(session.ginnl, 'w') as ofid:
+    ofid.write('DMA1(2)=5.0\nDMA1(1)=1.0,2.0\n')
+  session.read()
+  assert session.gin_dict['FINITE-BURNS'].DMA1.values[1] == 2.0
+  with open(session.ginnl, 'w') as ofid:
+    ofid.write('DMA1(1)=1.0,2.0\nDMA1(2)=5.0\n')
+  session.read()
+  assert session.gin_dict['FINITE-BURNS'].DMA1.values[1] == 5.0
+  _same_as_full_read(session)
+
+def test_terminator_ends_the_file(session):
+  with open(session.ginnl, 'w') as ofid:
+    ofid.write(TEXT.replace('MASS=500.0', 'MASS=500.0;'))
+  session.read()
+  assert not session.gin_dict['FINITE-BURNS'].DMA1.isset[2]
+  _same_as_full_read(session)
+
+def test_error_leaves_session_as_it_was(session):
+  with open(session.ginnl, 'w') as ofid:
+    ofid.write(TEXT.replace('MA1D(1)=10.0', 'MA1D(1)=abc'))
+  with pytest.raises(gr.InvalidValueError) as info:
+    session.read()
+  assert info.value.file == session.ginnl
+  assert info.value.line == 2
+  assert session.gin_dict['FINITE-BURNS'].MA1D.values[0] == 10.0
+  with open(session.ginnl, 'w') as ofid:
+    ofid.write(TEXT)
+  session.read()
+  _same_as_full_read(session)
+
+@pytest.mark.parametrize('as_arrays', [False, 'sparse'])
+def test_storage_modes(tmp_path, as_arrays):
+  if as_arrays is False:
+    pytest.importorskip('mint')
+  path = tmp_path/'a.nl'
+  path.write_text(TEXT)
+  session = gr.NamelistSession(str(path), as_arrays=as_arrays)
+  session.read()
+  path.write_text(TEXT.replace('DMA1(3)=3.0', 'DMA1(4)=4.0'))
+  session.read()
+  _same_as_full_read(session)
+
+def test_missing_file(tmp_path):
+  with pytest.raises(gr.NamelistError):
+    gr.NamelistSession(str(tmp_path/'missing.nl')).read()